@@ -15,42 +15,92 @@
 """Checkers package provides the Checkers framework.
 
 This __init__ module provides the public API for Checkers.
+
+Importing the package only imports what the decorators need. The rest of the
+public API (and the submodules) is imported the first time it's used, which
+keeps importing checkers cheap for short-lived processes (like workers) that
+only need a small part of it.
 """
 
-import os
-from os import path
+import importlib
 import sys
-import traceback
+import types
 
-import context
-import modules
-import parameterization
-import registry
+# The test module has to be imported before the test decorator is defined, so
+# that importing the submodule doesn't replace the decorator.
 import test as test_module
-import test_case
-import test_result
-import test_run
-import test_suite
-
-# Default extensions/modules
-from checkers import asserts as asserts_module
-asserts = asserts_module
-
-# pylint: disable=invalid-name
-
-Context = context.Context
-Registry = registry.Registry
-AutoKeyRegistry = registry.AutoKeyRegistry
-Parameterization = parameterization.Parameterization
-Test = test_module.Test
-FunctionTest = test_module.FunctionTest
-TestCase = test_case.TestCase
-TestResult = test_result.TestResult
-TestResultStatus = test_result.TestResultStatus
-TestRun = test_run.TestRun
-TestSuite = test_suite.TestSuite
-
-# pylint: enable=invalid-name
+
+# Public names of the package, mapped to the submodules that define them.
+_LAZY_ATTRIBUTES = {
+    'Baseline': 'baseline',
+    'BenchmarkResult': 'benchmarks',
+    'BenchmarkTest': 'benchmarks',
+    'Context': 'context',
+    'Event': 'events',
+    'EventBus': 'events',
+    'EventType': 'events',
+    'Executor': 'executors',
+    'SerialExecutor': 'executors',
+    'ThreadPoolExecutor': 'executors',
+    'ForkExecutor': 'executors',
+    'ComponentPool': 'fixtures',
+    'Fixture': 'fixtures',
+    'FixtureScope': 'fixtures',
+    'LazyVariable': 'fixtures',
+    'ImpactIndex': 'impact',
+    'Registry': 'registry',
+    'AutoKeyRegistry': 'registry',
+    'ResultCache': 'result_cache',
+    'Parameterization': 'parameterization',
+    'OutputCapture': 'capture',
+    'GcMode': 'garbage',
+    'GcPolicy': 'garbage',
+    'LeakDetector': 'leaks',
+    'Profiler': 'profiling',
+    'TestPlan': 'plan',
+    'Selector': 'selection',
+    'Test': 'test',
+    'FunctionTest': 'test',
+    'TestCase': 'test_case',
+    'TestResult': 'test_result',
+    'TestResultStatus': 'test_result',
+    'TestRun': 'test_run',
+    'TestRunner': 'test_runner',
+    'TestSuite': 'test_suite',
+    'TestTimeoutError': 'timeouts',
+    'TimelineRecorder': 'timeline',
+}
+
+# Submodules that are available as attributes of the package.
+_SUBMODULES = frozenset([
+    'asserts', 'baseline', 'benchmarks', 'capture', 'context', 'daemon',
+    'discovery', 'distributed', 'events', 'executors', 'fixtures', 'garbage',
+    'impact', 'json_files', 'leaks', 'modules', 'parameterization', 'plan',
+    'profiling', 'registry', 'result_cache', 'runners', 'selection',
+    'test_case', 'test_result', 'test_run', 'test_runner', 'test_suite',
+    'timeline', 'timeouts',
+])
+
+
+class _LazyModule(types.ModuleType):
+  """The checkers package, which imports its public names when first used."""
+
+  def __getattr__(self, name):
+    """Imports the submodule that provides a public name of the package."""
+    if name in _LAZY_ATTRIBUTES:
+      submodule = importlib.import_module(
+          '%s.%s' % (self.__name__, _LAZY_ATTRIBUTES[name]))
+      value = getattr(submodule, name)
+    elif name in _SUBMODULES:
+      value = importlib.import_module('%s.%s' % (self.__name__, name))
+    else:
+      raise AttributeError("'module' object has no attribute '%s'" % name)
+    setattr(self, name, value)
+    return value
+
+  def __dir__(self):
+    return sorted(set(self.__dict__) | set(_LAZY_ATTRIBUTES) | _SUBMODULES)
+
 
 ################################################################################
 # Decorators
@@ -66,7 +116,35 @@ def test(function):
   Returns:
     Test: The Checkers test that wraps the function.
   """
-  return FunctionTest(function)
+  return test_module.FunctionTest(function)
+
+
+def benchmark(function=None, warmup=None, iterations=None, min_time=None):
+  """Decorator that converts a function into a Checkers benchmark.
+
+  The decorator can be used as is (@checkers.benchmark) or with arguments
+  (@checkers.benchmark(iterations=100)). See the benchmarks module.
+
+  Args:
+    function: (func) The benchmark function.
+    warmup: (int) Number of untimed calls before the timed iterations.
+    iterations: (int) Number of timed iterations (None to calibrate).
+    min_time: (float) Minimum number of seconds of calibrated iterations.
+
+  Returns:
+    BenchmarkTest: The benchmark that wraps the function (or, if no function
+        was given, a decorator that creates it).
+  """
+  def benchmark_decorator(benchmark_function):
+    benchmarks = _package.benchmarks
+    return benchmarks.BenchmarkTest(
+        benchmark_function,
+        warmup=benchmarks.DEFAULT_WARMUP if warmup is None else warmup,
+        iterations=iterations,
+        min_time=benchmarks.DEFAULT_MIN_TIME if min_time is None else min_time)
+  if function is None:
+    return benchmark_decorator
+  return benchmark_decorator(function)
 
 
 def test_suites(*suite_names):
@@ -136,6 +214,29 @@ def teardown(*teardown_functions):
   return teardown_decorator
 
 
+def timeout(seconds):
+  """Decorator that sets the maximum number of seconds a test case may run.
+
+  Test cases that run longer than that are reported with a TIMEOUT status. The
+  test's timeout takes precedence over the timeouts of its suites and its test
+  run.
+
+  Note that the decorator takes in Test instances, so this decorator should be
+  used *above* the @checkers.test decorator (so that the @checkers.test
+  decorator will have already been applied and returned a Test instance.)
+
+  Args:
+    seconds: (float) The timeout for each of the test's test cases.
+
+  Returns:
+    function: Decorator that will set the timeout of the test.
+  """
+  def timeout_decorator(checkers_test):
+    checkers_test.timeout = seconds
+    return checkers_test
+  return timeout_decorator
+
+
 def parameterize(parameterizations):
   """Decorator that adds parameterizations to the test.
 
@@ -173,8 +274,23 @@ def parameterize(parameterizations):
   """
   def parameterize_decorator(checkers_test):
     for name, params in parameterizations.iteritems():
-      p = parameterization.Parameterization(name, params)
+      p = _package.Parameterization(name, params)
       checkers_test.decorator_parameterizations.register(p)
     return checkers_test
   return parameterize_decorator
 
+
+################################################################################
+# Lazy loading
+################################################################################
+
+# The decorators above resolve the submodules they need through _package, so
+# that they are only imported when used.
+_package = _LazyModule(__name__, __doc__)
+_package.__dict__.update(
+    (key, value) for key, value in globals().iteritems()
+    if key not in ('_LazyModule', '_package'))
+# The original module has to stay alive; Python 2 clears the globals of modules
+# that are garbage collected, and the functions above still use them.
+_package.__dict__['_original_module'] = sys.modules[__name__]
+sys.modules[__name__] = _package
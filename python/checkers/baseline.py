@@ -0,0 +1,240 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Benchmark baselines, which catch benchmarks that got slower.
+
+A baseline stores the iteration timings of the benchmark cases of a run, keyed
+by the test case full names. When a baseline is updated, the timings of the
+benchmark cases that pass are recorded and saved. Otherwise, the timings of
+each benchmark case are compared against the ones in the baseline, and a case
+that got slower gets a REGRESSED result (which counts as a failure).
+
+Benchmark timings are noisy, so a raw percentage change isn't enough to call a
+case regressed. The timings are compared with a (one-sided) Mann-Whitney U test
+and a case only regresses if it's significantly slower (the p-value is below
+alpha) *and* its median got slower by more than the threshold. Cases with too
+few samples on either side are never reported as regressed.
+
+Example:
+
+  # Record the baseline (e.g. on the main branch).
+  runner = checkers.TestRunner(
+      baseline=checkers.Baseline('benchmarks.json', update=True))
+  # Compare against it later on.
+  runner = checkers.TestRunner(baseline=checkers.Baseline('benchmarks.json'))
+"""
+
+import math
+import os
+
+import benchmarks
+import json_files
+import test_result
+
+# Version of the baseline file format (see json_files).
+BASELINE_VERSION = 1
+# Default significance level of the comparison.
+DEFAULT_ALPHA = 0.01
+# Default relative slowdown of the median that is tolerated.
+DEFAULT_THRESHOLD = 0.05
+# Default minimum number of samples (on each side) needed for a comparison.
+DEFAULT_MIN_SAMPLES = 5
+# Maximum number of timings of a benchmark case stored in the baseline.
+MAX_SAMPLES = 1000
+
+
+class BenchmarkRegressionError(AssertionError):
+  """Error of a benchmark case that got slower than its baseline."""
+  pass
+
+
+def _ranks(values):
+  """Ranks the values (starting at 1), giving ties their average rank.
+
+  Args:
+    values: (list(float)) The values to rank.
+
+  Returns:
+    (list(float), list(int)): The rank of each value, and the size of each
+        group of tied values.
+  """
+  order = sorted(xrange(len(values)), key=lambda i: values[i])
+  ranks = [0.0] * len(values)
+  ties = []
+  start = 0
+  while start < len(order):
+    value = values[order[start]]
+    end = start
+    while end + 1 < len(order) and values[order[end + 1]] == value:
+      end += 1
+    rank = (start + end) / 2.0 + 1
+    for i in xrange(start, end + 1):
+      ranks[order[i]] = rank
+    ties.append(end - start + 1)
+    start = end + 1
+  return ranks, ties
+
+
+def mann_whitney_p_value(samples, baseline_samples):
+  """Tests whether the samples tend to be larger than the baseline samples.
+
+  This is the one-sided Mann-Whitney U test, using the normal approximation
+  (with a correction for ties and for continuity), which is accurate enough for
+  the number of iterations benchmarks run.
+
+  Args:
+    samples: (list(float)) The new samples.
+    baseline_samples: (list(float)) The baseline samples.
+
+  Returns:
+    float: The p-value (1.0 if it can't be computed).
+  """
+  count = len(samples)
+  baseline_count = len(baseline_samples)
+  total = count + baseline_count
+  if not count or not baseline_count:
+    return 1.0
+  ranks, ties = _ranks(list(samples) + list(baseline_samples))
+  u = sum(ranks[:count]) - count * (count + 1) / 2.0
+  mean = count * baseline_count / 2.0
+  tie_correction = sum(t ** 3 - t for t in ties) / float(total * (total - 1))
+  variance = count * baseline_count / 12.0 * (total + 1 - tie_correction)
+  if variance <= 0:
+    return 1.0
+  z = (u - mean - 0.5) / math.sqrt(variance)
+  return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def downsample(timings, max_samples=MAX_SAMPLES):
+  """Picks at most max_samples timings, evenly spread over the iterations."""
+  if len(timings) <= max_samples:
+    return list(timings)
+  step = len(timings) / float(max_samples)
+  return [timings[int(i * step)] for i in xrange(max_samples)]
+
+
+class Comparison(object):
+  """The comparison of a benchmark case's timings against its baseline."""
+
+  def __init__(self, full_name, p_value, change, regressed):
+    """Initializes a new instance of a Comparison.
+
+    Args:
+      full_name: (string) The full name of the benchmark case.
+      p_value: (float) The p-value of the case being slower than its baseline.
+      change: (float) Relative change of the median (0.1 is 10% slower).
+      regressed: (bool) Whether the case is considered to have regressed.
+    """
+    self.full_name = full_name
+    self.p_value = p_value
+    self.change = change
+    self.regressed = regressed
+
+  @property
+  def message(self):
+    """Describes the comparison."""
+    return '%s: median %+.1f%% compared to the baseline (p=%.3g)' % (
+        self.full_name, self.change * 100, self.p_value)
+
+
+class Baseline(object):
+  """Records benchmark timings and compares later runs against them."""
+
+  def __init__(self, file_path=None, update=False, alpha=DEFAULT_ALPHA,
+               threshold=DEFAULT_THRESHOLD, min_samples=DEFAULT_MIN_SAMPLES):
+    """Initializes a new instance of a Baseline.
+
+    Args:
+      file_path: (string) The file the baseline is loaded from and saved to
+          (None keeps the baseline in memory).
+      update: (bool) Record the timings of the benchmark cases instead of
+          comparing them against the baseline.
+      alpha: (float) Significance level a slowdown must reach.
+      threshold: (float) Relative slowdown of the median that is tolerated.
+      min_samples: (int) Minimum number of samples on each side to compare.
+    """
+    self.file_path = file_path
+    self.update = update
+    self.alpha = alpha
+    self.threshold = threshold
+    self.min_samples = min_samples
+    # Timings of the benchmark cases, keyed by test case full name.
+    self.entries = {}
+    # Comparisons of the benchmark cases that were compared, keyed by name.
+    self.comparisons = {}
+    if file_path and os.path.exists(file_path):
+      self.load()
+
+  def compare(self, full_name, timings):
+    """Compares the timings of a benchmark case against its baseline.
+
+    Args:
+      full_name: (string) The full name of the benchmark case.
+      timings: (list(float)) The timings of the iterations of the case.
+
+    Returns:
+      Comparison: The comparison (None if there's nothing to compare with).
+    """
+    baseline_timings = self.entries.get(full_name)
+    if (not baseline_timings or len(baseline_timings) < self.min_samples or
+        len(timings) < self.min_samples):
+      return None
+    p_value = mann_whitney_p_value(timings, baseline_timings)
+    baseline_median = benchmarks.percentile(sorted(baseline_timings), 0.5)
+    median = benchmarks.percentile(sorted(timings), 0.5)
+    change = 0.0
+    if baseline_median:
+      change = median / baseline_median - 1
+    regressed = p_value < self.alpha and change > self.threshold
+    return Comparison(full_name, p_value, change, regressed)
+
+  def record(self, test_case, result):
+    """Records (or compares) the result of a benchmark case.
+
+    When comparing, a result that regressed is turned into a REGRESSED result.
+    Results of anything but passing benchmark cases are ignored.
+
+    Args:
+      test_case: (TestCase) The test case that was run.
+      result: (TestResult) The result of the test case.
+    """
+    if (not isinstance(result, benchmarks.BenchmarkResult) or
+        result.status != test_result.TestResultStatus.PASSED or
+        not result.timings):
+      return
+    if self.update:
+      self.entries[test_case.full_name] = downsample(result.timings)
+      return
+    comparison = self.compare(test_case.full_name, result.timings)
+    if not comparison:
+      return
+    self.comparisons[test_case.full_name] = comparison
+    if comparison.regressed:
+      error = BenchmarkRegressionError(comparison.message)
+      result.status = test_result.TestResultStatus.REGRESSED
+      result.message = comparison.message
+      result.exc_info = (BenchmarkRegressionError, error, None)
+
+  def load(self):
+    """Loads the timings from the baseline file (if it's a supported one)."""
+    source = json_files.load(self.file_path, BASELINE_VERSION)
+    if source:
+      self.entries = dict(source['entries'])
+
+  def save(self):
+    """Saves the timings to the baseline file (only when updating it)."""
+    if not self.file_path or not self.update:
+      return
+    json_files.save(self.file_path, BASELINE_VERSION,
+                    {'entries': self.entries})
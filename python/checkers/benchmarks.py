@@ -0,0 +1,260 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Benchmarks are tests that measure how long their body takes to run.
+
+A benchmark is written like any other function test, and gets its variables,
+parameterizations, setup and teardown the same way; only the @checkers.benchmark
+decorator is used instead of @checkers.test:
+
+@checkers.parameterize({'small': {'size': 10}, 'large': {'size': 10000}})
+@checkers.benchmark(warmup=3)
+def benchmark_sort(size):
+  sorted(range(size, 0, -1))
+
+The setup functions run once per test case. The body is then called a number
+of times without being timed (the warmup) and afterwards a number of timed
+iterations. If the number of iterations isn't given, it is calibrated: the body
+is called until it has run for at least min_time seconds (and at least
+min_iterations times). The result of a benchmark case is a BenchmarkResult,
+which contains the timing of every iteration and their statistics.
+
+Benchmark results are never taken from a result cache, since the point of a
+benchmark is to run it.
+"""
+
+import math
+import timeit
+
+import test
+import test_case
+import test_result
+
+# Default number of untimed calls of the body before the timed iterations.
+DEFAULT_WARMUP = 1
+# Default minimum number of seconds of calibrated timed iterations.
+DEFAULT_MIN_TIME = 0.1
+# Minimum number of calibrated timed iterations.
+MIN_ITERATIONS = 5
+# Maximum number of calibrated timed iterations.
+MAX_ITERATIONS = 100000
+
+
+def percentile(sorted_values, fraction):
+  """Gets a percentile of some values, interpolating between the values.
+
+  Args:
+    sorted_values: (list(float)) The values, in ascending order.
+    fraction: (float) The percentile as a fraction (e.g. 0.95 for the p95).
+
+  Returns:
+    float: The percentile (None if there are no values).
+  """
+  if not sorted_values:
+    return None
+  position = (len(sorted_values) - 1) * fraction
+  lower = int(math.floor(position))
+  upper = int(math.ceil(position))
+  if lower == upper:
+    return sorted_values[lower]
+  weight = position - lower
+  return sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
+
+
+def summarize(timings):
+  """Computes the statistics of the timings of a benchmark.
+
+  Args:
+    timings: (list(float)) Number of seconds each iteration took.
+
+  Returns:
+    dict: The number of iterations and the min, max, mean, median, p95, p99
+        and (sample) stddev of the timings. None if there are no timings.
+  """
+  if not timings:
+    return None
+  values = sorted(timings)
+  count = len(values)
+  mean = sum(values) / count
+  variance = 0.0
+  if count > 1:
+    variance = sum((value - mean) ** 2 for value in values) / (count - 1)
+  return {
+      'iterations': count,
+      'min': values[0],
+      'max': values[-1],
+      'mean': mean,
+      'median': percentile(values, 0.5),
+      'p95': percentile(values, 0.95),
+      'p99': percentile(values, 0.99),
+      'stddev': math.sqrt(variance),
+  }
+
+
+def format_duration(seconds):
+  """Formats a (short) number of seconds with a readable unit."""
+  for unit, scale in (('s', 1.0), ('ms', 1e-3), ('us', 1e-6)):
+    if seconds >= scale:
+      return '%.3g%s' % (seconds / scale, unit)
+  return '%.3gns' % (seconds / 1e-9)
+
+
+def format_stats(stats):
+  """Formats the statistics of a benchmark (see summarize) as a single line."""
+  return 'min %s, median %s, p95 %s, p99 %s, stddev %s (%d iterations)' % (
+      format_duration(stats['min']), format_duration(stats['median']),
+      format_duration(stats['p95']), format_duration(stats['p99']),
+      format_duration(stats['stddev']), stats['iterations'])
+
+
+def write_report(results, stream):
+  """Writes the statistics of the benchmark results to a stream.
+
+  Results that aren't benchmark results (or that have no timings) are skipped,
+  so nothing is written if no benchmarks ran.
+
+  Args:
+    results: (iterable(TestResult)) The results of the test cases that ran.
+    stream: (file) The stream to write the report to.
+  """
+  lines = []
+  for result in results:
+    stats = getattr(result, 'stats', None)
+    if stats:
+      lines.append('%s: %s\n' % (result.context.test_case.full_name,
+                                 format_stats(stats)))
+  if not lines:
+    return
+  stream.write('\nBenchmarks:\n')
+  for line in sorted(lines):
+    stream.write(line)
+
+
+class BenchmarkResult(test_result.TestResult):
+  """The result of a benchmark case, including the timing of its iterations."""
+
+  def __init__(self, context, status, message='', exc_info=None, timings=None):
+    """Initializes a new instance of a BenchmarkResult.
+
+    Args:
+      context: (Context) The context of the test case that produced the result.
+      status: (TestResultStatus (string)) The current status of the test.
+      message: (string) The [error] message for the test.
+      exc_info: See https://docs.python.org/2/library/sys.html#sys.exc_info.
+      timings: (list(float)) Number of seconds each timed iteration took.
+    """
+    super(BenchmarkResult, self).__init__(context, status, message=message,
+                                          exc_info=exc_info)
+    self.timings = list(timings) if timings else []
+
+  @property
+  def stats(self):
+    """The statistics of the timings (see summarize)."""
+    return summarize(self.timings)
+
+  def to_dict(self):
+    """Converts the result into a dict, including the timings and statistics.
+
+    Returns:
+      dict: The serializable contents of the result.
+    """
+    source = super(BenchmarkResult, self).to_dict()
+    source['timings'] = self.timings
+    source['stats'] = self.stats
+    return source
+
+
+class BenchmarkCase(test_case.TestCase):
+  """A test case that times the iterations of its test's body."""
+
+  def __init__(self, *args, **kwargs):
+    """Initializes a new instance of a BenchmarkCase (see TestCase)."""
+    super(BenchmarkCase, self).__init__(*args, **kwargs)
+    self.timings = []
+
+  def execute(self, args):
+    """Calls the body for the warmup and then times the iterations.
+
+    Args:
+      args: (dict) The values of the variables the test requires.
+    """
+    benchmark = self.test
+    timer = timeit.default_timer
+    self.timings = []
+    for _ in xrange(benchmark.warmup):
+      benchmark(**args)
+    deadline = timer() + benchmark.min_time
+    while True:
+      count = len(self.timings)
+      if benchmark.iterations is not None:
+        if count >= benchmark.iterations:
+          break
+      elif count >= MAX_ITERATIONS or (count >= MIN_ITERATIONS and
+                                       timer() >= deadline):
+        break
+      start = timer()
+      benchmark(**args)
+      self.timings.append(timer() - start)
+
+  def create_result(self, status, exc_info=None):
+    """Creates a BenchmarkResult with the timings of the iterations that ran.
+
+    Args:
+      status: (TestResultStatus (string)) The status of the test case.
+      exc_info: See https://docs.python.org/2/library/sys.html#sys.exc_info.
+
+    Returns:
+      BenchmarkResult: The result of the benchmark case.
+    """
+    return BenchmarkResult(self.context, status, exc_info=exc_info,
+                           timings=self.timings)
+
+
+class BenchmarkTest(test.FunctionTest):
+  """Adapts a function into a benchmark whose test cases time the function."""
+
+  test_case_type = BenchmarkCase
+  cacheable = False
+
+  def __init__(self, test_function, warmup=DEFAULT_WARMUP, iterations=None,
+               min_time=DEFAULT_MIN_TIME):
+    """Initializes a new instance of a BenchmarkTest.
+
+    Args:
+      test_function: (callable) The function that the benchmark is wrapping.
+      warmup: (int) Number of untimed calls before the timed iterations.
+      iterations: (int) Number of timed iterations (None to calibrate).
+      min_time: (float) Minimum number of seconds of calibrated iterations.
+    """
+    super(BenchmarkTest, self).__init__(test_function)
+    self.warmup = warmup
+    self.iterations = iterations
+    self.min_time = min_time
+
+  def clone(self):
+    """Creates a shallow copy of the benchmark.
+
+    Returns:
+      BenchmarkTest: A shallow copy of this benchmark instance.
+    """
+    benchmark = BenchmarkTest(self.function, warmup=self.warmup,
+                              iterations=self.iterations,
+                              min_time=self.min_time)
+    benchmark.decorator_parameterizations.merge(
+        self.decorator_parameterizations)
+    benchmark.setup.merge(self.setup)
+    benchmark.teardown.merge(self.teardown)
+    benchmark.test_suite_names |= self.test_suite_names
+    benchmark.timeout = self.timeout
+    return benchmark
@@ -0,0 +1,223 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Captures what test cases print (and log), to show it only when they fail.
+
+An OutputCapture passed to the TestRunner replaces sys.stdout and sys.stderr
+(and adds a handler to the root logger) while test runs are set up. Whatever a
+test case (and its fixtures) write in the thread that runs it goes to a buffer
+of its own instead, so output of test cases that run concurrently doesn't
+interleave, and passing test cases don't pay for writing to the terminal. Other
+threads write to the real streams as usual.
+
+The buffer is a ring buffer: once it holds max_bytes, the oldest output is
+dropped (and the number of dropped bytes is noted), so chatty test cases can't
+use up the memory. The output of a test case that failed is attached to its
+result (as its output); the output of the others is discarded.
+"""
+
+import collections
+import logging
+import sys
+import threading
+
+# Default maximum number of bytes of output kept per test case.
+DEFAULT_MAX_BYTES = 64 * 1024
+
+# Buffer of the test case running in the current thread (if it is captured).
+_local = threading.local()
+
+# How many captures are started, and what they replaced.
+_lock = threading.Lock()
+_stream_count = 0
+_original_streams = None
+_logging_count = 0
+_handler = None
+
+
+class RingBuffer(object):
+  """Keeps the last max_bytes of the text written to it."""
+
+  def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+    """Initializes a new instance of a RingBuffer.
+
+    Args:
+      max_bytes: (int) The maximum number of bytes that are kept.
+    """
+    self.max_bytes = max_bytes
+    # Number of bytes that were written, but dropped to make room.
+    self.dropped = 0
+    self._chunks = collections.deque()
+    self._size = 0
+
+  def __len__(self):
+    return self._size
+
+  def write(self, text):
+    """Appends text, dropping the oldest text if there isn't enough room."""
+    if isinstance(text, unicode):
+      text = text.encode('utf-8', 'replace')
+    if not text:
+      return
+    self._chunks.append(text)
+    self._size += len(text)
+    while self._size > self.max_bytes:
+      excess = self._size - self.max_bytes
+      first = self._chunks[0]
+      if len(first) <= excess:
+        self._chunks.popleft()
+        dropped = len(first)
+      else:
+        self._chunks[0] = first[excess:]
+        dropped = excess
+      self._size -= dropped
+      self.dropped += dropped
+
+  def getvalue(self):
+    """Gets the text that is kept (noting how much was dropped, if any)."""
+    text = ''.join(self._chunks)
+    if self.dropped:
+      text = '[... %d byte(s) dropped ...]\n%s' % (self.dropped, text)
+    return text
+
+
+def _current_buffer():
+  return getattr(_local, 'buffer', None)
+
+
+class _CapturingStream(object):
+  """Stands in for a stream, writing to the current thread's buffer (if any)."""
+
+  def __init__(self, original):
+    self.original = original
+
+  def write(self, text):
+    capture_buffer = _current_buffer()
+    if capture_buffer is None:
+      self.original.write(text)
+    else:
+      capture_buffer.write(text)
+
+  def writelines(self, lines):
+    for line in lines:
+      self.write(line)
+
+  def flush(self):
+    if _current_buffer() is None:
+      self.original.flush()
+
+  def __getattr__(self, name):
+    return getattr(self.original, name)
+
+
+class _CapturingHandler(logging.Handler):
+  """Writes the records logged in threads that are captured to their buffer."""
+
+  def __init__(self):
+    logging.Handler.__init__(self)
+    self.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+
+  def emit(self, record):
+    capture_buffer = _current_buffer()
+    if capture_buffer is not None:
+      capture_buffer.write(self.format(record) + '\n')
+
+
+def _not_captured(_):
+  """Logging filter that drops records logged in threads that are captured."""
+  return _current_buffer() is None
+
+
+def _install(capture_logging):
+  """Replaces the streams (and adds the logging handler) on the first call."""
+  global _stream_count, _original_streams, _logging_count, _handler
+  with _lock:
+    _stream_count += 1
+    if _stream_count == 1:
+      _original_streams = (sys.stdout, sys.stderr)
+      sys.stdout = _CapturingStream(sys.stdout)
+      sys.stderr = _CapturingStream(sys.stderr)
+    if capture_logging:
+      _logging_count += 1
+      if _logging_count == 1:
+        _handler = _CapturingHandler()
+        root = logging.getLogger()
+        for handler in root.handlers:
+          handler.addFilter(_not_captured)
+        root.addHandler(_handler)
+
+
+def _uninstall(capture_logging):
+  """Undoes _install once it was undone as many times as it was called."""
+  global _stream_count, _original_streams, _logging_count, _handler
+  with _lock:
+    if capture_logging:
+      _logging_count -= 1
+      if _logging_count == 0:
+        root = logging.getLogger()
+        root.removeHandler(_handler)
+        for handler in root.handlers:
+          handler.removeFilter(_not_captured)
+        _handler = None
+    _stream_count -= 1
+    if _stream_count == 0:
+      sys.stdout, sys.stderr = _original_streams
+      _original_streams = None
+
+
+class OutputCapture(object):
+  """Captures the output of test cases, keeping it for the ones that fail."""
+
+  def __init__(self, max_bytes=DEFAULT_MAX_BYTES, capture_logging=True):
+    """Initializes a new instance of an OutputCapture.
+
+    Args:
+      max_bytes: (int) The maximum number of bytes of output kept per test
+          case.
+      capture_logging: (bool) Also capture what is logged with logging.
+    """
+    self.max_bytes = max_bytes
+    self.capture_logging = capture_logging
+
+  def start(self):
+    """Starts capturing the output of the test cases (see capture)."""
+    _install(self.capture_logging)
+
+  def stop(self):
+    """Stops capturing the output of the test cases."""
+    _uninstall(self.capture_logging)
+
+  def capture(self, function, test_case):
+    """Calls function(test_case), capturing its output in the current thread.
+
+    Only output written while the capture is started is captured.
+
+    Args:
+      function: (function(TestCase)) Calls the test case.
+      test_case: (TestCase) The test case to call.
+
+    Returns:
+      TestResult: The result of the function, with the captured output if the
+          test case failed.
+    """
+    capture_buffer = RingBuffer(self.max_bytes)
+    previous = _current_buffer()
+    _local.buffer = capture_buffer
+    try:
+      result = function(test_case)
+    finally:
+      _local.buffer = previous
+    if result.failed and len(capture_buffer):
+      result.output = capture_buffer.getvalue()
+    return result
@@ -14,9 +14,72 @@
 
 """Context provides environmental information for a test."""
 
+import fixtures
 import registry
 
 
+class VariableRegistry(registry.Registry):
+  """Registry of a context's variables, which resolves lazy variables.
+
+  Lazy variables are resolved the first time they are accessed (by key or as an
+  attribute). The resolved value then replaces the lazy variable in the
+  registry, so it's only resolved once per context. Resolving needs a resolver
+  (which the fixture manager of the TestRunner sets while the test case runs),
+  since the value is shared and torn down according to the variable's scope.
+  """
+
+  def __init__(self, context):
+    """Initializes a new instance of a VariableRegistry.
+
+    Args:
+      context: (Context) The context that the variables belong to.
+    """
+    super(VariableRegistry, self).__init__()
+    self._context = context
+    self._resolver = None
+
+  def set_resolver(self, resolver):
+    """Sets the function that resolves lazy variables.
+
+    Args:
+      resolver: (function(name, LazyVariable)) Gets the lazy variable's value.
+    """
+    self._resolver = resolver
+
+  def __getitem__(self, key):
+    """Gets the item with the given key, resolving it if it's lazy."""
+    value = self._values[key]
+    if isinstance(value, fixtures.LazyVariable):
+      if not self._resolver:
+        raise fixtures.UnresolvedVariableError(
+            'lazy variable <%s> can only be accessed while a TestRunner runs '
+            'the test case' % key)
+      value = self._resolver(key, value)
+      self[key] = value
+    return value
+
+  def __setitem__(self, key, value):
+    """Sets the value; lazy values only become attributes once resolved."""
+    if not isinstance(value, fixtures.LazyVariable):
+      super(VariableRegistry, self).__setitem__(key, value)
+      return
+    self._values[key] = value
+    self.__dict__.pop(registry.to_identifier(key), None)
+
+  def __delitem__(self, key):
+    """Deletes the item with the given key from the registry."""
+    self._values.pop(key, None)
+    self.__dict__.pop(registry.to_identifier(key), None)
+
+  def __getattr__(self, name):
+    """Resolves lazy variables that are accessed as attributes."""
+    if not name.startswith('_'):
+      for key in self._values:
+        if registry.to_identifier(key) == name:
+          return self[key]
+    raise AttributeError(name)
+
+
 class Context(object):
   """Context provides environmental information to a test.
 
@@ -47,7 +110,7 @@ class Context(object):
     # The test run that owns/controls the test.
     self.test_run = test_run
     # Set of variables available for the test.
-    self.variables = registry.Registry()
+    self.variables = VariableRegistry(self)
     for key, value in variables.iteritems():
       self.variables.register(key, value)
     # Of course, the context itself must be available to tests.
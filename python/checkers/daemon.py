@@ -0,0 +1,421 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Long-lived daemon that keeps test runs warm and re-runs them on changes.
+
+The daemon imports the test modules once, sets up a test run for each of them
+(see Daemon._load_test_run) and keeps it set up, along with its fixtures and
+lazy variables, between runs (except for case scoped values, which are set up
+for every run of their test case and torn down after it). It watches the source
+files of the loaded modules under its watch paths, and when some of them change
+it reloads just those modules and re-runs the test cases that touched them
+(according to the coverage it recorded while running them; see impact). Test
+modules that change get a fresh test run.
+
+Thin clients talk to the daemon over TCP, with the same line-delimited JSON
+messages as the distributed runner:
+
+  client -> daemon  {"type": "run", "selection": expression or null}
+  client -> daemon  {"type": "watch"}
+  client -> daemon  {"type": "stop"}
+  daemon -> client  {"type": "watching"}
+  daemon -> client  {"type": "result", "result": TestResult.to_dict()}
+  daemon -> client  {"type": "done", "passed": n, "failed": n, "changed": [...],
+                     "errors": [...]}
+  daemon -> client  {"type": "error", "message": ...}
+
+A run request runs the selected test cases (all of them by default) and a
+watch request streams the results of every re-run after a change. From the
+command line:
+
+  python -m checkers.daemon serve --port 7100 my_package.my_test
+  python -m checkers.daemon run --port 7100 'suite:fast'
+  python -m checkers.daemon watch --port 7100
+
+Note that reloading a module updates the module object in place, so code that
+imported names from it (from module import name) keeps using the old objects
+until the importing module is reloaded as well.
+"""
+
+import argparse
+import collections
+import importlib
+import os
+import select
+import socket
+import sys
+import traceback
+
+import distributed
+import impact
+import selection
+import test_run as test_run_module
+import test_runner as test_runner_module
+
+
+def _source_path(module):
+  """Gets the path of a module's source file (None if it doesn't have one)."""
+  file_path = getattr(module, '__file__', None)
+  if not file_path:
+    return None
+  source_path = os.path.splitext(file_path)[0] + '.py'
+  if not os.path.exists(source_path):
+    return None
+  return source_path
+
+
+class Daemon(object):
+  """Keeps test runs set up and re-runs their test cases on request."""
+
+  def __init__(self, module_names, address=('127.0.0.1', 0), watch_paths=None,
+               poll_interval=0.5, test_runner=None):
+    """Initializes a new instance of a Daemon.
+
+    Args:
+      module_names: ([string]) The names of the test modules.
+      address: ((string, int)) The host and port to listen on (port 0 picks a
+          free port; see the address attribute).
+      watch_paths: ([string]) Directories whose modules are watched (defaults
+          to the directories of the test modules).
+      poll_interval: (float) Seconds between checks for changed files.
+      test_runner: (TestRunner) Runs the test cases (defaults to a TestRunner);
+          an impact index is added if it doesn't have one.
+    """
+    self.module_names = list(module_names)
+    self.watch_paths = watch_paths
+    self.poll_interval = poll_interval
+    self.test_runner = test_runner
+    if not self.test_runner:
+      self.test_runner = test_runner_module.TestRunner()
+    if not self.test_runner.impact_index:
+      self.test_runner.impact_index = impact.ImpactIndex()
+    # Test runs that are set up, keyed by the name of their module.
+    self.test_runs = collections.OrderedDict()
+    # Modification times of the watched source files, keyed by module name.
+    self.mtimes = {}
+    # Errors from reloading modules since the last run.
+    self.errors = []
+    self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    self.listener.bind(address)
+    self.listener.listen(16)
+    self.address = self.listener.getsockname()
+    self.clients = []
+    self.watchers = []
+    self.serving = False
+
+  def load(self):
+    """Imports the test modules and sets up their test runs."""
+    for module_name in self.module_names:
+      self._load_test_run(importlib.import_module(module_name))
+    if self.watch_paths is None:
+      self.watch_paths = sorted(set(
+          os.path.dirname(_source_path(sys.modules[name]))
+          for name in self.module_names))
+    self.poll()
+
+  def _load_test_run(self, module):
+    """Creates and sets up the test run of a test module.
+
+    Test modules that define a create_test_run() function (which must create
+    the test run from its own module rather than from __main__) get the test
+    run it creates; other test modules get TestRun.from_module.
+    """
+    if callable(getattr(module, 'create_test_run', None)):
+      test_run = module.create_test_run()
+    else:
+      test_run = test_run_module.TestRun.from_module(module)
+    self.test_runner.setup_test_run(test_run)
+    self.test_runs[module.__name__] = test_run
+
+  def _watched_modules(self):
+    """Yields (name, module, source path) for the modules being watched."""
+    roots = tuple(impact.normalize_path(p) + os.sep for p in self.watch_paths)
+    for name, module in sys.modules.items():
+      source_path = _source_path(module) if module else None
+      if source_path and impact.normalize_path(source_path).startswith(roots):
+        yield name, module, source_path
+
+  def poll(self):
+    """Reloads the watched modules whose source files changed.
+
+    Modules under test are reloaded before test modules, and test modules get a
+    new test run. Errors from reloading a module are added to errors (and the
+    module keeps its previous contents).
+
+    Returns:
+      set: The normalized paths of the source files that changed.
+    """
+    changed = []
+    for name, module, source_path in list(self._watched_modules()):
+      try:
+        mtime = os.path.getmtime(source_path)
+      except OSError:
+        continue
+      if self.mtimes.setdefault(name, mtime) != mtime:
+        self.mtimes[name] = mtime
+        changed.append((name in self.test_runs, name, module, source_path))
+    for is_test_module, name, module, _ in sorted(changed):
+      if is_test_module:
+        self.test_runner.teardown_test_run(self.test_runs[name])
+      try:
+        reload(module)
+      except Exception:  # pylint: disable=broad-except
+        self.errors.append('failed to reload %s:\n%s' % (
+            name, traceback.format_exc()))
+      if is_test_module:
+        self._load_test_run(module)
+    return set(impact.normalize_path(c[3]) for c in changed)
+
+  def run(self, selector=None, changed_files=None):
+    """Runs test cases of the test runs and yields their results.
+
+    Args:
+      selector: (Selector) Only runs the test cases it selects.
+      changed_files: (set) Only runs the test cases affected by changes to
+          these (normalized) files.
+
+    Yields:
+      (TestCase, TestResult) for each of the test cases that ran.
+    """
+    impact_index = self.test_runner.impact_index
+    for test_run in self.test_runs.values():
+      selected = None
+      if selector:
+        selected = set(candidate.full_name for _, _, candidate
+                       in selection.case_candidates(test_run)
+                       if selector.matches(candidate))
+      for test_case in test_run.generate_test_cases.values():
+        if selected is not None and test_case.full_name not in selected:
+          continue
+        if (changed_files is not None and
+            not impact_index.is_affected(test_case.full_name, changed_files)):
+          continue
+        result = self.test_runner.run_test_case(test_case)
+        self.test_runner.record_result(test_case, result)
+        yield test_case, result
+
+  def serve_forever(self):
+    """Serves clients (and re-runs changed tests) until a client stops it."""
+    self.serving = True
+    while self.serving:
+      readable, _, _ = select.select(
+          [self.listener] + self.clients, [], [], self.poll_interval)
+      for ready in readable:
+        if ready is self.listener:
+          sock, _ = self.listener.accept()
+          self.clients.append(distributed.MessageConnection(sock))
+        else:
+          self._handle(ready)
+      changed_files = self.poll()
+      if changed_files and self.watchers:
+        self._stream(self.watchers, self.run(changed_files=changed_files),
+                     changed_files)
+
+  def _handle(self, client):
+    """Handles the messages that a client sent."""
+    try:
+      alive = client.read()
+    except (socket.error, distributed.ProtocolError):
+      alive = False
+    while alive and client.messages:
+      message = client.messages.pop(0)
+      if message.get('type') == 'run':
+        try:
+          selector = None
+          if message.get('selection'):
+            selector = selection.to_selector(message['selection'])
+        except ValueError as e:
+          client.send({'type': 'error', 'message': str(e)})
+          continue
+        changed_files = self.poll()
+        self._stream([client], self.run(selector), changed_files)
+      elif message.get('type') == 'watch':
+        self.watchers.append(client)
+        client.send({'type': 'watching'})
+      elif message.get('type') == 'stop':
+        self.serving = False
+      else:
+        client.send({'type': 'error', 'message': 'unexpected message'})
+    if not alive:
+      self._disconnect(client)
+
+  def _stream(self, clients, results, changed_files):
+    """Sends results (and then a summary) to clients as they come in."""
+    passed = failed = 0
+    for _, result in results:
+      if result.failed:
+        failed += 1
+      else:
+        passed += 1
+      self._send(clients, {'type': 'result', 'result': result.to_dict()})
+    self._send(clients, {
+        'type': 'done', 'passed': passed, 'failed': failed,
+        'changed': sorted(changed_files), 'errors': self.errors})
+    self.errors = []
+
+  def _send(self, clients, message):
+    """Sends a message to clients, disconnecting the ones that went away."""
+    for client in list(clients):
+      try:
+        client.send(message)
+      except socket.error:
+        self._disconnect(client)
+
+  def _disconnect(self, client):
+    """Forgets about a client and closes its connection."""
+    for clients in (self.clients, self.watchers):
+      if client in clients:
+        clients.remove(client)
+    client.close()
+
+  def close(self):
+    """Tears down the test runs and stops listening."""
+    try:
+      for test_run in self.test_runs.values():
+        self.test_runner.teardown_test_run(test_run)
+    finally:
+      self.test_runs.clear()
+      for client in list(self.clients):
+        self._disconnect(client)
+      self.listener.close()
+
+
+class Client(object):
+  """Thin client that asks a daemon to run tests and gets the results."""
+
+  def __init__(self, address):
+    """Initializes a new instance of a Client.
+
+    Args:
+      address: ((string, int)) The host and port of the daemon.
+    """
+    self.connection = distributed.MessageConnection(
+        socket.create_connection(address))
+
+  def run(self, selection_expression=None):
+    """Runs test cases and yields the messages (results, then the summary).
+
+    Args:
+      selection_expression: (string) Selects the test cases to run.
+
+    Yields:
+      dict: The result messages, followed by the done (or error) message.
+    """
+    self.connection.send({'type': 'run', 'selection': selection_expression})
+    while True:
+      message = self.connection.receive()
+      if not message:
+        return
+      yield message
+      if message['type'] in ('done', 'error'):
+        return
+
+  def watch(self):
+    """Starts watching the re-runs that the daemon does after changes.
+
+    Returns:
+      generator: Yields the messages of every re-run until the daemon goes away.
+    """
+    self.connection.send({'type': 'watch'})
+    message = self.connection.receive()
+    if not message or message['type'] != 'watching':
+      raise distributed.ProtocolError('the daemon did not start watching')
+    return self._receive_forever()
+
+  def _receive_forever(self):
+    """Yields the messages from the daemon until it goes away."""
+    while True:
+      message = self.connection.receive()
+      if not message:
+        return
+      yield message
+
+  def stop(self):
+    """Asks the daemon to shut down."""
+    self.connection.send({'type': 'stop'})
+
+  def close(self):
+    self.connection.close()
+
+
+def format_message(message):
+  """Formats a message from the daemon for the console."""
+  if message['type'] == 'result':
+    result = message['result']
+    line = '%-8s %s' % (result['status'], result['full_name'])
+    if result.get('duration') is not None:
+      line += ' (%.3fs)' % result['duration']
+    if result.get('traceback'):
+      line += '\n' + result['traceback']
+    return line
+  if message['type'] == 'done':
+    lines = list(message['errors'])
+    lines.append('%d passed, %d failed' % (message['passed'],
+                                           message['failed']))
+    return '\n'.join(lines)
+  return 'error: %s' % message.get('message')
+
+
+def main(argv=None):
+  """Serves test modules, or asks a running daemon to run them.
+
+  Args:
+    argv: ([string]) The command line arguments (defaults to sys.argv[1:]).
+
+  Returns:
+    int: The exit code.
+  """
+  parser = argparse.ArgumentParser(
+      description='Keeps Checkers test runs warm and re-runs them on changes.')
+  parser.add_argument('command', choices=['serve', 'run', 'watch', 'stop'])
+  parser.add_argument('arguments', nargs='*',
+                      help='The test modules (serve) or a selection (run).')
+  parser.add_argument('--host', default='127.0.0.1')
+  parser.add_argument('--port', type=int, default=7100)
+  args = parser.parse_args(argv)
+  address = (args.host, args.port)
+  if args.command == 'serve':
+    daemon = Daemon(args.arguments, address)
+    try:
+      daemon.load()
+      print 'serving %s on %s:%d' % (', '.join(args.arguments), args.host,
+                                     daemon.address[1])
+      sys.stdout.flush()
+      daemon.serve_forever()
+    finally:
+      daemon.close()
+    return 0
+  client = Client(address)
+  try:
+    if args.command == 'stop':
+      client.stop()
+      return 0
+    if args.command == 'watch':
+      messages = client.watch()
+    else:
+      messages = client.run(' '.join(args.arguments) or None)
+    exit_code = 0
+    for message in messages:
+      print format_message(message)
+      sys.stdout.flush()
+      if message['type'] == 'error' or message.get('failed'):
+        exit_code = 1
+    return exit_code
+  finally:
+    client.close()
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,591 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Discovers the tests in a directory tree, with a cached manifest.
+
+Discovery walks a directory tree for test files, imports each test module in a
+worker process (so the modules and their dependencies are imported in parallel,
+and don't end up in the discovering process) and records a manifest of the
+tests in it: their names, suites and parameterizations.
+
+The manifests are cached in a file, keyed by the module's path and validated
+by its modification time and, if that changed, the hash of its contents. The
+test cases of unchanged modules can then be listed, selected (see select) and
+sharded (see to_plan) without importing the modules at all. Modules that failed
+to import aren't cached, and listing their test cases raises a DiscoveryError.
+
+Discovery can also be static: the source of each test module is parsed (with
+ast) instead of imported, so none of its code (or its dependencies) runs. This
+works for tests defined with the Checkers decorators and literal arguments:
+
+  @checkers.test_suites('math')
+  @checkers.parameterize({'one': {'x': 1, 'test_suites': ['small']}})
+  @checkers.test
+  def test_add(x):
+
+Modules that use Checkers in any other way (e.g. parameterizations computed at
+import time, or tests created by calling checkers.test) are imported instead.
+
+Note that a manifest only describes what the module itself defines; tests and
+parameterizations added to a test run by other code aren't part of it.
+"""
+
+import ast
+import fnmatch
+import hashlib
+import imp
+import importlib
+import multiprocessing
+import os
+import sys
+import traceback
+
+import json_files
+import modules
+import plan
+import selection
+
+# Version of the manifest cache file format (see json_files).
+CACHE_VERSION = 1
+
+_GLOBAL_SUITE_NAME = 'all'
+
+
+class DiscoveryError(Exception):
+  """Error raised when listing the test cases of modules that failed to import.
+  """
+
+  def __init__(self, manifests):
+    """Initializes a new instance of a DiscoveryError.
+
+    Args:
+      manifests: ([ModuleManifest]) The manifests of the modules that failed.
+    """
+    super(DiscoveryError, self).__init__(
+        'importing %d test module(s) failed: %s' % (
+            len(manifests), ', '.join(m.path for m in manifests)))
+    self.manifests = manifests
+
+
+def find_test_files(root, pattern='*_test.py'):
+  """Finds the test files in a directory tree.
+
+  Hidden directories (whose names start with '.') are skipped.
+
+  Args:
+    root: (string) The directory to search.
+    pattern: (string) Glob that the names of test files match.
+
+  Returns:
+    [string]: The absolute paths of the test files, sorted.
+  """
+  test_files = []
+  for directory, directory_names, file_names in os.walk(os.path.abspath(root)):
+    directory_names[:] = [d for d in directory_names if not d.startswith('.')]
+    for file_name in fnmatch.filter(file_names, pattern):
+      test_files.append(os.path.join(directory, file_name))
+  return sorted(test_files)
+
+
+def module_name_for_path(file_path):
+  """Works out the name a source file is imported with.
+
+  Args:
+    file_path: (string) The path of the source file.
+
+  Returns:
+    (string, string): The module name and the directory that has to be on the
+        path to import it (the first directory above all of its packages).
+  """
+  directory, file_name = os.path.split(os.path.abspath(file_path))
+  parts = [os.path.splitext(file_name)[0]]
+  while os.path.exists(os.path.join(directory, '__init__.py')):
+    directory, package = os.path.split(directory)
+    parts.insert(0, package)
+  return '.'.join(parts), directory
+
+
+def file_hash(file_path):
+  """Gets the hex SHA-1 of a file's contents."""
+  with open(file_path, 'rb') as f:
+    return hashlib.sha1(f.read()).hexdigest()
+
+
+class ModuleManifest(object):
+  """Describes the tests that a test module defines."""
+
+  def __init__(self, path, module_name, mtime, sha1, tests=None, error=None):
+    """Initializes a new instance of a ModuleManifest.
+
+    Args:
+      path: (string) The path of the module's source file.
+      module_name: (string) The name the module is imported with.
+      mtime: (float) The modification time of the source file.
+      sha1: (string) The hash of the source file.
+      tests: ([dict]) Each test's full_name, name, suites and parameterizations
+          (a list of [name, suites] pairs).
+      error: (string) The error that importing the module raised (if any).
+    """
+    self.path = path
+    self.module_name = module_name
+    self.mtime = mtime
+    self.sha1 = sha1
+    self.tests = tests if tests else []
+    self.error = error
+
+  def candidates(self):
+    """Describes the test cases of the module's tests.
+
+    Returns:
+      [(dict, CaseCandidate)]: The tests and candidates, in generation order.
+    """
+    candidates = []
+    for test in self.tests:
+      suite_names = set(test['suites'])
+      suite_names.add(_GLOBAL_SUITE_NAME)
+      if not test['parameterizations']:
+        candidates.append((test, selection.CaseCandidate(
+            test['name'], test['full_name'], test['full_name'], None,
+            suite_names)))
+      for name, suites in test['parameterizations']:
+        candidates.append((test, selection.CaseCandidate(
+            '%s_%s' % (test['name'], name),
+            '%s_%s' % (test['full_name'], name), test['full_name'], name,
+            suite_names | set(suites))))
+    return candidates
+
+  def to_dict(self):
+    return {
+        'path': self.path,
+        'module_name': self.module_name,
+        'mtime': self.mtime,
+        'sha1': self.sha1,
+        'tests': self.tests,
+        'error': self.error,
+    }
+
+  @staticmethod
+  def from_dict(source):
+    return ModuleManifest(source['path'], source['module_name'],
+                          source['mtime'], source['sha1'], source['tests'],
+                          source.get('error'))
+
+
+def _same_source(module_file, file_path):
+  """Whether a module's __file__ is a source file (or compiled from it)."""
+  return (os.path.splitext(os.path.realpath(module_file))[0] ==
+          os.path.splitext(os.path.realpath(file_path))[0])
+
+
+def _load_module(module_name, file_path):
+  """Imports a module from its source file.
+
+  Unlike importing it by name, this loads the given file even if a module of the
+  same name is already imported (e.g. a module from another directory that was
+  scanned by the same worker process, or one that was imported before the
+  worker process was forked).
+
+  Args:
+    module_name: (string) The name the module is imported with.
+    file_path: (string) The path of the module's source file.
+
+  Returns:
+    module: The module.
+
+  Raises:
+    ImportError: The module (or its package) was loaded from another file.
+  """
+  package_name, _, name = module_name.rpartition('.')
+  package = None
+  if package_name:
+    package = importlib.import_module(package_name)
+    if not _same_source(package.__file__,
+                        os.path.join(os.path.dirname(file_path), '__init__')):
+      raise ImportError('package %s was imported from %s, not from %s' % (
+          package_name, package.__file__, os.path.dirname(file_path)))
+  sys.modules.pop(module_name, None)
+  module = imp.load_source(module_name, file_path)
+  if not _same_source(module.__file__, file_path):
+    raise ImportError('module %s was loaded from %s, not from %s' % (
+        module_name, module.__file__, file_path))
+  if package:
+    # Like importing the module does (so "from package import name" finds it).
+    setattr(package, name, module)
+  return module
+
+
+def scan_module(file_path):
+  """Imports a test module and creates its manifest.
+
+  This is what the discovery worker processes run. The module is loaded from
+  its file (see _load_module), so the manifest describes that file even if the
+  worker already imported a module of the same name.
+
+  Args:
+    file_path: (string) The path of the test module's source file.
+
+  Returns:
+    dict: The manifest of the module (see ModuleManifest.to_dict).
+  """
+  module_name, import_directory = module_name_for_path(file_path)
+  manifest = ModuleManifest(file_path, module_name,
+                            os.path.getmtime(file_path), file_hash(file_path))
+  if import_directory not in sys.path:
+    sys.path.insert(0, import_directory)
+  try:
+    module = _load_module(module_name, file_path)
+    for test in modules.tests_from_module(module).values():
+      manifest.tests.append({
+          'full_name': test.full_name,
+          'name': test.name,
+          'suites': sorted(test.test_suite_names),
+          'parameterizations': [
+              [p.name, sorted(p.suites)]
+              for p in test.decorator_parameterizations.values()],
+      })
+  except Exception:  # pylint: disable=broad-except
+    manifest.error = traceback.format_exc()
+  return manifest.to_dict()
+
+
+# Checkers functions that create tests or change which test cases they have.
+_TEST_FUNCTIONS = frozenset(['test', 'test_suites', 'parameterize',
+                             'FunctionTest'])
+# Decorators that don't change which test cases a test has.
+_NEUTRAL_DECORATORS = frozenset(['setup', 'teardown', 'timeout'])
+
+
+class _NotStatic(Exception):
+  """Raised when a module's tests can't be found without importing it."""
+  pass
+
+
+class _StaticScanner(object):
+  """Finds the tests of a module in its syntax tree."""
+
+  def __init__(self, tree):
+    self.tree = tree
+    # Names that refer to the checkers package in the module.
+    self.package_names = set()
+    # Names that refer to checkers functions, mapped to the function names.
+    self.function_names = {}
+    # Number of references to checkers functions that were understood.
+    self.understood = 0
+
+  def _checkers_function(self, node):
+    """Gets the name of the checkers function that a node refers to (if any)."""
+    if isinstance(node, ast.Call):
+      node = node.func
+    if (isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and
+        node.value.id in self.package_names):
+      return node.attr
+    if isinstance(node, ast.Name):
+      return self.function_names.get(node.id)
+    return None
+
+  def _find_imports(self):
+    for node in self.tree.body:
+      if isinstance(node, ast.Import):
+        for alias in node.names:
+          if alias.name == 'checkers':
+            self.package_names.add(alias.asname or alias.name)
+      elif isinstance(node, ast.ImportFrom) and node.module == 'checkers':
+        for alias in node.names:
+          self.function_names[alias.asname or alias.name] = alias.name
+
+  def _count_references(self):
+    """Counts the references to the test functions anywhere in the module."""
+    references = 0
+    for node in ast.walk(self.tree):
+      if isinstance(node, (ast.Attribute, ast.Name)):
+        if self._checkers_function(node) in _TEST_FUNCTIONS:
+          references += 1
+    return references
+
+  def _literal(self, node):
+    try:
+      return ast.literal_eval(node)
+    except ValueError:
+      raise _NotStatic()
+
+  def _parameterizations(self, decorator):
+    """Gets the [name, suites] pairs of a parameterize decorator."""
+    if len(decorator.args) != 1 or decorator.keywords or decorator.starargs:
+      raise _NotStatic()
+    argument = decorator.args[0]
+    if not isinstance(argument, ast.Dict):
+      raise _NotStatic()
+    suites = {}
+    for key, value in zip(argument.keys, argument.values):
+      if not isinstance(key, ast.Str) or not isinstance(value, ast.Dict):
+        raise _NotStatic()
+      suites[key.s] = []
+      for variable, variable_value in zip(value.keys, value.values):
+        if not isinstance(variable, ast.Str):
+          raise _NotStatic()
+        if variable.s == 'test_suites':
+          suites[key.s] = sorted(self._literal(variable_value))
+    # Iterating over the dict gives the same order as the parameterize
+    # decorator does when the module is imported.
+    return [[name, suites[name]] for name in suites]
+
+  def _test(self, module_name, function):
+    """Describes the test of a decorated function (None if it isn't a test)."""
+    decorators = [self._checkers_function(d) for d in function.decorator_list]
+    if not decorators or decorators[-1] != 'test':
+      if any(decorators):
+        raise _NotStatic()
+      return None
+    test = {
+        'full_name': '%s.%s' % (module_name, function.name),
+        'name': function.name,
+        'suites': set(),
+        'parameterizations': [],
+    }
+    # Decorators are applied from the bottom up.
+    for name, decorator in reversed(zip(decorators, function.decorator_list)):
+      if name in _TEST_FUNCTIONS:
+        self.understood += 1
+      if (name in ('test_suites', 'parameterize') and
+          not isinstance(decorator, ast.Call)):
+        raise _NotStatic()
+      if name == 'test':
+        if isinstance(decorator, ast.Call):
+          raise _NotStatic()
+      elif name == 'test_suites':
+        if decorator.keywords or decorator.starargs:
+          raise _NotStatic()
+        test['suites'].update(self._literal(arg) for arg in decorator.args)
+      elif name == 'parameterize':
+        known = set(p[0] for p in test['parameterizations'])
+        test['parameterizations'].extend(
+            p for p in self._parameterizations(decorator) if p[0] not in known)
+      elif name not in _NEUTRAL_DECORATORS:
+        raise _NotStatic()
+    test['suites'] = sorted(test['suites'])
+    return test
+
+  def scan(self, module_name):
+    """Finds the tests of the module.
+
+    Returns:
+      [dict]: The tests, like the ones in a ModuleManifest.
+
+    Raises:
+      _NotStatic: Checkers is used in a way that isn't understood.
+    """
+    self._find_imports()
+    tests = []
+    for node in self.tree.body:
+      if isinstance(node, ast.FunctionDef):
+        test = self._test(module_name, node)
+        if test:
+          tests.append(test)
+    if self.understood != self._count_references():
+      raise _NotStatic()
+    return sorted(tests, key=lambda test: test['name'])
+
+
+def scan_module_statically(file_path):
+  """Creates the manifest of a test module without importing it.
+
+  Args:
+    file_path: (string) The path of the test module's source file.
+
+  Returns:
+    dict: The manifest of the module (see ModuleManifest.to_dict), or None if
+        the module has to be imported to find its tests.
+  """
+  module_name, _ = module_name_for_path(file_path)
+  with open(file_path, 'rb') as f:
+    source = f.read()
+  try:
+    tests = _StaticScanner(ast.parse(source, file_path)).scan(module_name)
+  except (_NotStatic, SyntaxError):
+    return None
+  return ModuleManifest(file_path, module_name, os.path.getmtime(file_path),
+                        hashlib.sha1(source).hexdigest(), tests).to_dict()
+
+
+class DiscoveryCache(object):
+  """Cache of module manifests, keyed by the path of the module."""
+
+  def __init__(self, file_path=None):
+    """Initializes a new instance of a DiscoveryCache.
+
+    Args:
+      file_path: (string) The file the cache is loaded from and saved to (None
+          keeps the cache in memory).
+    """
+    self.file_path = file_path
+    self.manifests = {}
+    if file_path and os.path.exists(file_path):
+      self.load()
+
+  def lookup(self, file_path):
+    """Gets the cached manifest of a module if the module hasn't changed.
+
+    Args:
+      file_path: (string) The path of the module's source file.
+
+    Returns:
+      ModuleManifest: The cached manifest (None if it's missing or stale).
+    """
+    manifest = self.manifests.get(file_path)
+    if not manifest:
+      return None
+    mtime = os.path.getmtime(file_path)
+    if manifest.mtime != mtime:
+      if manifest.sha1 != file_hash(file_path):
+        return None
+      manifest.mtime = mtime
+    return manifest
+
+  def store(self, manifest):
+    """Caches a manifest (unless importing the module failed)."""
+    if not manifest.error:
+      self.manifests[manifest.path] = manifest
+
+  def load(self):
+    """Loads the manifests from the cache file (if it's a supported version)."""
+    source = json_files.load(self.file_path, CACHE_VERSION)
+    if source:
+      self.manifests = dict(
+          (m['path'], ModuleManifest.from_dict(m)) for m in source['modules'])
+
+  def save(self):
+    """Saves the manifests to the cache file (if the cache has one)."""
+    if not self.file_path:
+      return
+    json_files.save(self.file_path, CACHE_VERSION, {
+        'modules': [self.manifests[p].to_dict()
+                    for p in sorted(self.manifests)],
+    })
+
+
+def discover(root, pattern='*_test.py', cache=None, processes=None,
+             static=False):
+  """Discovers the tests of the test modules in a directory tree.
+
+  Only the modules that aren't in the cache (or changed since they were cached)
+  are scanned. They are imported in a pool of worker processes, unless static
+  discovery can find their tests.
+
+  Args:
+    root: (string) The directory to search.
+    pattern: (string) Glob that the names of test files match.
+    cache: (DiscoveryCache) Cached manifests; it is updated and saved.
+    processes: (int) The number of worker processes (defaults to the CPU count).
+    static: (bool) Parse the modules instead of importing them when possible.
+
+  Returns:
+    [ModuleManifest]: The manifests of the test modules, sorted by path.
+  """
+  cache = cache if cache else DiscoveryCache()
+  manifests = {}
+  stale = []
+  for file_path in find_test_files(root, pattern):
+    manifest = cache.lookup(file_path)
+    if not manifest and static:
+      source = scan_module_statically(file_path)
+      if source:
+        manifest = ModuleManifest.from_dict(source)
+        cache.store(manifest)
+    if manifest:
+      manifests[file_path] = manifest
+    else:
+      stale.append(file_path)
+  if stale:
+    pool = multiprocessing.Pool(min(processes or multiprocessing.cpu_count(),
+                                    len(stale)))
+    try:
+      for source in pool.map(scan_module, stale):
+        manifest = ModuleManifest.from_dict(source)
+        cache.store(manifest)
+        manifests[manifest.path] = manifest
+    finally:
+      pool.close()
+      pool.join()
+  cache.save()
+  return [manifests[p] for p in sorted(manifests)]
+
+
+def _check_errors(manifests):
+  """Raises a DiscoveryError if any of the modules failed to import."""
+  failed = [manifest for manifest in manifests if manifest.error]
+  if failed:
+    raise DiscoveryError(failed)
+
+
+def select(manifests, selection_expression=None):
+  """Lists the (selected) test cases of discovered modules.
+
+  Args:
+    manifests: ([ModuleManifest]) The manifests of the modules.
+    selection_expression: (string|Selector) Selects the test cases to list
+        (None lists all of them).
+
+  Returns:
+    [CaseCandidate]: The selected test cases.
+
+  Raises:
+    DiscoveryError: Some of the modules failed to import (leave out the
+        manifests that have an error to list the test cases of the others).
+  """
+  _check_errors(manifests)
+  selector = None
+  if selection_expression:
+    selector = selection.to_selector(selection_expression)
+  return [candidate for manifest in manifests
+          for _, candidate in manifest.candidates()
+          if not selector or selector.matches(candidate)]
+
+
+def to_plan(manifests, test_run_name, selection_expression=None, costs=None,
+            default_cost=1.0):
+  """Creates a test plan (which can be sliced) from discovered modules.
+
+  Args:
+    manifests: ([ModuleManifest]) The manifests of the modules.
+    test_run_name: (string) The name of the planned test run.
+    selection_expression: (string|Selector) Selects the test cases to plan.
+    costs: (dict) Estimated seconds per test case, keyed by full name.
+    default_cost: (float) The cost of test cases that aren't in costs.
+
+  Returns:
+    TestPlan: The plan.
+
+  Raises:
+    DiscoveryError: Some of the modules failed to import (leave out the
+        manifests that have an error to plan the test cases of the others).
+  """
+  _check_errors(manifests)
+  selector = None
+  if selection_expression:
+    selector = selection.to_selector(selection_expression)
+  costs = costs if costs else {}
+  cases = []
+  for manifest in manifests:
+    planned_tests = {}
+    for test, candidate in manifest.candidates():
+      if selector and not selector.matches(candidate):
+        continue
+      if test['full_name'] not in planned_tests:
+        planned_tests[test['full_name']] = plan.PlannedTest(
+            test['full_name'], manifest.module_name, test['name'])
+      cases.append(plan.PlannedCase(
+          candidate.full_name, planned_tests[test['full_name']],
+          candidate.parameterization_name, candidate.suite_names,
+          costs.get(candidate.full_name, default_cost)))
+  return plan.TestPlan(test_run_name, cases)
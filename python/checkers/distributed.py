@@ -0,0 +1,429 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Runs the test cases of a single test run on workers on several machines.
+
+A Coordinator hands out the test cases of a test run to the workers that
+connect to it, and collects their results. Each worker builds the same test run
+(usually from the same test module), sets it up, and then repeatedly asks the
+coordinator for the next test case to run until there are none left, so fast
+workers simply end up running more test cases than slow ones.
+
+The coordinator and the workers talk over TCP, one JSON message per line:
+
+  worker -> coordinator  {"type": "hello", "test_run": name, "worker": name}
+  worker -> coordinator  {"type": "result", "result": TestResult.to_dict()}
+  coordinator -> worker  {"type": "case", "full_name": ..., "test": ...,
+                          "parameterization": ...}
+  coordinator -> worker  {"type": "done"}
+  coordinator -> worker  {"type": "error", "message": ...}
+
+Every hello and every result asks for the next test case. Test cases are
+identified by their full name, the full name of their test and the name of
+their parameterization (if they have one).
+
+The coordinator side is a CoordinatorRunner, which can be passed to any runner
+that takes a test runner, e.g.
+
+  coordinator = distributed.Coordinator(('', 7000))
+  pyunit.main(test_runner=distributed.CoordinatorRunner(coordinator))
+
+and each worker runs
+
+  python -m checkers.distributed my_package.my_test coordinator-host:7000
+"""
+
+import argparse
+import importlib
+import json
+import os
+import select
+import socket
+import sys
+import time
+
+import events
+import executors
+import test_result
+import test_run as test_run_module
+import test_runner as test_runner_module
+
+
+class ProtocolError(Exception):
+  """Error raised when a coordinator or worker gets an unexpected message."""
+  pass
+
+
+class MessageConnection(object):
+  """Sends and receives line-delimited JSON messages over a socket."""
+
+  def __init__(self, sock):
+    self.socket = sock
+    self.buffer = ''
+    self.messages = []
+
+  def fileno(self):
+    return self.socket.fileno()
+
+  def send(self, message):
+    self.socket.sendall(json.dumps(message) + '\n')
+
+  def read(self):
+    """Reads what is available and queues the complete messages.
+
+    Returns:
+      bool: False if the other end closed the connection.
+
+    Raises:
+      ProtocolError: The other end sent something that isn't a JSON message.
+    """
+    data = self.socket.recv(65536)
+    if not data:
+      return False
+    self.buffer += data
+    lines = self.buffer.split('\n')
+    self.buffer = lines.pop()
+    for line in lines:
+      if not line:
+        continue
+      try:
+        self.messages.append(json.loads(line))
+      except ValueError:
+        raise ProtocolError('malformed message: %r' % line[:100])
+    return True
+
+  def receive(self):
+    """Blocks until a message arrives (None if the connection was closed)."""
+    while not self.messages:
+      if not self.read():
+        return None
+    return self.messages.pop(0)
+
+  def close(self):
+    self.socket.close()
+
+
+class _WorkerConnection(MessageConnection):
+  """The coordinator's connection to a worker."""
+
+  def __init__(self, sock):
+    super(_WorkerConnection, self).__init__(sock)
+    # The test case that the worker on the other end is running (if any).
+    self.test_case = None
+    self.is_ready = False
+
+
+def case_identifier(test_case):
+  """Creates the message that identifies a test case to a worker.
+
+  Args:
+    test_case: (TestCase) The test case to identify.
+
+  Returns:
+    dict: The case message for the test case.
+  """
+  test_full_name = test_case.test.full_name
+  parameterization_name = None
+  if test_case.full_name != test_full_name:
+    parameterization_name = test_case.full_name[len(test_full_name) + 1:]
+  return {
+      'type': 'case',
+      'full_name': test_case.full_name,
+      'test': test_full_name,
+      'parameterization': parameterization_name,
+  }
+
+
+def _send_quietly(connection, message):
+  """Sends a message, ignoring the errors of a connection that went away."""
+  try:
+    connection.send(message)
+  except socket.error:
+    pass
+
+
+class Coordinator(executors.Executor):
+  """Executor that runs the test cases on the workers that connect to it.
+
+  The coordinator listens as soon as it is created. Workers stay connected
+  between calls to execute, and are told that they are done when the test run
+  is finished. The coordinator keeps listening for the workers of the next
+  test run until it is closed. A worker that can't be sent its next test case
+  is dropped, and the test case goes to another worker.
+  """
+
+  def __init__(self, address=('', 0), idle_timeout=None):
+    """Initializes a new instance of a Coordinator.
+
+    Args:
+      address: ((string, int)) The host and port to listen on (port 0 picks a
+          free port; see the address attribute).
+      idle_timeout: (float) Stop waiting for workers after this many seconds
+          without any of them connecting or reporting a result (None means
+          wait forever). Test cases that didn't run get NOT_RUN results.
+    """
+    super(Coordinator, self).__init__()
+    self.idle_timeout = idle_timeout
+    self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    self.listener.bind(address)
+    self.listener.listen(128)
+    self.address = self.listener.getsockname()
+    self.connections = []
+
+  def execute(self, run_test_case, test_cases, finish_worker=None):
+    self.cancelled = False
+    pending = list(test_cases)
+    pending.reverse()
+    if not pending:
+      return
+    test_run_name = pending[0].context.test_run.name
+    running = set()
+    for connection in list(self.connections):
+      if connection.is_ready and not connection.test_case:
+        if not self._assign(connection, pending, running):
+          self.connections.remove(connection)
+          connection.close()
+    while running or (pending and not self.cancelled):
+      readable, _, _ = select.select(
+          [self.listener] + self.connections, [], [], self.idle_timeout)
+      if not readable:
+        return
+      for ready in readable:
+        if ready is self.listener:
+          sock, _ = self.listener.accept()
+          self.connections.append(_WorkerConnection(sock))
+          continue
+        try:
+          alive = ready.read()
+        except (socket.error, ProtocolError):
+          alive = False
+        while ready.messages:
+          message = ready.messages.pop(0)
+          if message.get('type') == 'hello':
+            if message.get('test_run') != test_run_name:
+              _send_quietly(ready, {'type': 'error', 'message': (
+                  'the coordinator runs %s, not %s' % (
+                      test_run_name, message.get('test_run')))})
+              alive = False
+              break
+            ready.is_ready = True
+          elif message.get('type') == 'result' and ready.test_case:
+            test_case = ready.test_case
+            ready.test_case = None
+            if test_case in running:
+              running.remove(test_case)
+              yield test_case, test_result.TestResult.from_dict(
+                  test_case.context, message['result'])
+          else:
+            _send_quietly(ready, {'type': 'error',
+                                  'message': 'unexpected message'})
+            alive = False
+            break
+          if not self._assign(ready, pending, running):
+            alive = False
+            break
+        if not alive:
+          self.connections.remove(ready)
+          ready.close()
+          if ready.test_case in running:
+            running.remove(ready.test_case)
+            yield ready.test_case, self._lost_result(ready.test_case)
+
+  def _assign(self, connection, pending, running):
+    """Sends the next test case to the worker (if there is one).
+
+    Returns:
+      bool: False if the worker can't be reached (the test case stays pending).
+    """
+    if not pending or self.cancelled:
+      return True
+    test_case = pending[-1]
+    try:
+      connection.send(case_identifier(test_case))
+    except socket.error:
+      return False
+    pending.pop()
+    connection.test_case = test_case
+    running.add(test_case)
+    return True
+
+  def _lost_result(self, test_case):
+    """Creates the result for a test case whose worker went away."""
+    error = test_result.RemoteError(
+        'the worker disconnected while running %s' % test_case.full_name)
+    return test_result.TestResult(
+        test_case.context, test_result.TestResultStatus.ERROR,
+        exc_info=(test_result.RemoteError, error, None))
+
+  def finish(self):
+    """Tells the workers that they are done (but keeps listening)."""
+    for connection in self.connections:
+      _send_quietly(connection, {'type': 'done'})
+      connection.close()
+    self.connections = []
+
+  def close(self):
+    """Tells the workers that they are done and stops listening."""
+    self.finish()
+    self.listener.close()
+
+
+class CoordinatorRunner(test_runner_module.TestRunner):
+  """Test runner that runs the test cases of a test run on remote workers.
+
+  The test run's setup and teardown functions and its fixtures are only used by
+  the workers; the coordinator itself just hands out the test cases. Tearing
+  down a test run tells its workers that they are done, so the runner can run
+  several test runs (each with its own workers). Close the coordinator once
+  the runner is no longer needed.
+  """
+
+  def __init__(self, coordinator, failfast=False, max_failures=None,
+               result_cache=None, baseline=None, gc_policy=None):
+    """Initializes a new instance of a CoordinatorRunner.
+
+    Args:
+      coordinator: (Coordinator) Hands out the test cases to the workers.
+      failfast: (bool) Stop running test cases after the first failure.
+      max_failures: (int) Stop running test cases after this many failures.
+      result_cache: (ResultCache) Skips test cases that passed before and
+          haven't changed since.
+      baseline: (Baseline) Records (or compares) the benchmark timings.
+      gc_policy: (GcPolicy) Collects the garbage collection stats that the
+          workers' GC policies recorded (it isn't applied here).
+    """
+    super(CoordinatorRunner, self).__init__(coordinator, failfast, max_failures,
+                                            result_cache, baseline=baseline,
+                                            gc_policy=gc_policy)
+
+  def setup_test_run(self, test_run, test_cases=None):
+    test_run.events.emit(events.EventType.RUN_START)
+    test_run.events.emit(events.EventType.RUN_SETUP_END)
+
+  def teardown_test_run(self, test_run):
+    test_run.events.emit(events.EventType.RUN_TEARDOWN_START)
+    try:
+      self.executor.finish()
+    finally:
+      try:
+        self.save_indexes()
+      finally:
+        test_run.events.emit(events.EventType.RUN_END)
+
+  def _run_uncached_test_case(self, test_case):
+    # The execution is finished (rather than left suspended) before returning.
+    results = list(self.executor.execute(None, [test_case]))
+    if results:
+      return results[0][1]
+    return self.create_not_run_result(test_case)
+
+
+class Worker(object):
+  """Runs the test cases that the coordinator hands out."""
+
+  def __init__(self, test_run, address, test_runner=None, name=None):
+    """Initializes a new instance of a Worker.
+
+    Args:
+      test_run: (TestRun) The same test run that the coordinator runs.
+      address: ((string, int)) The host and port of the coordinator.
+      test_runner: (TestRunner) Runs the test cases (defaults to a TestRunner).
+      name: (string) The name of the worker (defaults to host:pid).
+    """
+    self.test_run = test_run
+    self.address = address
+    self.test_runner = test_runner
+    if not self.test_runner:
+      self.test_runner = test_runner_module.TestRunner()
+    self.name = name if name else '%s:%d' % (socket.gethostname(), os.getpid())
+
+  def run(self):
+    """Runs test cases until the coordinator says that there are none left.
+
+    Returns:
+      int: The number of test cases that the worker ran.
+
+    Raises:
+      ProtocolError: The coordinator rejected the worker.
+    """
+    test_cases = self.test_run.generate_test_cases
+    connection = MessageConnection(socket.create_connection(self.address))
+    test_cases_run = 0
+    try:
+      # Any of the test cases may be handed out, so the fixture values are
+      # torn down once all of the test cases that use them ran (or at the end).
+      self.test_runner.setup_test_run(self.test_run, test_cases.values())
+      try:
+        connection.send({'type': 'hello', 'test_run': self.test_run.name,
+                         'worker': self.name})
+        while True:
+          message = connection.receive()
+          if not message or message.get('type') == 'done':
+            return test_cases_run
+          if message.get('type') != 'case':
+            raise ProtocolError(message.get('message', message))
+          connection.send({'type': 'result',
+                           'result': self._run(test_cases, message)})
+          test_cases_run += 1
+      finally:
+        self.test_runner.teardown_test_run(self.test_run)
+    finally:
+      connection.close()
+
+  def _run(self, test_cases, message):
+    """Runs the identified test case and returns its result as a dict."""
+    full_name = message['full_name']
+    if full_name not in test_cases:
+      return {
+          'full_name': full_name,
+          'status': test_result.TestResultStatus.ERROR,
+          'message': 'worker %s has no test case %s' % (self.name, full_name),
+          'traceback': None,
+      }
+    return self.test_runner.run_test_case(test_cases[full_name]).to_dict()
+
+
+def parse_address(address):
+  """Parses a host:port address."""
+  host, _, port = address.rpartition(':')
+  return host, int(port)
+
+
+def main(argv=None):
+  """Runs a worker for the tests in a module.
+
+  Args:
+    argv: ([string]) The command line arguments (defaults to sys.argv[1:]).
+
+  Returns:
+    int: The exit code.
+  """
+  parser = argparse.ArgumentParser(
+      description='Runs the test cases that a Checkers coordinator hands out.')
+  parser.add_argument('module', help='The module containing the tests.')
+  parser.add_argument('address', help='The host:port of the coordinator.')
+  parser.add_argument('--name', help='The name of the worker.')
+  args = parser.parse_args(argv)
+  test_run = test_run_module.TestRun.from_module(
+      importlib.import_module(args.module))
+  worker = Worker(test_run, parse_address(args.address), name=args.name)
+  start = time.time()
+  test_cases_run = worker.run()
+  print 'ran %d test case(s) in %.2fs' % (test_cases_run, time.time() - start)
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,158 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Lifecycle events of test runs, for instrumentation.
+
+Each test run has an event bus (TestRun.events) that listeners register with.
+Listeners are called with an Event each time something happens in the run:
+
+  RUN_START, RUN_END:  before the test run is set up and after it's torn down.
+  RUN_SETUP_END:       after the test run's setup functions.
+  RUN_TEARDOWN_START:  before the test run's fixtures and teardown functions.
+  CASE_SCHEDULED:      a test case is handed to the executor (or to PyUnit).
+  SETUP_START/END:     around the test case's setup functions.
+  BODY_START/END:      around the test itself.
+  TEARDOWN_START/END:  around the test case's teardown functions.
+  RESULT_RECORDED:     the result of a test case was recorded by the runner.
+
+Example:
+
+  def print_result(event):
+    print event.test_case.full_name, event.result.status
+
+  test_run.events.add_listener(print_result, events.EventType.RESULT_RECORDED)
+
+Listeners are called synchronously, in the thread (and process) where the
+event happens, so with concurrent executors they must be thread-safe, and with
+forking executors the case events happen in the worker processes. Exceptions
+raised by listeners aren't caught, so listeners should not raise.
+
+When nobody listens, emitting an event costs next to nothing: the hot paths
+check the bus's enabled flag before even creating the event.
+"""
+
+import time
+
+import test_result
+
+EventType = test_result.enum(
+    RUN_START='RUN_START',
+    RUN_END='RUN_END',
+    RUN_SETUP_END='RUN_SETUP_END',
+    RUN_TEARDOWN_START='RUN_TEARDOWN_START',
+    CASE_SCHEDULED='CASE_SCHEDULED',
+    SETUP_START='SETUP_START',
+    SETUP_END='SETUP_END',
+    BODY_START='BODY_START',
+    BODY_END='BODY_END',
+    TEARDOWN_START='TEARDOWN_START',
+    TEARDOWN_END='TEARDOWN_END',
+    RESULT_RECORDED='RESULT_RECORDED'
+)
+
+
+class Event(object):
+  """Something that happened during a test run."""
+
+  __slots__ = ('type', 'test_run', 'test_case', 'result', 'time')
+
+  def __init__(self, event_type, test_run, test_case=None, result=None):
+    """Initializes a new instance of an Event.
+
+    Args:
+      event_type: (EventType (string)) What happened.
+      test_run: (TestRun) The test run it happened in.
+      test_case: (TestCase) The test case it happened to (if any).
+      result: (TestResult) The result of the test case (for RESULT_RECORDED).
+    """
+    self.type = event_type
+    self.test_run = test_run
+    self.test_case = test_case
+    self.result = result
+    # When the event happened, in seconds since the epoch (like the phases of
+    # test results, so they can be compared across processes).
+    self.time = time.time()
+
+
+class EventBus(object):
+  """Calls the registered listeners when events are emitted."""
+
+  def __init__(self, test_run=None):
+    """Initializes a new instance of an EventBus.
+
+    Args:
+      test_run: (TestRun) The test run whose events the bus carries.
+    """
+    self.test_run = test_run
+    # Listeners keyed by event type; None holds the listeners of all events.
+    self._listeners = {}
+    # Whether any listener is registered (checked before emitting anything).
+    self.enabled = False
+
+  def add_listener(self, listener, *event_types):
+    """Registers a listener for some (or, if none are given, all) events.
+
+    Args:
+      listener: (function(Event)) The listener.
+      *event_types: (EventType (string)) The events to listen to.
+    """
+    for event_type in event_types or (None,):
+      listeners = self._listeners.setdefault(event_type, [])
+      if listener not in listeners:
+        listeners.append(listener)
+    self.enabled = True
+
+  def remove_listener(self, listener):
+    """Unregisters a listener from all of the events it listens to."""
+    for event_type, listeners in self._listeners.items():
+      if listener in listeners:
+        listeners.remove(listener)
+      if not listeners:
+        del self._listeners[event_type]
+    self.enabled = bool(self._listeners)
+
+  def emit(self, event_type, test_case=None, result=None):
+    """Calls the listeners of an event (if there are any).
+
+    Args:
+      event_type: (EventType (string)) What happened.
+      test_case: (TestCase) The test case it happened to (if any).
+      result: (TestResult) The result of the test case (if any).
+    """
+    if not self.enabled:
+      return
+    listeners = self._listeners.get(event_type, []) + self._listeners.get(
+        None, [])
+    if not listeners:
+      return
+    event = Event(event_type, self.test_run, test_case, result)
+    for listener in listeners:
+      listener(event)
+
+
+def for_test_case(test_case):
+  """Gets the emit function for the events of a test case's test run.
+
+  Args:
+    test_case: (TestCase) The test case.
+
+  Returns:
+    function: The emit function (see EventBus.emit), or None if nobody listens
+        to the events of the test case's test run.
+  """
+  test_run = getattr(test_case.context, 'test_run', None)
+  bus = getattr(test_run, 'events', None)
+  if bus is None or not bus.enabled:
+    return None
+  return bus.emit
@@ -30,10 +30,19 @@ def logging_test_run_teardown(test_run):
   print '#' * 80
 
 
-def register_calculator(context):
+# The calculator is a fixture, so it is injected into each test case's context
+# as the 'calculator' variable. Since it is test run-scoped, it is only created
+# once (right before the first test case that runs) and shared by all of the
+# test cases. Use a narrower scope (like FixtureScope.TEST or CASE) for
+# components that can't be shared that widely.
+def create_calculator(context):
   calc = Calculator()
-  print 'Registering calculator:', context.test_case.name, calc.__class__
-  context.variables.register('calculator', calc)
+  print 'Creating calculator:', context.test_case.name, calc.__class__
+  return calc
+
+
+def dispose_calculator(calc):
+  print 'Disposing calculator:', calc.__class__
 
 
 def logging_test_case_setup(context):
@@ -90,7 +99,9 @@ def create_test_run():
   test_run.setup.register(logging_test_run_setup)
   test_run.teardown.register(logging_test_run_teardown)
   test_run.test_case_setup.register(logging_test_case_setup)
-  test_run.test_case_setup.register(register_calculator)
+  test_run.fixtures.register(checkers.Fixture(
+      'calculator', create_calculator, teardown=dispose_calculator,
+      scope=checkers.FixtureScope.RUN))
   test_run.test_case_teardown.register(logging_test_case_teardown)
   return test_run
 
@@ -0,0 +1,347 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Executors decide how the test cases of a test run are scheduled and run.
+
+An executor takes a function that runs a single test case (usually
+TestRunner.run_test_case) and the test cases to run, and yields the results as
+the test cases complete. Executors can be cancelled, in which case they stop
+starting new test cases; test cases that are already running still complete and
+their results are still yielded.
+
+Executors that run test cases in worker processes also take a function that is
+called in each worker process right before it exits (usually
+TestRunner.finish_worker), so the worker can tear down what it set up.
+"""
+
+import collections
+import multiprocessing
+import os
+import Queue
+import select
+import signal
+import sys
+import threading
+import time
+
+import test_result
+import timeouts
+
+
+class Executor(object):
+  """Base class for executors, which run test cases and yield their results."""
+
+  def __init__(self, concurrency=1):
+    """Initializes a new instance of an Executor.
+
+    Args:
+      concurrency: (int) The number of test cases that may run at once.
+    """
+    self.concurrency = concurrency
+    self.cancelled = False
+
+  @property
+  def process_concurrency(self):
+    """The number of test cases that may run at once in a single process."""
+    return self.concurrency
+
+  def execute(self, run_test_case, test_cases, finish_worker=None):
+    """Runs the test cases and yields their results as they complete.
+
+    Args:
+      run_test_case: (function(TestCase)) Runs a test case, returns its result.
+      test_cases: (iterable) The test cases to run.
+      finish_worker: (function()) Called in worker processes before they exit.
+
+    Yields:
+      (TestCase, TestResult) for each of the test cases that ran.
+    """
+    raise NotImplementedError('The subclass must implement this method.')
+
+  def cancel(self):
+    """Stops running the test cases that haven't been started yet."""
+    self.cancelled = True
+
+
+class SerialExecutor(Executor):
+  """Executor that runs the test cases one after another in this thread."""
+
+  def execute(self, run_test_case, test_cases, finish_worker=None):
+    self.cancelled = False
+    for test_case in test_cases:
+      if self.cancelled:
+        return
+      yield test_case, run_test_case(test_case)
+
+
+class ThreadPoolExecutor(Executor):
+  """Executor that runs the test cases in parallel on a pool of threads."""
+
+  def __init__(self, threads):
+    """Initializes a new instance of a ThreadPoolExecutor.
+
+    Args:
+      threads: (int) The number of threads (and test cases run in parallel).
+    """
+    super(ThreadPoolExecutor, self).__init__(threads)
+
+  def execute(self, run_test_case, test_cases, finish_worker=None):
+    self.cancelled = False
+    pending = Queue.Queue()
+    for test_case in test_cases:
+      pending.put(test_case)
+    completed = Queue.Queue()
+
+    def worker():
+      try:
+        while not self.cancelled:
+          try:
+            test_case = pending.get_nowait()
+          except Queue.Empty:
+            return
+          try:
+            result = run_test_case(test_case)
+          except Exception:  # pylint: disable=broad-except
+            result = test_result.TestResult(
+                test_case.context, test_result.TestResultStatus.ERROR,
+                exc_info=sys.exc_info())
+          completed.put((test_case, result))
+      finally:
+        completed.put(None)
+
+    threads = []
+    for i in xrange(self.concurrency):
+      thread = threading.Thread(target=worker, name='checkers-worker-%d' % i)
+      thread.daemon = True
+      thread.start()
+      threads.append(thread)
+    try:
+      running = len(threads)
+      while running:
+        item = completed.get()
+        if item is None:
+          running -= 1
+          continue
+        yield item
+    finally:
+      # If the caller stopped consuming results, don't start anything new.
+      self.cancelled = True
+      for thread in threads:
+        thread.join()
+
+
+def _run_safely(run_test_case, test_case):
+  """Runs the test case, turning unexpected exceptions into ERROR results."""
+  try:
+    return run_test_case(test_case)
+  except Exception:  # pylint: disable=broad-except
+    return test_result.TestResult(
+        test_case.context, test_result.TestResultStatus.ERROR,
+        exc_info=sys.exc_info())
+
+
+class _ForkedWorker(object):
+  """The parent's view of a forked worker process."""
+
+  def __init__(self, pid, connection):
+    self.pid = pid
+    self.connection = connection
+    # Index of the test case the worker is running (None if it's idle).
+    self.index = None
+    self.deadline = None
+    self.test_cases_run = 0
+
+
+class ForkExecutor(Executor):
+  """Executor that runs the test cases in forked worker processes.
+
+  The workers are forked after the test run has been set up, so they inherit
+  everything the test run's setup functions loaded (modules, data sets, etc.)
+  and share that memory with the parent copy-on-write instead of each loading
+  their own copy. The parent hands out test cases one at a time and collects
+  their results.
+
+  Workers can be replaced with freshly forked ones after running a number of
+  test cases, which caps how far their memory can drift from the parent's.
+
+  A worker whose test case timed out is replaced (the hung thread would
+  otherwise keep running in it). If a worker doesn't even report the timeout,
+  e.g. because the test case is stuck in native code, the parent kills it once
+  the test case's timeout (plus a grace period) has passed.
+
+  Note that fixtures and lazy variables are set up separately in each worker.
+  """
+
+  def __init__(self, workers=None, max_test_cases_per_worker=None,
+               timeout_grace=1.0):
+    """Initializes a new instance of a ForkExecutor.
+
+    Args:
+      workers: (int) The number of worker processes (defaults to the CPU count).
+      max_test_cases_per_worker: (int) Replace a worker after it has run this
+          many test cases (None means workers are never replaced).
+      timeout_grace: (float) Seconds a worker gets after a test case's timeout
+          to report it before the worker is killed.
+
+    Raises:
+      NotImplementedError: The platform doesn't support fork.
+    """
+    if not hasattr(os, 'fork'):
+      raise NotImplementedError('fork is not supported on this platform')
+    super(ForkExecutor, self).__init__(
+        workers if workers else multiprocessing.cpu_count())
+    self.max_test_cases_per_worker = max_test_cases_per_worker
+    self.timeout_grace = timeout_grace
+
+  @property
+  def process_concurrency(self):
+    """Each worker process runs one test case at a time."""
+    return 1
+
+  def execute(self, run_test_case, test_cases, finish_worker=None):
+    self.cancelled = False
+    test_cases = list(test_cases)
+    pending = collections.deque(xrange(len(test_cases)))
+    workers = {}
+    try:
+      for _ in xrange(min(self.concurrency, len(pending))):
+        worker = self._fork(run_test_case, test_cases, finish_worker, workers)
+        workers[worker.connection.fileno()] = worker
+      for worker in workers.values():
+        self._assign(worker, pending, test_cases)
+      while workers:
+        busy = [w for w in workers.values() if w.index is not None]
+        if not busy:
+          break
+        deadlines = [w.deadline for w in busy if w.deadline]
+        wait = max(0, min(deadlines) - time.time()) if deadlines else None
+        readable, _, _ = select.select(
+            [w.connection for w in busy], [], [], wait)
+        finished = []
+        for connection in readable:
+          worker = workers[connection.fileno()]
+          test_case = test_cases[worker.index]
+          try:
+            _, source = connection.recv()
+          except (EOFError, IOError):
+            result = self._crash_result(worker, test_case)
+            finished.append(worker)
+          else:
+            result = test_result.TestResult.from_dict(test_case.context, source)
+            worker.test_cases_run += 1
+            if (result.status == test_result.TestResultStatus.TIMEOUT or
+                (self.max_test_cases_per_worker and worker.test_cases_run >=
+                 self.max_test_cases_per_worker)):
+              # The worker exits on its own after reporting the result.
+              finished.append(worker)
+          worker.index = None
+          yield test_case, result
+        now = time.time()
+        for worker in busy:
+          if (worker.index is not None and worker.deadline and
+              worker.deadline < now):
+            test_case = test_cases[worker.index]
+            os.kill(worker.pid, signal.SIGKILL)
+            worker.index = None
+            finished.append(worker)
+            yield test_case, timeouts.create_timeout_result(
+                test_case, timeouts.resolve_timeout(test_case))
+        for worker in finished:
+          self._reap(worker, workers)
+          if pending and not self.cancelled:
+            worker = self._fork(run_test_case, test_cases, finish_worker,
+                                workers)
+            workers[worker.connection.fileno()] = worker
+        for worker in workers.values():
+          if worker.index is None:
+            self._assign(worker, pending, test_cases)
+    finally:
+      for worker in workers.values():
+        if worker.index is not None:
+          os.kill(worker.pid, signal.SIGKILL)
+        self._reap(worker, workers)
+
+  def _assign(self, worker, pending, test_cases):
+    """Gives the worker its next test case (or tells it to exit)."""
+    if not pending or self.cancelled:
+      return
+    worker.index = pending.popleft()
+    worker.deadline = None
+    timeout = timeouts.resolve_timeout(test_cases[worker.index])
+    if timeout:
+      worker.deadline = time.time() + timeout + self.timeout_grace
+    worker.connection.send(worker.index)
+
+  def _crash_result(self, worker, test_case):
+    """Creates the result for a test case whose worker died while running it."""
+    pid, status = os.waitpid(worker.pid, 0)
+    worker.pid = None
+    message = 'worker process %s exited (status %s) while running %s' % (
+        pid, status, test_case.full_name)
+    error = test_result.RemoteError(message)
+    return test_result.TestResult(
+        test_case.context, test_result.TestResultStatus.ERROR,
+        exc_info=(test_result.RemoteError, error, None))
+
+  def _fork(self, run_test_case, test_cases, finish_worker, workers):
+    """Forks a new worker process."""
+    parent_connection, child_connection = multiprocessing.Pipe()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid:
+      child_connection.close()
+      return _ForkedWorker(pid, parent_connection)
+    # This is the worker process.
+    exit_code = 0
+    try:
+      parent_connection.close()
+      for other in workers.values():
+        other.connection.close()
+      self._work(child_connection, run_test_case, test_cases, finish_worker)
+    except BaseException:  # pylint: disable=broad-except
+      exit_code = 1
+    finally:
+      sys.stdout.flush()
+      sys.stderr.flush()
+      os._exit(exit_code)  # pylint: disable=protected-access
+
+  def _work(self, connection, run_test_case, test_cases, finish_worker):
+    """Runs test cases in the worker process until it's time to exit."""
+    test_cases_run = 0
+    try:
+      while True:
+        try:
+          index = connection.recv()
+        except EOFError:
+          return
+        result = _run_safely(run_test_case, test_cases[index])
+        connection.send((index, result.to_dict()))
+        test_cases_run += 1
+        if result.status == test_result.TestResultStatus.TIMEOUT:
+          return
+        if (self.max_test_cases_per_worker and
+            test_cases_run >= self.max_test_cases_per_worker):
+          return
+    finally:
+      if finish_worker:
+        finish_worker()
+
+  def _reap(self, worker, workers):
+    """Closes the connection to a worker and waits for it to exit."""
+    workers.pop(worker.connection.fileno(), None)
+    worker.connection.close()
+    if worker.pid:
+      os.waitpid(worker.pid, 0)
+      worker.pid = None
@@ -0,0 +1,482 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Fixtures provide (possibly expensive) components to test cases.
+
+A fixture has a name, a setup function that creates its value and an optional
+teardown function that disposes of the value. The value is injected into each
+test case's context variables under the fixture's name, so tests can simply
+take it as an argument.
+
+The fixture's scope determines how widely its value is shared:
+
+  RUN     One value for the whole test run.
+  SUITE   One value per test suite. Fixtures registered with a test run belong
+          to the run's global suite (which contains all test cases), so they
+          are effectively run-scoped; fixtures registered with a TestSuite are
+          shared by the test cases in that suite.
+  MODULE  One value per module that tests are defined in.
+  TEST    One value per test, shared by all of its parameterizations.
+  CASE    One value per test case.
+
+The value is set up right before the first test case in the scope runs, and torn
+down right after the last test case in the scope finishes (or when the test run
+finishes, whichever comes first). Fixtures are set up from the widest scope to
+the narrowest (test run fixtures before suite fixtures within the same scope),
+before any of the test case's setup functions are called. They are torn down in
+the reverse order, after the test case's teardown functions.
+
+Example:
+
+  test_run.fixtures.register(checkers.Fixture(
+      'database', create_database, teardown=drop_database,
+      scope=checkers.FixtureScope.RUN))
+
+  @checkers.test
+  def test_query(database):
+    ...
+
+Fixtures are set up for every test case in their scope, whether the test case
+uses them or not. Components that only some of the tests use can be registered
+as lazy variables instead. A lazy variable's factory is only called when a test
+case first accesses the variable (e.g. because the test takes it as an
+argument). The value is memoized for the variable's scope and torn down when
+that scope ends, just like a fixture's value:
+
+  test_run.variables.register('database', checkers.LazyVariable(
+      create_database, teardown=drop_database))
+
+Components that are too expensive to create for each test case, but that can't
+safely be shared by test cases either, can be registered as component pools. A
+pool holds a number of instances. Each test case that accesses the variable
+checks out its own instance, and when the test case finishes the instance is
+reset (using the pool's reset function) and returned to the pool for the next
+test case. By default, the pool holds as many instances as the executor runs
+test cases at once, so test cases never wait for an instance:
+
+  test_run.variables.register('database', checkers.ComponentPool(
+      create_database, reset=truncate_tables, teardown=drop_database))
+"""
+
+import collections
+import inspect
+import sys
+import threading
+
+import test_result
+
+FixtureScope = test_result.enum(
+    RUN='RUN',
+    SUITE='SUITE',
+    MODULE='MODULE',
+    TEST='TEST',
+    CASE='CASE'
+)
+
+# Scopes ordered from the widest to the narrowest.
+_SCOPE_ORDER = (
+    FixtureScope.RUN,
+    FixtureScope.SUITE,
+    FixtureScope.MODULE,
+    FixtureScope.TEST,
+    FixtureScope.CASE,
+)
+
+_GLOBAL_SUITE_NAME = 'all'
+
+
+def call_with_optional_context(function, context):
+  """Calls the function with the context if it takes an argument.
+
+  Args:
+    function: (function) The function to call.
+    context: (Context) The context to pass if the function takes arguments.
+
+  Returns:
+    Whatever the function returns.
+  """
+  if inspect.getargspec(function).args:
+    return function(context)
+  return function()
+
+
+class UnresolvedVariableError(Exception):
+  """Error raised when a lazy variable is accessed with no fixture manager."""
+  pass
+
+
+class Fixture(object):
+  """A fixture sets up a value shared by the test cases in its scope."""
+
+  def __init__(self, name, setup, teardown=None, scope=FixtureScope.CASE):
+    """Initializes a new instance of a Fixture.
+
+    Args:
+      name: (string) The name of the variable the value is injected as.
+      setup: (function([context])) Creates the value; takes an optional context
+          (the context of the first test case in the scope).
+      teardown: (function(value)) Disposes of the value.
+      scope: (FixtureScope (string)) How widely the value is shared.
+    """
+    if scope not in _SCOPE_ORDER:
+      raise ValueError('unknown fixture scope <%s>' % scope)
+    self.name = name
+    self.setup = setup
+    self.teardown = teardown
+    self.scope = scope
+
+
+class LazyVariable(object):
+  """A variable whose value is only created once a test case accesses it."""
+
+  def __init__(self, factory, teardown=None, scope=FixtureScope.RUN):
+    """Initializes a new instance of a LazyVariable.
+
+    Args:
+      factory: (function([context])) Creates the value; takes an optional
+          context (the context of the first test case that accesses it).
+      teardown: (function(value)) Disposes of the value.
+      scope: (FixtureScope (string)) How widely the value is shared.
+    """
+    if scope not in _SCOPE_ORDER:
+      raise ValueError('unknown variable scope <%s>' % scope)
+    self.setup = factory
+    self.teardown = teardown
+    self.scope = scope
+
+
+class ComponentPool(LazyVariable):
+  """A pool of reusable components, checked out by one test case at a time."""
+
+  def __init__(self, factory, reset=None, teardown=None, size=None):
+    """Initializes a new instance of a ComponentPool.
+
+    Args:
+      factory: (function([context])) Creates a new instance; takes an optional
+          context (the context of the test case the instance is created for).
+      reset: (function(instance)) Restores an instance to a clean state after a
+          test case used it. Instances that fail to reset are torn down.
+      teardown: (function(instance)) Disposes of an instance.
+      size: (int) The maximum number of instances (per process). Defaults to
+          the number of test cases the executor runs at once in a process.
+    """
+    super(ComponentPool, self).__init__(factory, teardown=teardown,
+                                        scope=FixtureScope.CASE)
+    self.reset = reset
+    self.size = size
+    self._capacity = size
+    self._condition = threading.Condition(threading.Lock())
+    self._instances = []
+    self._available = []
+    # Number of instances that exist or are being created.
+    self._count = 0
+
+  def open(self, concurrency=None):
+    """Prepares the pool for a test run.
+
+    Args:
+      concurrency: (int) The number of test cases that may run at once, which
+          is used as the pool's size unless it has an explicit size.
+    """
+    self._capacity = self.size if self.size else concurrency
+
+  def check_out(self, context=None):
+    """Takes an idle instance from the pool, creating one if there's room.
+
+    If all of the instances are in use and the pool is full, this waits until
+    another test case returns its instance.
+
+    Args:
+      context: (Context) The context of the test case that needs an instance.
+
+    Returns:
+      An instance of the component.
+    """
+    with self._condition:
+      while not self._available:
+        if not self._capacity or self._count < self._capacity:
+          self._count += 1
+          break
+        self._condition.wait()
+      else:
+        return self._available.pop()
+    try:
+      instance = call_with_optional_context(self.setup, context)
+    except Exception:
+      with self._condition:
+        self._count -= 1
+        self._condition.notify()
+      raise
+    with self._condition:
+      self._instances.append(instance)
+    return instance
+
+  def check_in(self, instance):
+    """Resets an instance and returns it to the pool.
+
+    Args:
+      instance: The instance that a test case is done with.
+
+    Raises:
+      Exception: The reset function failed (the instance is torn down).
+    """
+    try:
+      if self.reset:
+        self.reset(instance)
+    except Exception:
+      exc_info = sys.exc_info()
+      self._discard(instance)
+      raise exc_info[0], exc_info[1], exc_info[2]
+    with self._condition:
+      self._available.append(instance)
+      self._condition.notify()
+
+  def close(self):
+    """Tears down all of the pool's instances.
+
+    Raises:
+      Exception: The first exception raised by the teardown function.
+    """
+    with self._condition:
+      instances = list(self._instances)
+    exc_info = None
+    for instance in instances:
+      try:
+        self._discard(instance)
+      except Exception:  # pylint: disable=broad-except
+        if not exc_info:
+          exc_info = sys.exc_info()
+    if exc_info:
+      raise exc_info[0], exc_info[1], exc_info[2]
+
+  def _discard(self, instance):
+    """Removes an instance from the pool and tears it down."""
+    with self._condition:
+      if instance in self._available:
+        self._available.remove(instance)
+      if instance in self._instances:
+        self._instances.remove(instance)
+      self._count -= 1
+      self._condition.notify()
+    if self.teardown:
+      self.teardown(instance)
+
+
+def scope_key(scope, test_case, suite=None):
+  """Gets the key identifying the scope instance that a test case belongs to.
+
+  Args:
+    scope: (FixtureScope (string)) The scope.
+    test_case: (TestCase) The test case.
+    suite: (TestSuite) The suite the fixture was registered with (if any).
+
+  Returns:
+    tuple: The key for the scope instance.
+  """
+  if scope == FixtureScope.RUN:
+    return (scope,)
+  if scope == FixtureScope.SUITE:
+    return (scope, suite.name if suite else _GLOBAL_SUITE_NAME)
+  if scope == FixtureScope.MODULE:
+    return (scope, test_case.test.full_name.rpartition('.')[0])
+  if scope == FixtureScope.TEST:
+    return (scope, test_case.test.full_name)
+  return (scope, test_case.full_name)
+
+
+class FixtureManager(object):
+  """Sets up and tears down the fixtures of a test run's test cases.
+
+  The manager counts how many test cases use each fixture value, so that it can
+  tear the value down as soon as the last of them has finished. It is safe to
+  use from multiple threads.
+  """
+
+  def __init__(self, test_run, test_cases=None, concurrency=1):
+    """Initializes a new instance of a FixtureManager.
+
+    Args:
+      test_run: (TestRun) The test run whose fixtures are managed.
+      test_cases: (iterable) The test cases that will be run. If this isn't
+          known, case scoped values are torn down when their test case
+          finishes, and the others only when the manager is closed.
+      concurrency: (int) The number of test cases that may run at once in this
+          process.
+    """
+    self.test_run = test_run
+    self._lock = threading.RLock()
+    # Fixture values keyed by (fixture, scope key), in setup order.
+    self._values = collections.OrderedDict()
+    # Events set once the values being set up (keyed the same way) are done.
+    self._pending = {}
+    # Instances checked out from component pools, keyed by test case.
+    self._checked_out = collections.defaultdict(list)
+    self._pools = [variable for variable in test_run.variables.values()
+                   if isinstance(variable, ComponentPool)]
+    for pool in self._pools:
+      pool.open(concurrency)
+    # Number of test cases still to finish, keyed by (fixture, scope key).
+    self._remaining = None
+    if test_cases is not None:
+      self._remaining = collections.Counter()
+      for test_case in test_cases:
+        self._remaining.update(self.fixture_keys(test_case))
+
+  def fixture_keys(self, test_case):
+    """Gets the fixtures (and lazy variables) that apply to a test case.
+
+    Args:
+      test_case: (TestCase) The test case.
+
+    Returns:
+      list((Fixture|LazyVariable, tuple)): The fixtures (in setup order) and
+          then the test run's lazy variables, with the keys of their scopes.
+    """
+    keys = []
+    for fixture in self.test_run.fixtures.values():
+      keys.append((fixture, scope_key(fixture.scope, test_case)))
+    for suite in test_case.test_suites.values():
+      for fixture in getattr(suite, 'fixtures', {}).values():
+        keys.append((fixture, scope_key(fixture.scope, test_case, suite)))
+    keys.sort(key=lambda key: _SCOPE_ORDER.index(key[0].scope))
+    for variable in self.test_run.variables.values():
+      if (isinstance(variable, LazyVariable) and
+          not isinstance(variable, ComponentPool)):
+        keys.append((variable, scope_key(variable.scope, test_case)))
+    return keys
+
+  def enter(self, test_case):
+    """Sets up the test case's fixtures and injects them into its context.
+
+    Lazy variables aren't set up here; the context's variables call back into
+    the manager when the test case accesses them.
+
+    Args:
+      test_case: (TestCase) The test case that is about to run.
+    """
+    variables = test_case.context.variables
+    if hasattr(variables, 'set_resolver'):
+      variables.set_resolver(
+          lambda name, variable: self.resolve(test_case, variable))
+    for key in self.fixture_keys(test_case):
+      fixture = key[0]
+      if not isinstance(fixture, Fixture):
+        continue
+      variables.register(fixture.name, self._get_value(key, test_case))
+
+  def resolve(self, test_case, variable):
+    """Gets the value of a lazy variable for a test case, creating it if needed.
+
+    Args:
+      test_case: (TestCase) The test case that accessed the variable.
+      variable: (LazyVariable) The lazy variable.
+
+    Returns:
+      The value of the variable in the test case's scope.
+    """
+    if isinstance(variable, ComponentPool):
+      instance = variable.check_out(test_case.context)
+      with self._lock:
+        self._checked_out[test_case].append((variable, instance))
+      return instance
+    key = (variable, scope_key(variable.scope, test_case))
+    return self._get_value(key, test_case)
+
+  def _get_value(self, key, test_case):
+    """Gets the value for the key, setting it up if it doesn't exist yet.
+
+    Values are set up outside of the manager's lock, so that test cases running
+    in other threads can set up their own values at the same time. Threads that
+    need a value that is being set up wait for it (and set it up themselves if
+    that fails).
+    """
+    while True:
+      with self._lock:
+        if key in self._values:
+          return self._values[key]
+        done = self._pending.get(key)
+        if not done:
+          done = self._pending[key] = threading.Event()
+          break
+      done.wait()
+    try:
+      value = call_with_optional_context(key[0].setup, test_case.context)
+      with self._lock:
+        self._values[key] = value
+    finally:
+      with self._lock:
+        del self._pending[key]
+      done.set()
+    return value
+
+  def exit(self, test_case):
+    """Returns pooled instances and tears down the values no longer needed.
+
+    Args:
+      test_case: (TestCase) The test case that finished running.
+
+    Raises:
+      Exception: The first exception raised by a fixture's teardown function.
+    """
+    variables = test_case.context.variables
+    if hasattr(variables, 'set_resolver'):
+      # The test run keeps its test cases, which shouldn't keep the manager
+      # (and the values it holds) alive once they are done.
+      variables.set_resolver(None)
+    with self._lock:
+      finished = [(pool.check_in, instance) for pool, instance
+                  in reversed(self._checked_out.pop(test_case, []))]
+      for key in reversed(self.fixture_keys(test_case)):
+        if self._remaining is not None:
+          self._remaining[key] -= 1
+          is_finished = self._remaining[key] <= 0
+        else:
+          # No other test case can use a value of the test case's own scope.
+          is_finished = key[0].scope == FixtureScope.CASE
+        if is_finished and key in self._values:
+          finished.append((key[0].teardown, self._values.pop(key)))
+    self._teardown(finished)
+
+  def close(self):
+    """Tears down all of the remaining fixture values (in reverse order).
+
+    Raises:
+      Exception: The first exception raised by a fixture's teardown function.
+    """
+    with self._lock:
+      finished = [(key[0].teardown, value)
+                  for key, value in self._values.items()]
+      self._values.clear()
+      self._checked_out.clear()
+    finished.reverse()
+    finished.extend((lambda pool: pool.close(), pool) for pool in self._pools)
+    self._teardown(finished)
+
+  def _teardown(self, finished):
+    """Calls the teardown functions, raising the first error once all are done.
+
+    Args:
+      finished: (list((function(value), value))) Teardown functions and values.
+    """
+    exc_info = None
+    for teardown, value in finished:
+      if not teardown:
+        continue
+      try:
+        teardown(value)
+      except Exception:  # pylint: disable=broad-except
+        if not exc_info:
+          exc_info = sys.exc_info()
+    if exc_info:
+      raise exc_info[0], exc_info[1], exc_info[2]
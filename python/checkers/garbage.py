@@ -0,0 +1,243 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Control over when the garbage collector runs during test runs.
+
+Automatic collections happen whenever enough objects were allocated, so they
+land at random inside test bodies (and benchmark timings), and full collections
+have to traverse every object the test run set up. A GcPolicy passed to the
+TestRunner changes that once the test run's setup functions were called:
+
+  * GcMode.DISABLED disables automatic collections.
+  * GcMode.FROZEN collects and then freezes every object that exists (with
+    gc.freeze, where it exists), so later collections skip them. Where
+    gc.freeze doesn't exist (e.g. Python 2), automatic collections are
+    disabled instead.
+
+With collect_every=N, garbage is also collected explicitly after every N-th
+test case (after its fixtures were torn down, so outside of its timed phases).
+That collection is recorded as the gc_collect phase of the test case's result.
+
+The policy records, for each test case, the collections that happened while it
+ran and how long they paused it, as the gc_stats of its result. That way they
+come back with the results of test cases that ran in other processes (e.g.
+with a ForkExecutor, or on distributed workers), and the policy collects them
+for its report when the results are recorded. Automatic collections can only
+be observed with gc.callbacks, which don't exist on Python 2; only the explicit
+collections are recorded there. Collections are process-wide, so test cases
+that run concurrently are all charged for the collections that happen while
+they run.
+
+The garbage collector is restored when the test run is torn down.
+"""
+
+import gc
+import threading
+import time
+
+import test_result
+
+GcMode = test_result.enum(
+    AUTOMATIC='AUTOMATIC',
+    DISABLED='DISABLED',
+    FROZEN='FROZEN'
+)
+
+# Name of the result phase of explicit collections.
+COLLECT_PHASE = 'gc_collect'
+
+
+class CaseGcStats(object):
+  """The garbage collections that happened while a test case ran."""
+
+  def __init__(self, full_name, collections=0, pause=0.0, collected=0):
+    """Initializes a new instance of a CaseGcStats.
+
+    Args:
+      full_name: (string) The full name of the test case.
+      collections: (int) The number of collections.
+      pause: (float) The total duration of the collections (in seconds).
+      collected: (int) The number of unreachable objects that were found.
+    """
+    self.full_name = full_name
+    self.collections = collections
+    self.pause = pause
+    self.collected = collected
+
+
+class GcPolicy(object):
+  """Decides when the garbage collector runs while test cases run."""
+
+  def __init__(self, mode=GcMode.AUTOMATIC, collect_every=None, generation=2):
+    """Initializes a new instance of a GcPolicy.
+
+    Args:
+      mode: (GcMode (string)) What happens to automatic collections.
+      collect_every: (int) Collects garbage after every this many test cases
+          (None never collects explicitly).
+      generation: (int) The oldest generation collected explicitly.
+    """
+    self.mode = mode
+    self.collect_every = collect_every
+    self.generation = generation
+    # Collection stats of the test cases that ran, keyed by full name.
+    self.cases = {}
+    self._lock = threading.Lock()
+    self._started = 0
+    self._was_enabled = None
+    self._frozen = False
+    self._case_count = 0
+    # Totals of the observed collections, so the ones that happen while a test
+    # case runs are the difference between two snapshots.
+    self._collections = 0
+    self._pause = 0.0
+    self._collected = 0
+    self._collection_start = None
+
+  def start(self):
+    """Applies the policy (once the test run's setup functions were called).
+
+    Starting a policy that was already started (by another test run) only
+    counts, so that the garbage collector is restored by the last stop.
+    """
+    with self._lock:
+      self._started += 1
+      if self._started > 1:
+        return
+    self._was_enabled = gc.isenabled()
+    if hasattr(gc, 'callbacks'):
+      gc.callbacks.append(self._on_collection)
+    if self.mode == GcMode.AUTOMATIC:
+      return
+    gc.collect()
+    if self.mode == GcMode.FROZEN and hasattr(gc, 'freeze'):
+      gc.freeze()
+      self._frozen = True
+    else:
+      gc.disable()
+
+  def stop(self):
+    """Restores the garbage collector (once every start was stopped)."""
+    with self._lock:
+      self._started -= 1
+      if self._started > 0:
+        return
+    if self._frozen:
+      gc.unfreeze()
+      self._frozen = False
+    if self._was_enabled:
+      gc.enable()
+    if hasattr(gc, 'callbacks') and self._on_collection in gc.callbacks:
+      gc.callbacks.remove(self._on_collection)
+
+  def _on_collection(self, phase, info):
+    """Records an automatic collection (called by the garbage collector)."""
+    if phase == 'start':
+      self._collection_start = time.time()
+    elif self._collection_start is not None:
+      self._record_collection(time.time() - self._collection_start,
+                              info.get('collected', 0))
+      self._collection_start = None
+
+  def _record_collection(self, pause, collected):
+    with self._lock:
+      self._collections += 1
+      self._pause += pause
+      self._collected += collected
+
+  def _totals(self):
+    with self._lock:
+      return self._collections, self._pause, self._collected
+
+  def should_collect(self):
+    """Counts a test case, and whether garbage is collected after it."""
+    if not self.collect_every:
+      return False
+    with self._lock:
+      self._case_count += 1
+      return self._case_count % self.collect_every == 0
+
+  def collect(self):
+    """Collects garbage explicitly.
+
+    Returns:
+      (float, float): When the collection started and finished.
+    """
+    start = time.time()
+    if hasattr(gc, 'callbacks'):
+      # The callbacks record the collection.
+      gc.collect(self.generation)
+    else:
+      collected = gc.collect(self.generation)
+      self._record_collection(time.time() - start, collected)
+    return start, time.time()
+
+  def run(self, function, test_case):
+    """Calls function(test_case), recording the collections while it runs.
+
+    Args:
+      function: (function(TestCase)) Calls the test case.
+      test_case: (TestCase) The test case to run.
+
+    Returns:
+      Whatever the function returns.
+    """
+    collections, pause, collected = self._totals()
+    result = function(test_case)
+    if self.should_collect():
+      start, end = self.collect()
+      if getattr(result, 'phases', None) is not None:
+        result.phases.append((COLLECT_PHASE, start, end))
+    end_collections, end_pause, end_collected = self._totals()
+    if result is not None:
+      result.gc_stats = {
+          'collections': end_collections - collections,
+          'pause': end_pause - pause,
+          'collected': end_collected - collected,
+      }
+    return result
+
+  def record(self, test_case, result):
+    """Records the collection stats of a result (if it has any).
+
+    Args:
+      test_case: (TestCase) The test case that was run.
+      result: (TestResult) The result of the test case.
+    """
+    if result.gc_stats is None:
+      return
+    stats = CaseGcStats(test_case.full_name, **result.gc_stats)
+    with self._lock:
+      self.cases[test_case.full_name] = stats
+
+  def report(self, limit=10):
+    """Formats the collection totals and the test cases paused the longest.
+
+    Args:
+      limit: (int) The maximum number of test cases.
+
+    Returns:
+      string: The report.
+    """
+    cases = self.cases.values()
+    lines = ['%d collection(s) in %.3fs, %d unreachable object(s)' % (
+        sum(stats.collections for stats in cases),
+        sum(stats.pause for stats in cases),
+        sum(stats.collected for stats in cases))]
+    paused = sorted((stats for stats in cases if stats.collections),
+                    key=lambda stats: (-stats.pause, stats.full_name))
+    for stats in paused[:limit]:
+      lines.append('%s: %d collection(s) in %.3fs' % (
+          stats.full_name, stats.collections, stats.pause))
+    return '\n'.join(lines)
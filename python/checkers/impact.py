@@ -0,0 +1,191 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Change-based test impact selection from per-test case coverage.
+
+An ImpactIndex records which source files each test case executed code in
+(file-level coverage, collected with sys.settrace while the test case and its
+fixtures run). Given the files that changed (e.g. in a diff), the index selects
+the test cases that touched any of them, plus the test cases it has never seen.
+
+To build the index, pass it to the TestRunner and run the full test run once:
+
+  index = impact.ImpactIndex('.checkers_impact')
+  runner = checkers.TestRunner(impact_index=index)
+
+Later runs can then be narrowed down to the affected test cases:
+
+  test_run.select(index.selector(impact.git_changed_files('origin/master')))
+
+Only the code that runs while a test case runs is attributed to it. Code that
+runs when modules are imported or when the test run is set up (including
+run-scoped fixtures, which are set up by the first test case that uses them)
+isn't.
+"""
+
+import os
+import subprocess
+import sys
+import sysconfig
+
+import json_files
+import selection
+
+# Version of the index file format (see json_files).
+INDEX_VERSION = 1
+
+
+def normalize_path(file_path):
+  """Normalizes a file path so paths to the same file compare equal."""
+  return os.path.normcase(os.path.realpath(os.path.abspath(file_path)))
+
+
+def git_changed_files(base='HEAD', cwd=None):
+  """Lists the files that changed since a git revision.
+
+  Args:
+    base: (string) The revision to compare the working tree with.
+    cwd: (string) A directory in the git repository (defaults to the current
+        directory).
+
+  Returns:
+    set: The normalized paths of the changed files.
+  """
+  top = subprocess.check_output(
+      ['git', 'rev-parse', '--show-toplevel'], cwd=cwd).strip()
+  output = subprocess.check_output(
+      ['git', 'diff', '--name-only', base, '--'], cwd=top)
+  return set(normalize_path(os.path.join(top, line))
+             for line in output.splitlines() if line)
+
+
+class ImpactIndex(object):
+  """Index of the source files that each test case executed code in."""
+
+  def __init__(self, file_path=None, exclude=None):
+    """Initializes a new instance of an ImpactIndex.
+
+    Args:
+      file_path: (string) The file the index is loaded from and saved to (None
+          keeps the index in memory).
+      exclude: ([string]) Directories whose files aren't recorded (defaults to
+          the standard library).
+    """
+    self.file_path = file_path
+    if exclude is None:
+      exclude = [sysconfig.get_paths()['stdlib']]
+    self.exclude = tuple(normalize_path(d) + os.sep for d in exclude)
+    # Covered files of each test case, keyed by test case full name.
+    self.entries = {}
+    self._normalized = {}
+    if file_path and os.path.exists(file_path):
+      self.load()
+
+  def _normalize(self, file_path):
+    """Normalizes a file path (or returns None if it's excluded)."""
+    if file_path not in self._normalized:
+      normalized = normalize_path(file_path)
+      if normalized.startswith(self.exclude) or file_path.startswith('<'):
+        normalized = None
+      self._normalized[file_path] = normalized
+    return self._normalized[file_path]
+
+  def trace(self, function, *args):
+    """Calls a function and records the files of the code that it runs.
+
+    Any trace function that was set in the calling thread is restored
+    afterwards (but doesn't see the calls made by the function).
+
+    Args:
+      function: (function) The function to call.
+      *args: The arguments to call the function with.
+
+    Returns:
+      (value, files): What the function returned and the normalized paths of
+          the files it ran code in (sorted).
+    """
+    file_names = set()
+
+    def tracer(frame, event, unused_arg):
+      if event == 'call':
+        file_names.add(frame.f_code.co_filename)
+
+    previous = sys.gettrace()
+    sys.settrace(tracer)
+    try:
+      value = function(*args)
+    finally:
+      sys.settrace(previous)
+    files = set(self._normalize(f) for f in file_names)
+    files.discard(None)
+    return value, sorted(files)
+
+  def record(self, test_case, result):
+    """Records the covered files of a test case's result.
+
+    Args:
+      test_case: (TestCase) The test case that was run.
+      result: (TestResult) Its result (results without covered files, e.g.
+          cached ones, leave the index untouched).
+    """
+    if result.covered_files is not None:
+      self.entries[test_case.full_name] = list(result.covered_files)
+
+  def is_affected(self, full_name, changed_files):
+    """Whether a test case is affected by changes to the given files.
+
+    Args:
+      full_name: (string) The full name of the test case.
+      changed_files: (set) The normalized paths of the changed files.
+
+    Returns:
+      bool: True if the test case touched a changed file or isn't indexed.
+    """
+    if full_name not in self.entries:
+      return True
+    return any(f in changed_files for f in self.entries[full_name])
+
+  def selector(self, changed_files):
+    """Creates a selector for the test cases affected by the changed files.
+
+    Args:
+      changed_files: (iterable) Paths of the changed files.
+
+    Returns:
+      ImpactSelector: The selector.
+    """
+    return ImpactSelector(self, changed_files)
+
+  def load(self):
+    """Loads the entries from the index file (if it's a supported version)."""
+    source = json_files.load(self.file_path, INDEX_VERSION)
+    if source:
+      self.entries = dict(source['entries'])
+
+  def save(self):
+    """Saves the entries to the index file (if the index has one)."""
+    if not self.file_path:
+      return
+    json_files.save(self.file_path, INDEX_VERSION, {'entries': self.entries})
+
+
+class ImpactSelector(selection.Selector):
+  """Selects the test cases affected by changes to a set of files."""
+
+  def __init__(self, index, changed_files):
+    self.index = index
+    self.changed_files = frozenset(normalize_path(f) for f in changed_files)
+
+  def matches(self, candidate):
+    return self.index.is_affected(candidate.full_name, self.changed_files)
@@ -0,0 +1,53 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Reads and writes the versioned JSON files that Checkers keeps between runs.
+
+The result cache, impact index, discovery cache and benchmark baseline are each
+saved as a JSON object with a 'version' member. A file with another version
+(e.g. written by an older Checkers) is ignored, so it is simply rebuilt.
+"""
+
+import json
+
+
+def load(file_path, version):
+  """Loads a versioned JSON file.
+
+  Args:
+    file_path: (string) The file to load.
+    version: (int) The supported version of the file format.
+
+  Returns:
+    dict: The contents of the file (None if it has another version).
+  """
+  with open(file_path) as f:
+    source = json.load(f)
+  if source.get('version') != version:
+    return None
+  return source
+
+
+def save(file_path, version, contents):
+  """Saves a versioned JSON file.
+
+  Args:
+    file_path: (string) The file to save.
+    version: (int) The version of the file format.
+    contents: (dict) The members of the saved object (besides its version).
+  """
+  source = dict(contents)
+  source['version'] = version
+  with open(file_path, 'w') as f:
+    json.dump(source, f, separators=(',', ':'), sort_keys=True)
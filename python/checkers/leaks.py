@@ -0,0 +1,237 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Opt-in detection of the memory and objects that test cases leak.
+
+A LeakDetector passed to the TestRunner checks each test case (or the ones
+matching a selection): it runs the garbage collector before and after the test
+case (and its fixtures), and attributes to the test case
+
+  * the new objects (tracked by the garbage collector) that survived it,
+    counted by type, and
+  * if tracemalloc can be imported, the memory allocated while it ran that is
+    still allocated, with the tracebacks of the allocations.
+
+Objects that are only alive because the test case's result refers to them (its
+exception info, for instance) are expected to survive, so they aren't counted.
+Anything else that survives is kept alive by something else (a module global,
+a cache, a fixture that outlives the test case, ...), which is what leaks.
+
+Leak detection is slow: it collects garbage and walks every object twice per
+test case. The checks are serialized, so test cases that run concurrently
+(e.g. with a ThreadPoolExecutor) don't get each other's objects; test cases
+run in other processes are checked in those processes.
+"""
+
+import gc
+import sys
+import threading
+
+import selection
+
+try:
+  import tracemalloc  # pylint: disable=g-import-not-at-top
+except ImportError:
+  tracemalloc = None
+
+
+def type_name(obj):
+  """Gets the qualified name of the type of an object."""
+  cls = type(obj)
+  module = getattr(cls, '__module__', None)
+  if module in (None, '__builtin__', 'builtins'):
+    return cls.__name__
+  return '%s.%s' % (module, cls.__name__)
+
+
+def _reachable_ids(root, candidate_ids):
+  """Gets the ids of the candidate objects that can be reached from the root.
+
+  Only candidates are followed, so walking stops at objects that existed
+  before the test case ran.
+
+  Args:
+    root: (object) Where to start walking.
+    candidate_ids: (set) Ids of the objects that can be reached.
+
+  Returns:
+    set: The ids of the reachable candidates.
+  """
+  reached = set()
+  pending = [root]
+  while pending:
+    obj = pending.pop()
+    for referent in gc.get_referents(obj):
+      referent_id = id(referent)
+      if referent_id in candidate_ids and referent_id not in reached:
+        reached.add(referent_id)
+        pending.append(referent)
+  return reached
+
+
+class CaseLeaks(object):
+  """What a test case leaked."""
+
+  def __init__(self, full_name, objects, allocations=None):
+    """Initializes a new instance of a CaseLeaks.
+
+    Args:
+      full_name: (string) The full name of the test case.
+      objects: (dict) Number of leaked objects, keyed by type name.
+      allocations: ([(int, int, [string])]) The size and number of the leaked
+          allocations of each traceback (None without tracemalloc).
+    """
+    self.full_name = full_name
+    self.objects = objects
+    self.allocations = allocations
+
+  @property
+  def object_count(self):
+    """The total number of leaked objects."""
+    return sum(self.objects.itervalues())
+
+  @property
+  def allocated_size(self):
+    """The total number of leaked bytes (0 without tracemalloc)."""
+    return sum(size for size, _, _ in self.allocations or ())
+
+
+class LeakDetector(object):
+  """Attributes leaked objects and memory to the test cases that leaked them."""
+
+  def __init__(self, selector=None, use_tracemalloc=True, traceback_limit=10):
+    """Initializes a new instance of a LeakDetector.
+
+    Args:
+      selector: (string|Selector) Only checks the matching test cases (None
+          checks all of them).
+      use_tracemalloc: (bool) Also track allocations, if tracemalloc exists.
+      traceback_limit: (int) Number of frames stored for each allocation.
+    """
+    self.case_filter = selection.TestCaseFilter(selector)
+    self.use_tracemalloc = use_tracemalloc and tracemalloc is not None
+    self.traceback_limit = traceback_limit
+    # What each checked test case leaked (if anything), keyed by full name.
+    self.cases = {}
+    self._lock = threading.Lock()
+
+  def should_check(self, test_case):
+    """Whether the test case is selected to be checked."""
+    return self.case_filter.matches(test_case)
+
+  def check(self, function, test_case):
+    """Calls function(test_case), recording what it leaks (if it's selected).
+
+    Args:
+      function: (function(TestCase)) Calls the test case.
+      test_case: (TestCase) The test case to check.
+
+    Returns:
+      Whatever the function returns.
+    """
+    if not self.should_check(test_case):
+      return function(test_case)
+    with self._lock:
+      if self.use_tracemalloc and not tracemalloc.is_tracing():
+        tracemalloc.start(self.traceback_limit)
+      gc.collect()
+      before_ids = set(id(obj) for obj in gc.get_objects())
+      before_snapshot = None
+      if self.use_tracemalloc:
+        before_snapshot = tracemalloc.take_snapshot()
+      result = function(test_case)
+      gc.collect()
+      objects = self._new_objects(before_ids, result)
+      allocations = None
+      if before_snapshot is not None:
+        allocations = self._new_allocations(before_snapshot)
+      if objects or allocations:
+        self.cases[test_case.full_name] = CaseLeaks(
+            test_case.full_name, objects, allocations)
+      else:
+        self.cases.pop(test_case.full_name, None)
+      return result
+
+  def _new_objects(self, before_ids, result):
+    """Counts the new objects that aren't only kept alive by the result."""
+    new_objects = {}
+    for obj in gc.get_objects():
+      if id(obj) not in before_ids:
+        new_objects[id(obj)] = obj
+    # The bookkeeping of the detector doesn't count.
+    frame = sys._getframe()  # pylint: disable=protected-access
+    for obj in (before_ids, new_objects, frame):
+      new_objects.pop(id(obj), None)
+    retained = _reachable_ids(result, new_objects)
+    retained.add(id(result))
+    counts = {}
+    for object_id, obj in new_objects.iteritems():
+      if object_id not in retained:
+        name = type_name(obj)
+        counts[name] = counts.get(name, 0) + 1
+    return counts
+
+  def _new_allocations(self, before_snapshot):
+    """Gets the allocations made since the snapshot that still exist."""
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, tracemalloc.__file__)])
+    allocations = []
+    for stat in snapshot.compare_to(before_snapshot, 'traceback'):
+      if stat.size_diff > 0:
+        allocations.append((stat.size_diff, stat.count_diff,
+                            stat.traceback.format()))
+    return allocations
+
+  def top_leakers(self, limit=10):
+    """Gets the test cases that leaked the most.
+
+    Args:
+      limit: (int) The maximum number of test cases.
+
+    Returns:
+      [CaseLeaks]: The leaks of the test cases, starting with the ones that
+          leaked the most memory (or objects, without tracemalloc).
+    """
+    leaks = sorted(self.cases.itervalues(), key=lambda case: (
+        -case.allocated_size, -case.object_count, case.full_name))
+    return leaks[:limit]
+
+  def report(self, limit=10, types_limit=5, tracebacks_limit=3):
+    """Formats the test cases that leaked the most.
+
+    Args:
+      limit: (int) The maximum number of test cases.
+      types_limit: (int) The maximum number of types listed per test case.
+      tracebacks_limit: (int) The maximum number of allocation tracebacks
+          listed per test case.
+
+    Returns:
+      string: The report.
+    """
+    lines = ['%d test case(s) leaked' % len(self.cases)]
+    for case in self.top_leakers(limit):
+      summary = '%d object(s)' % case.object_count
+      if case.allocations is not None:
+        summary += ', %d byte(s)' % case.allocated_size
+      lines.append('%s: %s' % (case.full_name, summary))
+      types = sorted(case.objects.iteritems(), key=lambda item: (-item[1],
+                                                                 item[0]))
+      for name, count in types[:types_limit]:
+        lines.append('  %6d  %s' % (count, name))
+      for size, count, traceback_lines in (
+          case.allocations or [])[:tracebacks_limit]:
+        lines.append('  %d byte(s) in %d block(s) allocated at:' % (size,
+                                                                    count))
+        lines.extend('    %s' % line for line in traceback_lines)
+    return '\n'.join(lines)
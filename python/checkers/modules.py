@@ -73,8 +73,9 @@ def tests_from_module(module, include_imports=False):
   if include_imports:
     raise NotImplementedError('Searching for tests in imports not supported.')
   test_registry = registry.AutoKeyRegistry(lambda test: test.full_name)
-  for attr_name in dir(module):
-    attr = getattr(module, attr_name)
+  # The module's namespace holds the same attributes that dir() lists, without
+  # having to look each of them up again.
+  for _, attr in sorted(vars(module).iteritems()):
     if type(attr) is test.Test:
       # TODO(barkimedes): support tests that are definitions of test classes
       # rather than just instances.
@@ -0,0 +1,296 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Measures what the Checkers framework itself costs per test case.
+
+The benchmark builds synthetic test runs of trivial test cases (that don't do
+anything), so all of the measured time and memory is framework overhead. Each
+configuration varies the number of test cases, the number of suites the tests
+are spread over, the number of parameterizations per test, the number of test
+run variables and the number of test case setup and teardown functions. For
+every configuration, the benchmark measures:
+
+  * generate_seconds: generating the test cases of the run,
+  * execute_seconds and per_case_us: running the test cases with a TestRunner,
+  * pyunit_seconds: converting the results into PyUnit test suites, and
+  * peak_rss_kb: the growth of the peak resident memory while doing all that.
+
+Every configuration runs in a forked process, so that the peak memory of one
+configuration doesn't hide the one of the next. The results are written as JSON
+(one object per configuration), so they can be compared across changes.
+
+Example:
+
+  python -m checkers.perf.framework_benchmark --cases 1000,100000 \
+      --params 1,10 --output framework.json
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import resource
+import sys
+import timeit
+import types
+import unittest
+
+import checkers
+from checkers.runners import pyunit
+
+# Version of the output format.
+OUTPUT_VERSION = 1
+# Numbers of test cases measured by default.
+DEFAULT_CASES = (1000, 10000, 100000, 1000000)
+
+
+class Config(object):
+  """A configuration of a synthetic test run."""
+
+  def __init__(self, cases, suites=1, params=1, variables=0, setups=0):
+    """Initializes a new instance of a Config.
+
+    Args:
+      cases: (int) Number of test cases (rounded up to a multiple of params).
+      suites: (int) Number of suites the tests are spread over.
+      params: (int) Number of parameterizations of each test.
+      variables: (int) Number of test run variables (each test uses one).
+      setups: (int) Number of test case setup (and teardown) functions.
+    """
+    self.cases = cases
+    self.suites = suites
+    self.params = params
+    self.variables = variables
+    self.setups = setups
+
+  @property
+  def tests(self):
+    """The number of tests in the run."""
+    return (self.cases + self.params - 1) // self.params
+
+  def to_dict(self):
+    """Converts the configuration into a dict."""
+    return {
+        'cases': self.cases,
+        'suites': self.suites,
+        'params': self.params,
+        'variables': self.variables,
+        'setups': self.setups,
+    }
+
+
+def _noop(*_):
+  pass
+
+
+def _create_test(index, variable_name):
+  """Creates a trivial test (that uses a variable, if one is given)."""
+  if variable_name:
+    # The argument name is what makes the test require the variable.
+    function = eval('lambda %s: None' % variable_name)
+  else:
+    function = lambda: None
+  function.func_name = 'test_%d' % index
+  function.__module__ = __name__
+  return checkers.FunctionTest(function)
+
+
+def build_test_run(config):
+  """Builds the synthetic test run of a configuration.
+
+  Args:
+    config: (Config) The configuration of the run.
+
+  Returns:
+    TestRun: The test run.
+  """
+  test_run = checkers.TestRun('framework_benchmark')
+  variable_names = ['variable_%d' % i for i in xrange(config.variables)]
+  for name in variable_names:
+    test_run.variables.register(name, name)
+  for i in xrange(config.setups):
+    setup = types.FunctionType(_noop.func_code, {}, 'setup_%d' % i)
+    teardown = types.FunctionType(_noop.func_code, {}, 'teardown_%d' % i)
+    test_run.test_case_setup.register(setup)
+    test_run.test_case_teardown.register(teardown)
+  parameterizations = []
+  if config.params > 1:
+    parameterizations = [checkers.Parameterization(str(i), {'parameter': i})
+                         for i in xrange(config.params)]
+  for i in xrange(config.tests):
+    variable_name = None
+    if variable_names:
+      variable_name = variable_names[i % len(variable_names)]
+    test = _create_test(i, variable_name)
+    if config.suites > 1:
+      test.test_suite_names.add('suite_%d' % (i % config.suites))
+    test_run.tests.register(test)
+    for parameterization in parameterizations:
+      test_run.parameterizations.register(test.full_name, parameterization)
+  return test_run
+
+
+def _peak_rss_kb():
+  """Gets the peak resident memory of the process (in KB)."""
+  return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(config):
+  """Measures the framework overhead of a configuration (in this process).
+
+  Args:
+    config: (Config) The configuration to measure.
+
+  Returns:
+    dict: The configuration and its measurements.
+  """
+  timer = timeit.default_timer
+  start_rss_kb = _peak_rss_kb()
+  start = timer()
+  test_run = build_test_run(config)
+  build_seconds = timer() - start
+
+  start = timer()
+  test_cases = test_run.generate_test_cases.values()
+  generate_seconds = timer() - start
+
+  runner = checkers.TestRunner()
+  start = timer()
+  runner.setup_test_run(test_run, test_cases)
+  results = [runner.run_test_case(test_case) for test_case in test_cases]
+  runner.teardown_test_run(test_run)
+  execute_seconds = timer() - start
+
+  module = types.ModuleType('framework_benchmark_pyunit')
+  start = timer()
+  grouped = pyunit.group_by_suite(test_run, results,
+                                  lambda result: result.context.test_case)
+  pyunit.create_pyunit_test_suites(module, [test_run],
+                                   {test_run.name: grouped},
+                                   unittest.TestCase)
+  pyunit_seconds = timer() - start
+
+  failed = sum(1 for result in results if result.failed)
+  return {
+      'config': config.to_dict(),
+      'test_cases': len(test_cases),
+      'failed': failed,
+      'build_seconds': build_seconds,
+      'generate_seconds': generate_seconds,
+      'execute_seconds': execute_seconds,
+      'per_case_us': execute_seconds / max(len(test_cases), 1) * 1e6,
+      'pyunit_seconds': pyunit_seconds,
+      'peak_rss_kb': _peak_rss_kb() - start_rss_kb,
+  }
+
+
+def _measure_in_child(config, connection):
+  """Measures the configuration and sends the measurements to the parent."""
+  try:
+    connection.send(measure(config))
+  except Exception as e:  # pylint: disable=broad-except
+    connection.send({'config': config.to_dict(), 'error': repr(e)})
+  finally:
+    connection.close()
+
+
+def measure_isolated(config):
+  """Measures a configuration in a child process (see measure).
+
+  Args:
+    config: (Config) The configuration to measure.
+
+  Returns:
+    dict: The configuration and its measurements.
+  """
+  receiver, sender = multiprocessing.Pipe(duplex=False)
+  process = multiprocessing.Process(target=_measure_in_child,
+                                    args=(config, sender))
+  process.start()
+  sender.close()
+  try:
+    return receiver.recv()
+  except EOFError:
+    return {'config': config.to_dict(),
+            'error': 'the benchmark process died'}
+  finally:
+    process.join()
+
+
+def configs(cases, suites, params, variables, setups):
+  """Creates the configurations for every combination of the values.
+
+  Args:
+    cases: ([int]) Numbers of test cases.
+    suites: ([int]) Numbers of suites.
+    params: ([int]) Numbers of parameterizations per test.
+    variables: ([int]) Numbers of test run variables.
+    setups: ([int]) Numbers of setup and teardown functions.
+
+  Returns:
+    [Config]: The configurations.
+  """
+  return [Config(*values) for values in itertools.product(
+      cases, suites, params, variables, setups)]
+
+
+def _int_list(value):
+  return [int(item) for item in value.split(',')]
+
+
+def main(argv=None):
+  """Runs the framework benchmarks and writes the results as JSON.
+
+  Args:
+    argv: ([string]) The command line arguments (defaults to sys.argv[1:]).
+
+  Returns:
+    int: The exit code.
+  """
+  parser = argparse.ArgumentParser(
+      description='Measures the per test case overhead of Checkers.')
+  parser.add_argument('--cases', type=_int_list,
+                      default=list(DEFAULT_CASES),
+                      help='Comma-separated numbers of test cases.')
+  parser.add_argument('--suites', type=_int_list, default=[1])
+  parser.add_argument('--params', type=_int_list, default=[1],
+                      help='Parameterizations per test.')
+  parser.add_argument('--variables', type=_int_list, default=[0])
+  parser.add_argument('--setups', type=_int_list, default=[0],
+                      help='Test case setup (and teardown) functions.')
+  parser.add_argument('--output', help='File to write the JSON results to '
+                      '(defaults to stdout).')
+  args = parser.parse_args(argv)
+  results = []
+  for config in configs(args.cases, args.suites, args.params, args.variables,
+                        args.setups):
+    result = measure_isolated(config)
+    sys.stderr.write('%s\n' % json.dumps(result, sort_keys=True))
+    results.append(result)
+  output = {
+      'version': OUTPUT_VERSION,
+      'python': sys.version.split()[0],
+      'results': results,
+  }
+  if args.output:
+    with open(args.output, 'w') as f:
+      json.dump(output, f, indent=2, sort_keys=True)
+  else:
+    json.dump(output, sys.stdout, indent=2, sort_keys=True)
+    sys.stdout.write('\n')
+  return 1 if any('error' in result for result in results) else 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
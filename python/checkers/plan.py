@@ -0,0 +1,232 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Test plans describe the test cases of a test run without generating them.
+
+A test plan is the compiled form of a test run: the ordered list of its test
+case ids with the test and parameterization each one comes from, the suites it
+belongs to, and an estimate of how long it takes to run. Plans are written to
+JSON files, so a coordinator can compute the plan once and each worker or shard
+can take its slice of it and build a test run (see TestRun.from_plan) that only
+resolves the tests it was assigned, rather than discovering and generating
+every test case of the run just to find its share.
+
+Plans only contain what can be found again by name: the tests must be
+attributes of importable modules. Setup functions, variables and
+parameterizations registered on the test run itself (rather than with
+decorators) aren't part of the plan.
+"""
+
+import json
+
+import selection
+
+# Version of the plan format; plans with any other version can't be loaded.
+PLAN_VERSION = 1
+
+
+class PlannedTest(object):
+  """A test of a plan and where to find it."""
+
+  def __init__(self, full_name, module_name, attribute):
+    """Initializes a new instance of a PlannedTest.
+
+    Args:
+      full_name: (string) The full name of the test.
+      module_name: (string) The name of the module that contains the test.
+      attribute: (string) The name of the test in the module.
+    """
+    self.full_name = full_name
+    self.module_name = module_name
+    self.attribute = attribute
+
+  @staticmethod
+  def from_test(test):
+    """Creates the planned test for a Test (named <module>.<attribute>)."""
+    module_name, _, attribute = test.full_name.rpartition('.')
+    return PlannedTest(test.full_name, module_name, attribute)
+
+
+class PlannedCase(object):
+  """A test case of a plan."""
+
+  def __init__(self, full_name, test, parameterization=None, suites=(),
+               cost=1.0):
+    """Initializes a new instance of a PlannedCase.
+
+    Args:
+      full_name: (string) The full name of the test case.
+      test: (PlannedTest) The test that the test case is generated from.
+      parameterization: (string) The name of the test case's parameterization.
+      suites: (iterable) The names of the suites the test case belongs to.
+      cost: (float) The estimated number of seconds the test case takes.
+    """
+    self.full_name = full_name
+    self.test = test
+    self.parameterization = parameterization
+    self.suites = sorted(suites)
+    self.cost = cost
+
+
+class TestPlan(object):
+  """The ordered test cases of a test run, along with their estimated costs."""
+
+  def __init__(self, test_run_name, cases=None):
+    """Initializes a new instance of a TestPlan.
+
+    Args:
+      test_run_name: (string) The name of the planned test run.
+      cases: ([PlannedCase]) The test cases, in the order they should run.
+    """
+    self.test_run_name = test_run_name
+    self.cases = list(cases) if cases else []
+
+  @staticmethod
+  def from_test_run(test_run, costs=None, default_cost=1.0):
+    """Creates the plan for a test run (without generating its test cases).
+
+    Args:
+      test_run: (TestRun) The test run to plan.
+      costs: (dict) Estimated seconds per test case, keyed by full name (e.g.
+          from costs_from_results).
+      default_cost: (float) The cost of test cases that aren't in costs.
+
+    Returns:
+      TestPlan: The plan for the test run.
+    """
+    costs = costs if costs else {}
+    planned_tests = {}
+    cases = []
+    for test, _, candidate in selection.case_candidates(test_run):
+      if test.full_name not in planned_tests:
+        planned_tests[test.full_name] = PlannedTest.from_test(test)
+      cases.append(PlannedCase(
+          candidate.full_name, planned_tests[test.full_name],
+          candidate.parameterization_name, candidate.suite_names,
+          costs.get(candidate.full_name, default_cost)))
+    return TestPlan(test_run.name, cases)
+
+  @property
+  def tests(self):
+    """The planned tests of the test cases, in order of first use."""
+    tests = []
+    seen = set()
+    for case in self.cases:
+      if case.test.full_name not in seen:
+        seen.add(case.test.full_name)
+        tests.append(case.test)
+    return tests
+
+  @property
+  def total_cost(self):
+    """The sum of the estimated costs of the test cases."""
+    return sum(case.cost for case in self.cases)
+
+  def slice(self, index, count):
+    """Gets one of count slices of the plan with about the same total cost.
+
+    The most expensive test cases are handed out first, each to the slice with
+    the lowest total so far, so every caller computes the same slices. Within a
+    slice, the test cases keep the order of the plan.
+
+    Args:
+      index: (int) The index of the slice to get (0 <= index < count).
+      count: (int) The number of slices.
+
+    Returns:
+      TestPlan: The plan containing the test cases of the slice.
+
+    Raises:
+      ValueError: The index isn't a valid slice index.
+    """
+    if count < 1 or not 0 <= index < count:
+      raise ValueError('invalid slice %d of %d' % (index, count))
+    totals = [0.0] * count
+    assigned = set()
+    by_cost = sorted(enumerate(self.cases),
+                     key=lambda item: (-item[1].cost, item[0]))
+    for position, case in by_cost:
+      smallest = totals.index(min(totals))
+      totals[smallest] += case.cost
+      if smallest == index:
+        assigned.add(position)
+    return TestPlan(self.test_run_name, [
+        case for position, case in enumerate(self.cases)
+        if position in assigned])
+
+  def to_dict(self):
+    """Converts the plan into a dict that can be written as JSON.
+
+    Returns:
+      dict: The contents of the plan.
+    """
+    tests = self.tests
+    test_indexes = dict((test.full_name, i) for i, test in enumerate(tests))
+    return {
+        'version': PLAN_VERSION,
+        'test_run': self.test_run_name,
+        'tests': [[test.full_name, test.module_name, test.attribute]
+                  for test in tests],
+        'cases': [[case.full_name, test_indexes[case.test.full_name],
+                   case.parameterization, case.suites, case.cost]
+                  for case in self.cases],
+    }
+
+  @staticmethod
+  def from_dict(source):
+    """Re-creates a plan that was converted with to_dict.
+
+    Args:
+      source: (dict) The contents of the plan.
+
+    Returns:
+      TestPlan: The plan.
+
+    Raises:
+      ValueError: The plan has an unsupported version.
+    """
+    if source.get('version') != PLAN_VERSION:
+      raise ValueError('unsupported test plan version: %s' % (
+          source.get('version'),))
+    tests = [PlannedTest(*test) for test in source['tests']]
+    cases = [PlannedCase(full_name, tests[test_index], parameterization,
+                         suites, cost)
+             for full_name, test_index, parameterization, suites, cost
+             in source['cases']]
+    return TestPlan(source['test_run'], cases)
+
+  def save(self, file_path):
+    """Writes the plan to a JSON file."""
+    with open(file_path, 'w') as f:
+      json.dump(self.to_dict(), f, separators=(',', ':'))
+
+  @staticmethod
+  def load(file_path):
+    """Reads a plan from a JSON file written by save."""
+    with open(file_path) as f:
+      return TestPlan.from_dict(json.load(f))
+
+
+def costs_from_results(results):
+  """Gets the measured durations of test results, to use as plan costs.
+
+  Args:
+    results: (iterable) The test results (e.g. of a previous test run).
+
+  Returns:
+    dict: The duration in seconds of each result that has one, keyed by the
+        full name of the test case.
+  """
+  return dict((result.context.test_case.full_name, result.duration)
+              for result in results if result.duration is not None)
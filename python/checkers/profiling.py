@@ -0,0 +1,365 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Opt-in profiling of test cases with cProfile.
+
+A Profiler passed to the TestRunner runs each test case (or the ones matching
+a selection) under cProfile, including setting up and tearing down its
+fixtures. The time of each test case is split into three phases:
+
+  * fixtures: the test case's setup and teardown functions and its fixtures,
+  * body: the test itself, and
+  * framework: everything else Checkers does to run the test case.
+
+Each function in the profile gets the category of the phase it ran in, except
+that functions of the Checkers package itself always count as framework code.
+Functions that ran in both the fixtures and the body (of the same test case or
+of different ones) get the 'mixed' category.
+
+If the profiler has a directory, the profile of each test case is saved there
+as a .prof file (which can be loaded with pstats or any profile viewer), along
+with a .json file containing its phases and categories. The files are named
+after the test case, the profiler's run id and the process, so runs (and worker
+processes) don't overwrite each other's profiles. The report then covers all of
+the profiles in the directory, so it aggregates the test cases of several runs;
+run this module to print it:
+
+  python -m checkers.profiling <directory> [--limit 30]
+"""
+
+import argparse
+import collections
+import cProfile
+import glob
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+
+import fixtures
+import selection
+
+# Version of the format of the .json files written next to the profiles.
+PROFILE_VERSION = 1
+# The phases of a test case, in the order they're reported.
+PHASES = ('fixtures', 'body', 'framework')
+# Category of functions that ran in more than one phase.
+MIXED_CATEGORY = 'mixed'
+# Directory of the Checkers package, whose code counts as framework code.
+FRAMEWORK_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+# Directories within the package that hold user code rather than framework.
+_NON_FRAMEWORK_DIRECTORIES = ('examples', 'tests')
+
+
+def is_framework_file(file_path):
+  """Whether a file is part of the Checkers framework (not its tests)."""
+  file_path = os.path.abspath(file_path)
+  if not file_path.startswith(FRAMEWORK_DIRECTORY + os.sep):
+    return False
+  relative_path = file_path[len(FRAMEWORK_DIRECTORY) + 1:]
+  return relative_path.split(os.sep)[0] not in _NON_FRAMEWORK_DIRECTORIES
+
+
+def function_label(function_key):
+  """Formats a pstats function key (file, line, name) as a string."""
+  return pstats.func_std_string(function_key)
+
+
+def _code_key(function):
+  """Gets the pstats function key of a function (None if it has no code)."""
+  function = getattr(function, 'im_func', function)
+  code = getattr(function, 'func_code', None)
+  if code is None:
+    return None
+  return (code.co_filename, code.co_firstlineno, code.co_name)
+
+
+def body_key(test):
+  """Gets the pstats function key of the code that a test runs."""
+  function = getattr(test, 'function', None)
+  if function is None:
+    function = type(test).__call__
+  return _code_key(function)
+
+
+def fixture_keys(test):
+  """Gets the pstats function keys of the code that sets up a test's cases."""
+  functions = [fixtures.FixtureManager.enter, fixtures.FixtureManager.exit]
+  functions.extend(test.setup.values())
+  functions.extend(test.teardown.values())
+  return set(key for key in map(_code_key, functions) if key)
+
+
+def _reachable(roots, callees):
+  """Gets the functions that the roots call (directly or indirectly)."""
+  reached = set()
+  pending = [root for root in roots if root in callees]
+  while pending:
+    function = pending.pop()
+    if function in reached:
+      continue
+    reached.add(function)
+    pending.extend(callees.get(function, ()))
+  return reached
+
+
+def analyze(stats, test):
+  """Splits the profile of a test case into phases and categorizes functions.
+
+  Args:
+    stats: (dict) The raw stats of the profile (see pstats.Stats.stats).
+    test: (Test) The test of the profiled test case.
+
+  Returns:
+    (dict, dict): The number of seconds of each phase, and the category (the
+        phase) of each function, keyed by function label.
+  """
+  callees = collections.defaultdict(list)
+  for function, (_, _, _, _, callers) in stats.iteritems():
+    callees.setdefault(function, [])
+    for caller in callers:
+      callees[caller].append(function)
+  body_root = body_key(test)
+  fixture_roots = fixture_keys(test)
+  total = sum(entry[2] for entry in stats.itervalues())
+  body = stats[body_root][3] if body_root in stats else 0.0
+  fixture_time = sum(stats[key][3] for key in fixture_roots if key in stats)
+  phases = {
+      'fixtures': fixture_time,
+      'body': body,
+      'framework': max(total - body - fixture_time, 0.0),
+  }
+  in_body = _reachable([body_root], callees)
+  in_fixtures = _reachable(fixture_roots, callees)
+  categories = {}
+  for function in stats:
+    category = 'framework'
+    if not is_framework_file(function[0]):
+      if function in in_body and function in in_fixtures:
+        category = MIXED_CATEGORY
+      elif function in in_body:
+        category = 'body'
+      elif function in in_fixtures:
+        category = 'fixtures'
+    categories[function_label(function)] = category
+  return phases, categories
+
+
+def merge_categories(categories, source):
+  """Merges function categories into another set of function categories.
+
+  Args:
+    categories: (dict) Categories keyed by function label, which are updated.
+    source: (dict) The categories to merge into them.
+  """
+  for label, category in source.iteritems():
+    if categories.setdefault(label, category) != category:
+      categories[label] = MIXED_CATEGORY
+
+
+def _file_base_name(full_name, run_id):
+  """Gets the base name of the files a test case's profile is saved in."""
+  return re.sub(r'[^\w.-]', '_',
+                '%s.%s-%d' % (full_name, run_id, os.getpid()))
+
+
+def _add_phases(phases, source):
+  """Adds the seconds of each phase in source to the phases of a test case."""
+  for phase, seconds in source.iteritems():
+    phases[phase] = phases.get(phase, 0.0) + seconds
+
+
+class Profiler(object):
+  """Profiles test cases and aggregates their profiles into a report."""
+
+  def __init__(self, directory=None, selector=None, run_id=None):
+    """Initializes a new instance of a Profiler.
+
+    Args:
+      directory: (string) Directory the profiles are saved in (None keeps them
+          in memory).
+      selector: (string|Selector) Only profiles the matching test cases (None
+          profiles all of them).
+      run_id: (string) Part of the names of the saved profiles (defaults to the
+          current time and a random suffix).
+    """
+    self.directory = directory
+    self.run_id = run_id
+    if run_id is None:
+      self.run_id = '%s-%s' % (time.strftime('%Y%m%d%H%M%S'),
+                               uuid.uuid4().hex[:8])
+    self.case_filter = selection.TestCaseFilter(selector)
+    # Phases of the profiled test cases (summed over the loaded runs), keyed by
+    # test case full name.
+    self.cases = {}
+    # Categories of the profiled functions, keyed by function label.
+    self.categories = {}
+    self.stats = None
+    self._lock = threading.Lock()
+    if directory and not os.path.isdir(directory):
+      os.makedirs(directory)
+
+  def should_profile(self, test_case):
+    """Whether the test case is selected to be profiled."""
+    return self.case_filter.matches(test_case)
+
+  def profile(self, function, test_case):
+    """Calls function(test_case), profiling it if the test case is selected.
+
+    Args:
+      function: (function(TestCase)) Calls the test case.
+      test_case: (TestCase) The test case to profile.
+
+    Returns:
+      Whatever the function returns.
+    """
+    if not self.should_profile(test_case):
+      return function(test_case)
+    profile = cProfile.Profile()
+    try:
+      return profile.runcall(function, test_case)
+    finally:
+      self.record(test_case, profile)
+
+  def record(self, test_case, profile):
+    """Records the profile of a test case (and saves it to the directory).
+
+    Args:
+      test_case: (TestCase) The profiled test case.
+      profile: (cProfile.Profile) The profile of the test case.
+    """
+    stats = pstats.Stats(profile)
+    phases, categories = analyze(stats.stats, test_case.test)
+    with self._lock:
+      self.cases[test_case.full_name] = phases
+      merge_categories(self.categories, categories)
+      if self.stats is None:
+        self.stats = stats
+      else:
+        self.stats.add(stats)
+    if not self.directory:
+      return
+    base_path = os.path.join(
+        self.directory, _file_base_name(test_case.full_name, self.run_id))
+    stats.dump_stats(base_path + '.prof')
+    with open(base_path + '.json', 'w') as f:
+      json.dump({'version': PROFILE_VERSION,
+                 'full_name': test_case.full_name,
+                 'phases': phases,
+                 'categories': categories}, f, sort_keys=True)
+
+  def load(self):
+    """Loads all of the profiles saved in the directory.
+
+    That includes the profiles of other runs and processes; the phases of a
+    test case that was profiled more than once are summed. The profiles that
+    are in memory are replaced.
+    """
+    self.cases = {}
+    self.categories = {}
+    self.stats = None
+    for json_path in sorted(glob.glob(os.path.join(self.directory, '*.json'))):
+      with open(json_path) as f:
+        source = json.load(f)
+      if source.get('version') != PROFILE_VERSION:
+        continue
+      profile_path = os.path.splitext(json_path)[0] + '.prof'
+      if not os.path.exists(profile_path):
+        continue
+      _add_phases(self.cases.setdefault(source['full_name'], {}),
+                  source['phases'])
+      merge_categories(self.categories, source['categories'])
+      if self.stats is None:
+        self.stats = pstats.Stats(profile_path)
+      else:
+        self.stats.add(profile_path)
+
+  def phase_totals(self):
+    """Gets the number of seconds of each phase, over all profiled cases."""
+    totals = dict((phase, 0.0) for phase in PHASES)
+    for phases in self.cases.itervalues():
+      for phase in PHASES:
+        totals[phase] += phases.get(phase, 0.0)
+    return totals
+
+  def hot_spots(self, limit=20):
+    """Gets the functions that took the most (own) time.
+
+    Args:
+      limit: (int) The maximum number of functions.
+
+    Returns:
+      [(string, string, int, float, float)]: The label, category, number of
+          calls, own time and cumulative time of each function, starting with
+          the one with the most own time.
+    """
+    if self.stats is None:
+      return []
+    rows = []
+    for function, (_, calls, own, cumulative, _) in (
+        self.stats.stats.iteritems()):
+      label = function_label(function)
+      rows.append((label, self.categories.get(label, 'framework'), calls, own,
+                   cumulative))
+    rows.sort(key=lambda row: (-row[3], row[0]))
+    return rows[:limit]
+
+  def report(self, limit=20):
+    """Formats the phases and hot spots of the profiled test cases.
+
+    Args:
+      limit: (int) The maximum number of hot spots.
+
+    Returns:
+      string: The report.
+    """
+    totals = self.phase_totals()
+    lines = ['Profiled %d test case(s): %s' % (
+        len(self.cases),
+        ', '.join('%s %.3fs' % (phase, totals[phase]) for phase in PHASES))]
+    lines.append('%10s %10s %10s  %-9s  %s' % (
+        'tottime', 'cumtime', 'calls', 'category', 'function'))
+    for label, category, calls, own, cumulative in self.hot_spots(limit):
+      lines.append('%10.4f %10.4f %10d  %-9s  %s' % (
+          own, cumulative, calls, category, label))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+  """Prints the report of the profiles saved in a directory.
+
+  Args:
+    argv: ([string]) The command line arguments (defaults to sys.argv[1:]).
+
+  Returns:
+    int: The exit code.
+  """
+  parser = argparse.ArgumentParser(
+      description='Reports the hot spots of profiled Checkers test cases.')
+  parser.add_argument('directory', help='Directory of the saved profiles.')
+  parser.add_argument('--limit', type=int, default=30,
+                      help='Maximum number of functions to report.')
+  args = parser.parse_args(argv)
+  profiler = Profiler(args.directory)
+  profiler.load()
+  print profiler.report(args.limit)
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,226 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Result cache that skips test cases which passed before and haven't changed.
+
+Each test case gets a key, which is a hash of everything the cache knows the
+test case depends on:
+
+  * the code of the test (the code object of a function test, or the __call__
+    method of other tests),
+  * the code of the test case's setup and teardown functions,
+  * the values of the test case's parameterization (using their repr), and
+  * the source of the modules the cache was configured with (usually the
+    modules under test).
+
+When a test case passes, its key is recorded. The next time the test case has
+the same key, it isn't run; it gets a PASSED result whose cached flag is set
+instead. Test cases that fail are always run again.
+
+The cache can only see the dependencies listed above, so it is opt-in: pass a
+ResultCache to the TestRunner and configure it with the modules whose changes
+should invalidate it. Test cases whose keys can't be computed (e.g. because
+their setup is a callable object rather than a function) are always run, and
+so are the test cases of tests that aren't cacheable (like benchmarks).
+"""
+
+import hashlib
+import os
+import sys
+import types
+
+import json_files
+import test_result
+
+# Version of the cache file format (see json_files).
+CACHE_VERSION = 1
+
+
+def _code_fingerprint(code):
+  """Gets the parts of a code object that define what it does.
+
+  Line numbers and file names are left out, so moving a function around (or
+  checking it out somewhere else) doesn't change its fingerprint.
+
+  Args:
+    code: (code) The code object.
+
+  Returns:
+    string: The fingerprint of the code object.
+  """
+  constants = []
+  for constant in code.co_consts:
+    if isinstance(constant, types.CodeType):
+      constants.append(_code_fingerprint(constant))
+    else:
+      constants.append(repr(constant))
+  return repr((code.co_code, constants, code.co_names, code.co_varnames,
+               code.co_freevars, code.co_cellvars))
+
+
+def _function_fingerprint(function):
+  """Gets the fingerprint of a function's code (None if it has no code)."""
+  function = getattr(function, 'im_func', function)
+  code = getattr(function, 'func_code', None)
+  if code is None:
+    return None
+  return _code_fingerprint(code)
+
+
+def _test_fingerprint(test):
+  """Gets the fingerprint of a test's code (None if it has no code)."""
+  function = getattr(test, 'function', None)
+  if function is None:
+    function = type(test).__call__
+  return _function_fingerprint(function)
+
+
+def _parameterization_fingerprint(test_case):
+  """Gets the fingerprint of the test case's parameterization values."""
+  if test_case.parameterization is None:
+    # A test case that wasn't generated from a parameterization can still have
+    # variables (if it was created some other way), which can't be seen here.
+    return '' if test_case.full_name == test_case.test.full_name else None
+  variables = test_case.parameterization.variables
+  return repr(sorted((key, repr(variables[key])) for key in variables))
+
+
+def module_source_hash(module):
+  """Hashes the source file of a module.
+
+  Args:
+    module: (module|string) The module (or the name of a loaded module).
+
+  Returns:
+    string: The hex SHA-1 of the module's source (or of its name, for modules
+        that don't have a source file).
+  """
+  if isinstance(module, basestring):
+    module = sys.modules[module]
+  file_path = getattr(module, '__file__', None)
+  if not file_path:
+    return hashlib.sha1(module.__name__).hexdigest()
+  source_path = os.path.splitext(file_path)[0] + '.py'
+  if os.path.exists(source_path):
+    file_path = source_path
+  with open(file_path, 'rb') as f:
+    return hashlib.sha1(f.read()).hexdigest()
+
+
+class ResultCache(object):
+  """Remembers which test cases passed, and with which keys."""
+
+  def __init__(self, file_path=None, modules=()):
+    """Initializes a new instance of a ResultCache.
+
+    Args:
+      file_path: (string) The file the cache is loaded from and saved to (None
+          keeps the cache in memory).
+      modules: (iterable) Modules (or module names) whose source is part of
+          every key.
+    """
+    self.file_path = file_path
+    self.modules = list(modules)
+    self._modules_hash = None
+    # Keys computed by lookup, for record to reuse, keyed by test case full
+    # name.
+    self._keys = {}
+    # Keys of the test cases that passed, keyed by test case full name.
+    self.entries = {}
+    if file_path and os.path.exists(file_path):
+      self.load()
+
+  @property
+  def modules_hash(self):
+    """The combined source hash of the configured modules."""
+    if self._modules_hash is None:
+      self._modules_hash = ','.join(
+          module_source_hash(module) for module in self.modules)
+    return self._modules_hash
+
+  def key(self, test_case):
+    """Computes the key of a test case.
+
+    Args:
+      test_case: (TestCase) The test case.
+
+    Returns:
+      string: The key (None if the test case can't be cached).
+    """
+    test = test_case.test
+    if not test.cacheable:
+      return None
+    parts = [test_case.full_name, _test_fingerprint(test),
+             _parameterization_fingerprint(test_case)]
+    parts.extend(_function_fingerprint(f) for f in test.setup.values())
+    parts.append('|')
+    parts.extend(_function_fingerprint(f) for f in test.teardown.values())
+    if None in parts:
+      return None
+    parts.append(self.modules_hash)
+    return hashlib.sha1('\0'.join(parts)).hexdigest()
+
+  def lookup(self, test_case):
+    """Gets the cached result of a test case that passed before.
+
+    Args:
+      test_case: (TestCase) The test case about to be run.
+
+    Returns:
+      TestResult: A cached PASSED result (None if the test case must run).
+    """
+    full_name = test_case.full_name
+    if full_name not in self.entries:
+      return None
+    key = self.key(test_case)
+    if self.entries[full_name] != key:
+      self._keys[full_name] = key
+      return None
+    result = test_result.TestResult(
+        test_case.context, test_result.TestResultStatus.PASSED,
+        message='passed (cached)')
+    result.cached = True
+    return result
+
+  def record(self, test_case, result):
+    """Records the result of a test case that was run.
+
+    Args:
+      test_case: (TestCase) The test case that was run.
+      result: (TestResult) The result of the test case.
+    """
+    looked_up = test_case.full_name in self._keys
+    key = self._keys.pop(test_case.full_name, None)
+    if result.cached or result.status == test_result.TestResultStatus.NOT_RUN:
+      return
+    if result.status != test_result.TestResultStatus.PASSED:
+      key = None
+    elif not looked_up:
+      key = self.key(test_case)
+    if key:
+      self.entries[test_case.full_name] = key
+    else:
+      self.entries.pop(test_case.full_name, None)
+
+  def load(self):
+    """Loads the entries from the cache file (if it's a supported version)."""
+    source = json_files.load(self.file_path, CACHE_VERSION)
+    if source:
+      self.entries = dict(source['entries'])
+
+  def save(self):
+    """Saves the entries to the cache file (if the cache has one)."""
+    if not self.file_path:
+      return
+    json_files.save(self.file_path, CACHE_VERSION, {'entries': self.entries})
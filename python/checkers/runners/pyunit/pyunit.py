@@ -26,6 +26,15 @@ this allows us to place a test case into multiple test suites without running
 tests multiple times. It also gives us some control over sharding should the
 need arise someday.
 
+Alternatively, the tests can be run lazily (pass lazy=True to main). In that
+mode, the Checkers test cases are generated when PyUnit loads the tests, but
+each test case is only executed when PyUnit actually invokes its test method.
+That way PyUnit features like failfast and progress reporting behave as they
+would for regular PyUnit tests, and stopping a run early skips the work for the
+remaining tests. The test run's setup functions are called right before the
+first test case runs and its teardown functions once PyUnit has finished with
+all of the run's test suites.
+
 Note: PyUnit is now the unittest module, but it's easier to use PyUnit as the
 general notion of tests structured to use unittest.
 
@@ -52,13 +61,18 @@ if __name__ == '__main__':
 
 """
 
+import getopt
 import sys
 import traceback
 import unittest
 
 import checkers
 
-def run_test_run(test_run):
+# The command line options of the PyUnit main (see unittest.TestProgram).
+_MAIN_SHORT_OPTIONS = 'hHvqfcb'
+_MAIN_LONG_OPTIONS = ['help', 'verbose', 'quiet', 'failfast', 'catch', 'buffer']
+
+def run_test_run(test_run, test_runner=None):
   """Runs all of the tests in the test run and returns the results in suites.
 
   This function returns a registry that is keyed by the test suite names, and
@@ -67,35 +81,151 @@ def run_test_run(test_run):
 
   Args:
     test_run: (TestRun) The test run containing the tests to be run.
+    test_runner: (TestRunner) Runs the test cases (defaults to a TestRunner).
 
   Returns:
     Registry(suite_name, TestResultRegistry)
   """
+  if not test_runner:
+    test_runner = checkers.TestRunner()
   # Run all of the tests and get the test results.
-  results = checkers.Registry()
-  for setup in test_run.setup.values():
-    setup(test_run)
-  for test_case in test_run.generate_test_cases.values():
-    if test_case.full_name not in results:
-      results[test_case.full_name] = test_case()
-    result = results[test_case.full_name]
-  for teardown in test_run.teardown.values():
-    teardown(test_run)
+  results = test_runner.run(test_run)
 
   # Group all of the test results by their test suites.
+  return group_by_suite(test_run, results.values(),
+                        lambda result: result.context.test_case)
+
+
+def group_by_suite(test_run, items, test_case_getter):
+  """Groups test results (or test cases) by the test suites they belong to.
+
+  Args:
+    test_run: (TestRun) The test run that the items belong to.
+    items: (iterable) The test results (or test cases) to group.
+    test_case_getter: (function(item)) Gets the test case for an item.
+
+  Returns:
+    Registry(suite_name, AutoKeyRegistry) keyed by the test case full names.
+  """
   suites = checkers.Registry()
-  for result in results.values():
-    for suite in result.context.test_case.test_suites.values():
+  for item in items:
+    for suite in test_case_getter(item).test_suites.values():
       suite_name = test_run.name
       if suite.name:
         suite_name = '%s.%s' % (test_run.name, suite.name)
       if suite_name not in suites:
         suites.register(suite_name, checkers.AutoKeyRegistry(
-            lambda tr: tr.context.test_case.full_name))
-      suites[suite_name].register(result)
+            lambda i: test_case_getter(i).full_name))
+      suites[suite_name].register(item)
   return suites
 
 
+class LazyTestRunState(object):
+  """Keeps track of a test run whose test cases run when PyUnit invokes them.
+
+  The test run's setup functions are called right before the first test case is
+  executed, and each test case is executed at most once (even though it may be
+  a member of several suites). Teardown only happens if setup happened.
+  """
+
+  def __init__(self, test_run, test_runner=None, test_cases=None):
+    """Initializes a new instance of a LazyTestRunState.
+
+    Args:
+      test_run: (TestRun) The test run whose test cases will be run lazily.
+      test_runner: (TestRunner) Runs the test cases (defaults to a TestRunner).
+      test_cases: (iterable) The test cases of the test run.
+    """
+    self.test_run = test_run
+    self.test_cases = test_cases
+    self.test_runner = test_runner if test_runner else checkers.TestRunner()
+    self.results = checkers.Registry()
+    self.is_setup = False
+    self.failures = 0
+
+  def setup(self):
+    """Calls the test run's setup functions (if they haven't been called)."""
+    if self.is_setup:
+      return
+    self.is_setup = True
+    self.test_runner.setup_test_run(self.test_run, self.test_cases)
+
+  def teardown(self):
+    """Calls the test run's teardown functions if the run was set up."""
+    if not self.is_setup:
+      return
+    self.is_setup = False
+    self.test_runner.teardown_test_run(self.test_run)
+
+  def run_test_case(self, test_case):
+    """Runs the test case (unless it already ran) and returns its result.
+
+    Once the test runner's maximum number of failures has been reached, the
+    remaining test cases are not run anymore.
+
+    Args:
+      test_case: (TestCase) The test case to run.
+
+    Returns:
+      TestResult: The result of running the test case.
+    """
+    if test_case.full_name not in self.results:
+      if self.test_runner.should_stop(self.failures):
+        result = self.test_runner.create_not_run_result(test_case)
+      else:
+        self.setup()
+        self.test_run.events.emit(checkers.events.EventType.CASE_SCHEDULED,
+                                  test_case)
+        result = self.test_runner.run_test_case(test_case)
+        self.test_runner.record_result(test_case, result)
+        if result.failed:
+          self.failures += 1
+      self.results[test_case.full_name] = result
+    return self.results[test_case.full_name]
+
+
+class LazyTestRunSuite(unittest.TestSuite):
+  """PyUnit test suite that tears down a lazily-run test run when it is done."""
+
+  def __init__(self, state, tests=()):
+    """Initializes a new instance of a LazyTestRunSuite.
+
+    Args:
+      state: (LazyTestRunState) State of the test run the tests belong to.
+      tests: (iterable) PyUnit tests to add to the suite.
+    """
+    super(LazyTestRunSuite, self).__init__(tests)
+    self.state = state
+
+  def run(self, result, *args, **kwargs):
+    """Runs the tests in the suite and then tears down the test run."""
+    try:
+      return super(LazyTestRunSuite, self).run(result, *args, **kwargs)
+    finally:
+      self.state.teardown()
+
+
+class BenchmarkReportSuite(unittest.TestSuite):
+  """PyUnit test suite that reports the benchmark results once it is done."""
+
+  def __init__(self, results_getter, tests=()):
+    """Initializes a new instance of a BenchmarkReportSuite.
+
+    Args:
+      results_getter: (function()) Gets the results of the Checkers test cases.
+      tests: (iterable) PyUnit tests to add to the suite.
+    """
+    super(BenchmarkReportSuite, self).__init__(tests)
+    self.results_getter = results_getter
+
+  def run(self, result, *args, **kwargs):
+    """Runs the tests in the suite and then writes the benchmark report."""
+    try:
+      return super(BenchmarkReportSuite, self).run(result, *args, **kwargs)
+    finally:
+      checkers.benchmarks.write_report(self.results_getter(), sys.stderr)
+
+
 def create_pyunit_test_method(result):
   """Creates a test method to be added to the PyUnit TestCase class.
 
@@ -116,14 +246,55 @@ def create_pyunit_test_method(result):
     re-raise it as if it had just happened. This is to trick PyUnit into
     thinking it just ran a test. :P
     """
-    if result.exc_info:
-      raise result.exc_info[1], None, result.exc_info[2]
+    _reraise_result(result)
+
+  return _name_pyunit_test_method(pyunit_test_method,
+                                  result.context.test_case)
+
+
+def create_lazy_pyunit_test_method(test_case, state):
+  """Creates a test method that runs the test case when PyUnit invokes it.
+
+  Args:
+    test_case: (TestCase) The test case that the method should run.
+    state: (LazyTestRunState) State of the test run the test case belongs to.
+
+  Returns:
+    function: The method that will be added to the PyUnit TestCase class.
+  """
+
+  def pyunit_test_method(_):
+    """Runs the Checkers test case and re-raises any exception it raised."""
+    _reraise_result(state.run_test_case(test_case))
+
+  return _name_pyunit_test_method(pyunit_test_method, test_case)
 
-  test_method = pyunit_test_method
-  test_method.func_name = str(result.context.test_case.name)
+
+def _reraise_result(result):
+  """Raises whatever the test case raised so that PyUnit reports the result.
+
+  Test cases that were not run are reported to PyUnit as skipped tests. The
+  output captured from test cases that failed is written to stderr first.
+
+  Args:
+    result: (TestResult) The result from running the test case.
+  """
+  if result.status == checkers.TestResultStatus.NOT_RUN:
+    raise unittest.SkipTest(result.message)
+  if result.output:
+    sys.stderr.write('\n--- Output of %s ---\n%s\n--- End of output ---\n'
+                     % (result.context.test_case.full_name,
+                        result.output.rstrip('\n')))
+  if result.exc_info:
+    raise result.exc_info[1], None, result.exc_info[2]
+
+
+def _name_pyunit_test_method(test_method, test_case):
+  """Gives the test method the name and docstring of the test case."""
+  test_method.func_name = str(test_case.name)
   if not test_method.func_name.startswith('test'):
     test_method.func_name = 'test_%s' % test_method.func_name
-  test_method.func_doc = result.context.test_case.description
+  test_method.func_doc = test_case.description
   return test_method
 
 
@@ -146,8 +317,9 @@ def create_pyunit_test_suite(parent_module_name, suite_name, test_run,
   """
   test_class_attrs = {}
   for result in test_results.values():
-    test_name = result.context.test_case.name
-    test_class_attrs[test_name] = create_pyunit_test_method(result)
+    # The method's name starts with 'test', so that PyUnit finds it.
+    test_method = create_pyunit_test_method(result)
+    test_class_attrs[test_method.func_name] = test_method
   test_class_attrs['test_run'] = test_run
   cls_name = suite_name
   cls = type(cls_name, (test_suite_type,), test_class_attrs)
@@ -155,8 +327,34 @@ def create_pyunit_test_suite(parent_module_name, suite_name, test_run,
   return cls
 
 
+def create_lazy_pyunit_test_suite(parent_module_name, suite_name, test_run,
+                                  test_cases, state, test_suite_type):
+  """Creates a PyUnit TestCase class whose tests run the Checkers test cases.
+
+  Args:
+    parent_module_name: (string) Name of the module to put the generated tests.
+    suite_name: (string) Name of the test suite where the test should be stored.
+    test_run: (TestRun) Test run that is responsible for running the test.
+    test_cases: (TestCaseRegistry) Set of test cases for the test suite.
+    state: (LazyTestRunState) State of the test run the test cases belong to.
+    test_suite_type: (type) Base type for the generated PyUnit test cases.
+
+  Returns:
+    A unittest.TestCase class containing the test functions for the suite.
+  """
+  test_class_attrs = {}
+  for test_case in test_cases.values():
+    test_method = create_lazy_pyunit_test_method(test_case, state)
+    test_class_attrs[test_method.func_name] = test_method
+  test_class_attrs['test_run'] = test_run
+  cls = type(suite_name, (test_suite_type,), test_class_attrs)
+  cls.__module__ = parent_module_name
+  return cls
+
+
 def create_pyunit_test_suites(module, checkers_test_runs, checkers_test_results,
-                              test_suite_type, pyunit_discovered_tests=None):
+                              test_suite_type, pyunit_discovered_tests=None,
+                              test_runner=None):
   """Creates a PyUnit TestSuite that contains all of the real test suites.
 
   Note on terminiology: in the unittest module, all of the tests and test suites
@@ -169,18 +367,51 @@ def create_pyunit_test_suites(module, checkers_test_runs, checkers_test_results,
     module: (module) Module where the generated test suites should be placed.
     checkers_test_runs: ([TestRun]) Set of Checkers test runs to execute.
     checkers_test_results: (Registry(str, TestResultRegistry)) See run_test_run.
+        If None, the test cases are run lazily as PyUnit invokes them.
     test_suite_type: (type) Base type for the generated PyUnit test cases.
     pyunit_discovered_tests: (unittest.TestSuite): Previously-discovered tests.
+    test_runner: (TestRunner) Runs the test cases when they are run lazily.
+
+  Once all of the tests have run, the statistics of the Checkers benchmarks that
+  ran (if any) are written to stderr.
 
   Returns:
     unittest.TestSuite containing *all* of the tests, both PyUnit and Checkers.
   """
-  pyunit_suite = unittest.TestSuite()
+  states = []
+
+  def checkers_results():
+    """Gets the results of the Checkers test cases (each one only once)."""
+    results = {}
+    for state in states:
+      results.update(state.results)
+    if checkers_test_results is not None:
+      for result_suites in checkers_test_results.itervalues():
+        for suite_results in result_suites.itervalues():
+          results.update(suite_results)
+    return results.values()
+
+  pyunit_suite = BenchmarkReportSuite(checkers_results)
   if pyunit_discovered_tests:
     pyunit_suite.addTest(pyunit_discovered_tests)
 
   loader = unittest.defaultTestLoader
   for run in checkers_test_runs:
+    if checkers_test_results is None:
+      # The tests are run lazily, so only the test cases are generated here.
+      test_cases = run.generate_test_cases.values()
+      state = LazyTestRunState(run, test_runner, test_cases)
+      states.append(state)
+      run_suite = LazyTestRunSuite(state)
+      test_case_suites = group_by_suite(run, test_cases,
+                                        lambda test_case: test_case)
+      for suite_name, test_cases in test_case_suites.iteritems():
+        pyunit_test_suite = create_lazy_pyunit_test_suite(
+            module.__name__, suite_name, run, test_cases, state,
+            test_suite_type)
+        run_suite.addTest(loader.loadTestsFromTestCase(pyunit_test_suite))
+      pyunit_suite.addTest(run_suite)
+      continue
     result_suites = checkers_test_results[run.name]
     for suite_name, results  in result_suites.iteritems():
       pyunit_test_suite = create_pyunit_test_suite(
@@ -190,7 +421,8 @@ def create_pyunit_test_suites(module, checkers_test_runs, checkers_test_results,
 
 
 def load_checkers_tests(module, test_runs, checkers_test_results,
-                        test_suite_type, include_pyunit_tests):
+                        test_suite_type, include_pyunit_tests,
+                        test_runner=None):
   """Load Checkers tests so that they'll be discoverable by PyUnit.
 
   Using the load_tests protocol, this will register a load_tests function in the
@@ -200,8 +432,10 @@ def load_checkers_tests(module, test_runs, checkers_test_results,
     module: (module) Module where the generated test suites should be placed.
     test_runs: ([TestRun]) Set of Checkers test runs to execute.
     checkers_test_results: (Registry(str, TestResultRegistry)) See run_test_run.
+        If None, the test cases are run lazily as PyUnit invokes them.
     test_suite_type: (type) Base type for the generated PyUnit test cases.
     include_pyunit_tests: (bool): Include any discovered PyUnit-based tests.
+    test_runner: (TestRunner) Runs the test cases when they are run lazily.
   """
   # TODO(barkimedes): If there is an existing load_tests function, call it.
   def pyunit_load_tests(loader, tests, pattern):  # pylint: disable=unused-argument, g-line-too-long
@@ -210,7 +444,8 @@ def load_checkers_tests(module, test_runs, checkers_test_results,
     result = None
     try:
       result = create_pyunit_test_suites(
-          module, test_runs, checkers_test_results, test_suite_type, tests)
+          module, test_runs, checkers_test_results, test_suite_type, tests,
+          test_runner)
     except:
       traceback.print_exc()
       raise
@@ -218,10 +453,39 @@ def load_checkers_tests(module, test_runs, checkers_test_results,
   setattr(module, 'load_tests', pyunit_load_tests)
 
 
+def _main_options(kwargs):
+  """Works out the failfast and buffer options that the PyUnit main will use.
+
+  Like the PyUnit main, the options that aren't passed as keyword arguments are
+  taken from the command line (-f/--failfast and -b/--buffer).
+
+  Args:
+    kwargs: (dict) The keyword arguments for the PyUnit main.
+
+  Returns:
+    (bool, bool): Whether to stop on the first failure, and whether to capture
+        the output of the test cases.
+  """
+  argv = kwargs.get('argv') or sys.argv
+  try:
+    options, _ = getopt.getopt(argv[1:], _MAIN_SHORT_OPTIONS,
+                               _MAIN_LONG_OPTIONS)
+  except getopt.error:
+    options = []  # The PyUnit main reports the usage error.
+  names = set(name for name, _ in options)
+  failfast = kwargs.get('failfast')
+  if failfast is None:
+    failfast = bool(names & set(['-f', '--failfast']))
+  buffer_output = kwargs.get('buffer')
+  if buffer_output is None:
+    buffer_output = bool(names & set(['-b', '--buffer']))
+  return bool(failfast), bool(buffer_output)
+
+
 def main(test_runs=None, test_run=None, module=None,
          include_pyunit_tests=True, main_module=unittest,
-         test_suite_type=unittest.TestCase,
-         *args, **kwargs):
+         test_suite_type=unittest.TestCase, lazy=False,
+         selection=None, test_runner=None, *args, **kwargs):
   """Main function that will run both Checkers and PyUnit tests.
 
   Args:
@@ -231,6 +495,12 @@ def main(test_runs=None, test_run=None, module=None,
     include_pyunit_tests: (bool): Include any discovered PyUnit-based tests.
     main_module: (module) Module that defines the PyUnit main method to use.
     test_suite_type: (type) Base type for the generated PyUnit test cases.
+    lazy: (bool) Run each test case only when PyUnit invokes its test method.
+    selection: (string|Selector) Selects which test cases to generate and run.
+    test_runner: (TestRunner) Runs the test cases. By default, a TestRunner that
+        honors the failfast and buffer options of the PyUnit main (passed as
+        keyword arguments or on the command line) is used (buffer captures the
+        output of the test cases, see capture).
     *args: (tuple) Positional arguments to pass through to the real main.
     **kwargs: (dict) Keyword arguments to pass through to the real main.
 
@@ -246,13 +516,26 @@ def main(test_runs=None, test_run=None, module=None,
   if not test_runs:
     test_run = checkers.TestRun.from_module(module)
     test_runs.append(test_run)
-  checkers_results = {}
-  for run in test_runs:
-    checkers_results[run.name] = run_test_run(run)
+  if selection:
+    for run in test_runs:
+      run.select(selection)
+  if not test_runner:
+    failfast, buffer_output = _main_options(kwargs)
+    output_capture = None
+    if buffer_output:
+      output_capture = checkers.OutputCapture()
+    test_runner = checkers.TestRunner(failfast=failfast,
+                                      output_capture=output_capture)
+  checkers_results = None
+  if not lazy:
+    checkers_results = {}
+    for run in test_runs:
+      checkers_results[run.name] = run_test_run(run, test_runner)
 
   # Load the test results into the PyUnit test suites for discovery.
   load_checkers_tests(module, test_runs, checkers_results,
                       test_suite_type=test_suite_type,
-                      include_pyunit_tests=include_pyunit_tests)
+                      include_pyunit_tests=include_pyunit_tests,
+                      test_runner=test_runner)
   return main_module.main(*args, **kwargs)
 
@@ -0,0 +1,450 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Selection expressions that choose which test cases of a test run to run.
+
+Selection happens before test cases are generated. Each test case that a test
+run *would* generate is described by a CaseCandidate, and a Selector decides
+whether the candidate should be kept. Tests (and parameterizations) that are not
+selected are pruned from the test run, so they are never generated or run.
+
+Selectors can be combined with the &, | and ~ operators, or parsed from a
+selection expression. Selection expressions are made up of terms that are
+combined with 'and', 'or', 'not' and parentheses:
+
+  name:<glob>     Test case name (or full name) matches the glob.
+  re:<regex>      Test case full name matches (re.search) the regex.
+  suite:<glob>    Test case is a member of a suite whose name matches the glob.
+  param:<glob>    Name of the test case's parameterization matches the glob.
+  <glob>          Same as name:<glob>.
+
+Example:
+
+  # Runs the addition tests, except the ones with negative numbers.
+  test_run.select('suite:addition and not param:*n*')
+"""
+
+import fnmatch
+import re
+
+import registry
+
+_GLOBAL_SUITE_NAME = 'all'
+
+
+class CaseCandidate(object):
+  """Describes a test case that a test run would generate."""
+
+  def __init__(self, name, full_name, test_full_name, parameterization_name=None,
+               suite_names=None):
+    """Initializes a new instance of a CaseCandidate.
+
+    Args:
+      name: (string) The name of the test case.
+      full_name: (string) The fully-qualified name of the test case.
+      test_full_name: (string) The fully-qualified name of the case's test.
+      parameterization_name: (string) The case's parameterization (if any).
+      suite_names: (set) Names of the suites that the test case belongs to.
+    """
+    self.name = name
+    self.full_name = full_name
+    self.test_full_name = test_full_name
+    self.parameterization_name = parameterization_name
+    self.suite_names = set(suite_names) if suite_names else set()
+
+
+class Selector(object):
+  """Base class for selectors, which decide whether to keep a test case."""
+
+  def matches(self, candidate):
+    """Decides whether the test case should be selected.
+
+    Args:
+      candidate: (CaseCandidate) The test case that may be selected.
+
+    Returns:
+      bool: Whether the test case is selected.
+    """
+    raise NotImplementedError('The subclass must implement this method.')
+
+  def __and__(self, other):
+    return AndSelector(self, other)
+
+  def __or__(self, other):
+    return OrSelector(self, other)
+
+  def __invert__(self):
+    return NotSelector(self)
+
+
+class NameSelector(Selector):
+  """Selects test cases whose name or full name matches a glob pattern."""
+
+  def __init__(self, pattern):
+    self.pattern = pattern
+
+  def matches(self, candidate):
+    return (fnmatch.fnmatchcase(candidate.name, self.pattern) or
+            fnmatch.fnmatchcase(candidate.full_name, self.pattern))
+
+
+class RegexSelector(Selector):
+  """Selects test cases whose full name matches a regular expression."""
+
+  def __init__(self, pattern):
+    self.pattern = re.compile(pattern)
+
+  def matches(self, candidate):
+    return bool(self.pattern.search(candidate.full_name))
+
+
+class SuiteSelector(Selector):
+  """Selects test cases that are members of a suite matching a glob pattern."""
+
+  def __init__(self, pattern):
+    self.pattern = pattern
+
+  def matches(self, candidate):
+    for suite_name in candidate.suite_names:
+      if fnmatch.fnmatchcase(suite_name, self.pattern):
+        return True
+    return False
+
+
+class ParameterizationSelector(Selector):
+  """Selects test cases whose parameterization name matches a glob pattern."""
+
+  def __init__(self, pattern):
+    self.pattern = pattern
+
+  def matches(self, candidate):
+    if candidate.parameterization_name is None:
+      return False
+    return fnmatch.fnmatchcase(candidate.parameterization_name, self.pattern)
+
+
+class CaseNameSelector(Selector):
+  """Selects test cases whose full name is in a given set of names."""
+
+  def __init__(self, full_names):
+    self.full_names = frozenset(full_names)
+
+  def matches(self, candidate):
+    return candidate.full_name in self.full_names
+
+
+class AndSelector(Selector):
+  """Selects test cases that are selected by all of the given selectors."""
+
+  def __init__(self, *selectors):
+    self.selectors = selectors
+
+  def matches(self, candidate):
+    return all(s.matches(candidate) for s in self.selectors)
+
+
+class OrSelector(Selector):
+  """Selects test cases that are selected by any of the given selectors."""
+
+  def __init__(self, *selectors):
+    self.selectors = selectors
+
+  def matches(self, candidate):
+    return any(s.matches(candidate) for s in self.selectors)
+
+
+class NotSelector(Selector):
+  """Selects test cases that are not selected by the given selector."""
+
+  def __init__(self, selector):
+    self.selector = selector
+
+  def matches(self, candidate):
+    return not self.selector.matches(candidate)
+
+
+_TERM_TYPES = {
+    'name': NameSelector,
+    're': RegexSelector,
+    'suite': SuiteSelector,
+    'param': ParameterizationSelector,
+}
+
+_KEYWORDS = ('and', 'or', 'not', '(', ')')
+
+
+def _tokenize(expression):
+  """Splits a selection expression into its tokens.
+
+  Parentheses are only treated as separate tokens at the start of a term or
+  when they're unbalanced at the end of it, so regexes like re:test_(add|sub)
+  don't need to be quoted.
+
+  Args:
+    expression: (string) The selection expression.
+
+  Returns:
+    list(string): The tokens of the expression.
+  """
+  tokens = []
+  for word in expression.split():
+    while word.startswith('('):
+      tokens.append('(')
+      word = word[1:]
+    closing = 0
+    while word.endswith(')') and word.count(')') > word.count('('):
+      closing += 1
+      word = word[:-1]
+    if word:
+      tokens.append(word)
+    tokens.extend([')'] * closing)
+  return tokens
+
+
+class _Parser(object):
+  """Recursive descent parser for selection expressions."""
+
+  def __init__(self, expression):
+    self.expression = expression
+    self.tokens = _tokenize(expression)
+    self.position = 0
+
+  def _peek(self):
+    if self.position < len(self.tokens):
+      return self.tokens[self.position]
+    return None
+
+  def _next(self):
+    token = self._peek()
+    if token is None:
+      raise ValueError('unexpected end of selection <%s>' % self.expression)
+    self.position += 1
+    return token
+
+  def parse(self):
+    selector = self._parse_or()
+    if self._peek() is not None:
+      raise ValueError('unexpected <%s> in selection <%s>' % (
+          self._peek(), self.expression))
+    return selector
+
+  def _parse_or(self):
+    selectors = [self._parse_and()]
+    while self._peek() == 'or':
+      self._next()
+      selectors.append(self._parse_and())
+    if len(selectors) == 1:
+      return selectors[0]
+    return OrSelector(*selectors)
+
+  def _parse_and(self):
+    selectors = [self._parse_not()]
+    while self._peek() == 'and':
+      self._next()
+      selectors.append(self._parse_not())
+    if len(selectors) == 1:
+      return selectors[0]
+    return AndSelector(*selectors)
+
+  def _parse_not(self):
+    if self._peek() == 'not':
+      self._next()
+      return NotSelector(self._parse_not())
+    return self._parse_term()
+
+  def _parse_term(self):
+    token = self._next()
+    if token == '(':
+      selector = self._parse_or()
+      if self._next() != ')':
+        raise ValueError('expected <)> in selection <%s>' % self.expression)
+      return selector
+    if token in _KEYWORDS:
+      raise ValueError('unexpected <%s> in selection <%s>' % (
+          token, self.expression))
+    kind, separator, value = token.partition(':')
+    if separator and kind in _TERM_TYPES:
+      return _TERM_TYPES[kind](value)
+    return NameSelector(token)
+
+
+def parse(expression):
+  """Parses a selection expression into a selector.
+
+  Args:
+    expression: (string) The selection expression (see the module docstring).
+
+  Returns:
+    Selector: The selector that the expression describes.
+
+  Raises:
+    ValueError: The expression is not a valid selection expression.
+  """
+  return _Parser(expression).parse()
+
+
+def to_selector(selection):
+  """Converts a selection (expression or selector) into a selector.
+
+  Args:
+    selection: (string|Selector) The selection expression or selector.
+
+  Returns:
+    Selector: The selector for the selection.
+  """
+  if isinstance(selection, Selector):
+    return selection
+  return parse(selection)
+
+
+def test_parameterizations(test_run, test):
+  """Gets the parameterizations that the test run will apply to a test.
+
+  Args:
+    test_run: (TestRun) The test run that the test belongs to.
+    test: (Test) The test to get the parameterizations for.
+
+  Returns:
+    AutoKeyRegistry: The parameterizations, keyed by name.
+  """
+  parameterizations = registry.AutoKeyRegistry(lambda param: param.name)
+  if test.full_name in test_run.parameterizations:
+    parameterizations.merge(test_run.parameterizations[test.full_name])
+  parameterizations.merge(test.decorator_parameterizations,
+                          replace_existing=True)
+  return parameterizations
+
+
+def case_candidate(test_run, test, parameterization=None):
+  """Describes the test case the test run would generate for the test.
+
+  Args:
+    test_run: (TestRun) The test run that the test belongs to.
+    test: (Test) The test that the test case would be generated from.
+    parameterization: (Parameterization) The test case's parameterization.
+
+  Returns:
+    CaseCandidate: The description of the test case.
+  """
+  name = test.name
+  full_name = test.full_name
+  parameterization_name = None
+  suite_names = set(test.test_suite_names)
+  suite_names.add(_GLOBAL_SUITE_NAME)
+  if parameterization:
+    parameterization_name = parameterization.name
+    name = '%s_%s' % (test.name, parameterization.name)
+    full_name = '%s_%s' % (test.full_name, parameterization.name)
+    suite_names |= parameterization.suites
+  for suite in test_run.test_suites.values():
+    if test.full_name in suite or full_name in suite:
+      suite_names.add(suite.name)
+  return CaseCandidate(name, full_name, test.full_name, parameterization_name,
+                       suite_names)
+
+
+def test_case_candidate(test_case):
+  """Describes a test case that has already been generated.
+
+  Args:
+    test_case: (TestCase) The test case to describe.
+
+  Returns:
+    CaseCandidate: The description of the test case.
+  """
+  test = test_case.test
+  parameterization_name = None
+  if test_case.full_name != test.full_name:
+    parameterization_name = test_case.full_name[len(test.full_name) + 1:]
+  suite_names = set(suite.name for suite in test_case.test_suites.values())
+  suite_names.add(_GLOBAL_SUITE_NAME)
+  return CaseCandidate(test_case.name, test_case.full_name, test.full_name,
+                       parameterization_name, suite_names)
+
+
+class TestCaseFilter(object):
+  """Tells whether generated test cases are selected by an optional selection.
+
+  This is what opt-in instrumentation (like the Profiler and the LeakDetector)
+  uses to only apply to some of the test cases.
+  """
+
+  def __init__(self, selection=None):
+    """Initializes a new instance of a TestCaseFilter.
+
+    Args:
+      selection: (string|Selector) The selection (None selects all test cases).
+    """
+    self.selector = None
+    if selection is not None:
+      self.selector = to_selector(selection)
+
+  def matches(self, test_case):
+    """Whether the (generated) test case is selected."""
+    if not self.selector:
+      return True
+    return self.selector.matches(test_case_candidate(test_case))
+
+
+def case_candidates(test_run):
+  """Describes all of the test cases that the test run would generate.
+
+  Args:
+    test_run: (TestRun) The test run to describe.
+
+  Yields:
+    (Test, Parameterization, CaseCandidate) for each test case; the
+    parameterization is None for tests that are not parameterized.
+  """
+  for test in test_run.tests.values():
+    parameterizations = test_parameterizations(test_run, test)
+    if not parameterizations:
+      yield test, None, case_candidate(test_run, test)
+      continue
+    for parameterization in parameterizations.values():
+      yield (test, parameterization,
+             case_candidate(test_run, test, parameterization))
+
+
+def prune(test_run, selection):
+  """Removes the tests and parameterizations that aren't selected.
+
+  Tests with only some selected parameterizations are replaced in the test run
+  by a clone that only has the selected parameterizations, so the original test
+  (which may be shared with other test runs) is left untouched.
+
+  Args:
+    test_run: (TestRun) The test run to prune.
+    selection: (string|Selector) The selection expression or selector.
+  """
+  selector = to_selector(selection)
+  for test in test_run.tests.values():
+    parameterizations = test_parameterizations(test_run, test)
+    if not parameterizations:
+      if not selector.matches(case_candidate(test_run, test)):
+        test_run.tests.unregister(test.full_name)
+      continue
+    selected = [p for p in parameterizations.values()
+                if selector.matches(case_candidate(test_run, test, p))]
+    if len(selected) == len(parameterizations):
+      continue
+    test_run.parameterizations.unregister(test.full_name)
+    if not selected:
+      test_run.tests.unregister(test.full_name)
+      continue
+    pruned_test = test.clone()
+    pruned_test.decorator_parameterizations.clear()
+    test_run.tests.register(pruned_test)
+    for parameterization in selected:
+      test_run.parameterizations.register(test.full_name, parameterization)
@@ -25,6 +25,11 @@ from test_suite import TestSuite
 class Test(object):
   """Test is a base class that represents a test case or a test template."""
 
+  # Type of the test cases that the test generates.
+  test_case_type = TestCase
+  # Whether passing results of the test may be reused (see result_cache).
+  cacheable = True
+
   def __init__(self, name, full_name, description):
     """Initializes a new instance of a test.
 
@@ -41,6 +46,8 @@ class Test(object):
     self.setup = registry.AutoKeyRegistry(lambda func: func.__name__)
     self.teardown = registry.AutoKeyRegistry(lambda func: func.__name__)
     self.test_suite_names = set()
+    # Maximum number of seconds a test case may run (None means no limit).
+    self.timeout = None
 
   def clone(self):
     """Creates a shallow copy of the test.
@@ -53,6 +60,7 @@ class Test(object):
     test.setup.merge(self.setup)
     test.teardown.merge(self.teardown)
     test.test_suite_names |= self.test_suite_names
+    test.timeout = self.timeout
     return test
 
   def __call__(self):
@@ -80,8 +88,8 @@ class Test(object):
     """
     test_cases = registry.AutoKeyRegistry(lambda tc: tc.full_name)
     if not parameterizations:
-      test_case = TestCase(self, context_factory,
-                           description=self.description)
+      test_case = self.test_case_type(self, context_factory,
+                                      description=self.description)
       test_cases.register(test_case)
       return test_cases
     # It is a parameterized test, so we need to generate multiple test cases;
@@ -89,8 +97,10 @@ class Test(object):
     for suffix, param in parameterizations.iteritems():
       name = '%s_%s' % (self.name, suffix)
       full_name = '%s_%s' % (self.full_name, suffix)
-      test_case = TestCase(self, context_factory, name=name,
-                           full_name=full_name, description=self.description)
+      test_case = self.test_case_type(
+          self, context_factory, name=name, full_name=full_name,
+          description=self.description)
+      test_case.parameterization = param
       for key, value in param.variables.iteritems():
         test_case.context.variables.register(key, value)
       for suite_name in param.suites:
@@ -127,6 +137,7 @@ class FunctionTest(Test):
     test.setup.merge(self.setup)
     test.teardown.merge(self.teardown)
     test.test_suite_names |= self.test_suite_names
+    test.timeout = self.timeout
     return test
 
   def __call__(self, *args, **kwargs):
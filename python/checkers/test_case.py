@@ -19,8 +19,12 @@ been applied. A test case's __call__ function does not take any arguments.
 """
 
 import inspect
+import os
 import sys
+import thread
+import time
 
+import events
 import registry
 import test_result
 
@@ -44,6 +48,8 @@ class TestCase(object):
     if not full_name:
       self.full_name = test.full_name
     self.test = test
+    # The parameterization the test case was generated from (if any).
+    self.parameterization = None
     self.context = context_factory(self)
     self.description = description
     self.test_suites = registry.AutoKeyRegistry(lambda suite: suite.name)
@@ -53,12 +59,45 @@ class TestCase(object):
 
     Note that implementing classes should use this to actually execute the test.
 
+    Besides its duration, the result records when each phase (setup, body and
+    teardown) started and ended, and the process and thread it ran in.
+
+    Returns:
+      TestResult: The result of running the test case.
+    """
+    phases = []
+    start = time.time()
+    result = self._run(phases)
+    result.duration = time.time() - start
+    result.phases = phases
+    result.pid = os.getpid()
+    result.thread_id = thread.get_ident()
+    return result
+
+  def _run(self, phases):
+    """Calls the setup functions, the test and the teardown functions.
+
+    If anybody listens to the events of the test run, the start and end of each
+    phase are emitted (see events); a phase that raised still gets its end.
+
+    Args:
+      phases: (list) Gets a (name, start, end) entry for each phase that ran.
+
     Returns:
       TestResult: The result of running the test case.
     """
+    emit = events.for_test_case(self)
     exception = None
     exc_info = None
+    # The phase in progress, when it started and its end event (if events are
+    # emitted).
+    phase = 'setup'
+    phase_start = time.time()
+    phase_end = None
     try:
+      if emit:
+        emit(events.EventType.SETUP_START, self)
+        phase_end = events.EventType.SETUP_END
       for setup in self.test.setup.values():
         if inspect.getargspec(setup).args:
           setup(self.context)
@@ -68,11 +107,30 @@ class TestCase(object):
       args = {}
       for variable in self.test.required_variables:
         args[variable] = self.context.variables[variable]
-      self.test(**args)
+      now = time.time()
+      phases.append((phase, phase_start, now))
+      phase = 'body'
+      phase_start = now
+      if emit:
+        phase_end = None
+        emit(events.EventType.SETUP_END, self)
+        emit(events.EventType.BODY_START, self)
+        phase_end = events.EventType.BODY_END
+      self.execute(args)
+      if emit:
+        phase_end = None
+        emit(events.EventType.BODY_END, self)
     except Exception as ex:  # pylint: disable=broad-except
       exception = ex
       exc_info = sys.exc_info()
     finally:
+      now = time.time()
+      phases.append((phase, phase_start, now))
+      phase_start = now
+      if phase_end:
+        emit(phase_end, self)
+      if emit:
+        emit(events.EventType.TEARDOWN_START, self)
       for teardown in self.test.teardown.values():
         try:
           if inspect.getargspec(teardown).args:
@@ -83,13 +141,34 @@ class TestCase(object):
           if not exception:
             exception = ex
             exc_info = sys.exc_info()
+      if emit:
+        emit(events.EventType.TEARDOWN_END, self)
+      phases.append(('teardown', phase_start, time.time()))
     if exception:
       if isinstance(exception, AssertionError):
-        return test_result.TestResult(
-            self.context, test_result.TestResultStatus.FAILED,
-            exc_info=exc_info)
-      return test_result.TestResult(
-          self.context, test_result.TestResultStatus.ERROR, exc_info=exc_info)
-    return test_result.TestResult(self.context,
-                                  test_result.TestResultStatus.PASSED)
+        return self.create_result(test_result.TestResultStatus.FAILED,
+                                  exc_info=exc_info)
+      return self.create_result(test_result.TestResultStatus.ERROR,
+                                exc_info=exc_info)
+    return self.create_result(test_result.TestResultStatus.PASSED)
+
+  def execute(self, args):
+    """Calls the test itself (between the setup and teardown functions).
+
+    Args:
+      args: (dict) The values of the variables the test requires.
+    """
+    self.test(**args)
+
+  def create_result(self, status, exc_info=None):
+    """Creates the result of running the test case.
+
+    Args:
+      status: (TestResultStatus (string)) The status of the test case.
+      exc_info: See https://docs.python.org/2/library/sys.html#sys.exc_info.
+
+    Returns:
+      TestResult: The result of the test case.
+    """
+    return test_result.TestResult(self.context, status, exc_info=exc_info)
 
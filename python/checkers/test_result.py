@@ -14,6 +14,8 @@
 
 """Contains the TestResult class which stores results from a Checkers test."""
 
+import traceback
+
 
 def enum(**enums):
   """Converts the provided key/value pairs into enumerations."""
@@ -22,9 +24,30 @@ def enum(**enums):
 TestResultStatus = enum(
     PASSED='PASSED',
     FAILED='FAILED',
-    ERROR='ERROR'
+    ERROR='ERROR',
+    NOT_RUN='NOT_RUN',
+    TIMEOUT='TIMEOUT',
+    REGRESSED='REGRESSED'
 )
 
+# Statuses that count as failures of the test case (e.g. for max failures).
+FAILURE_STATUSES = frozenset([
+    TestResultStatus.FAILED,
+    TestResultStatus.ERROR,
+    TestResultStatus.TIMEOUT,
+    TestResultStatus.REGRESSED,
+])
+
+
+class RemoteError(Exception):
+  """Error raised by a test case that ran in another process."""
+  pass
+
+
+class RemoteAssertionError(AssertionError):
+  """Assertion failure of a test case that ran in another process."""
+  pass
+
 
 class TestResult(object):
   """A TestResult stores information about the result of a test."""
@@ -42,6 +65,95 @@ class TestResult(object):
     self.status = status
     self.message = message
     self.exc_info = exc_info
+    # Number of seconds the test case took to run (None if it didn't run).
+    self.duration = None
+    # Whether the result comes from a result cache (see result_cache).
+    self.cached = False
+    # Files the test case ran code in (if recorded; see impact).
+    self.covered_files = None
+    # (name, start, end) of each phase that ran, in seconds since the epoch.
+    self.phases = None
+    # Process and thread the test case ran in (None if it didn't run).
+    self.pid = None
+    self.thread_id = None
+    # What the test case printed and logged (if it failed and was captured).
+    self.output = None
+    # Garbage collections while the test case ran (if recorded; see garbage).
+    self.gc_stats = None
     if not self.message and self.exc_info:
       self.message = str(self.exc_info[1])
 
+  @property
+  def failed(self):
+    """Whether the test case failed (or raised an error)."""
+    return self.status in FAILURE_STATUSES
+
+  def to_dict(self):
+    """Converts the result into a dict that can be sent to another process.
+
+    The exception info can't be sent as is, so the traceback is formatted into
+    a string instead.
+
+    Returns:
+      dict: The serializable contents of the result.
+    """
+    formatted_traceback = None
+    if self.exc_info:
+      formatted_traceback = ''.join(traceback.format_exception(*self.exc_info))
+    return {
+        'full_name': self.context.test_case.full_name,
+        'status': self.status,
+        'message': self.message,
+        'traceback': formatted_traceback,
+        'duration': self.duration,
+        'cached': self.cached,
+        'covered_files': self.covered_files,
+        'phases': self.phases,
+        'pid': self.pid,
+        'thread_id': self.thread_id,
+        'output': self.output,
+        'gc_stats': self.gc_stats,
+    }
+
+  @staticmethod
+  def from_dict(context, source):
+    """Re-creates a result that was converted with to_dict.
+
+    If the original result had exception info, the re-created result gets a
+    RemoteAssertionError (for failures) or a RemoteError (otherwise) whose
+    message contains the original traceback. Results with timings are
+    re-created as benchmark results.
+
+    Args:
+      context: (Context) The context of the test case in this process.
+      source: (dict) The contents of the result (see to_dict).
+
+    Returns:
+      TestResult: The re-created result.
+    """
+    exc_info = None
+    if source.get('traceback'):
+      error_type = RemoteError
+      if source['status'] == TestResultStatus.FAILED:
+        error_type = RemoteAssertionError
+      error = error_type('%s\n%s' % (source['message'], source['traceback']))
+      exc_info = (error_type, error, None)
+    if source.get('timings') is not None:
+      # Imported here, since the benchmarks module depends on this one.
+      import benchmarks
+      result = benchmarks.BenchmarkResult(
+          context, source['status'], message=source['message'],
+          exc_info=exc_info, timings=source['timings'])
+    else:
+      result = TestResult(context, source['status'],
+                          message=source['message'], exc_info=exc_info)
+    result.duration = source.get('duration')
+    result.cached = source.get('cached', False)
+    result.covered_files = source.get('covered_files')
+    if source.get('phases') is not None:
+      result.phases = [tuple(phase) for phase in source['phases']]
+    result.pid = source.get('pid')
+    result.thread_id = source.get('thread_id')
+    result.output = source.get('output')
+    result.gc_stats = source.get('gc_stats')
+    return result
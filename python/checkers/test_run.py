@@ -14,11 +14,14 @@
 
 """Module defining a test run which is responsible for managing tests."""
 
+import importlib
 import sys
 
 import context
+import events
 import modules
 import registry
+import selection
 import test_suite
 
 
@@ -78,6 +81,32 @@ class TestRun(object):
       test_run.tests.register(test)
     return test_run
 
+  @staticmethod
+  def from_plan(plan, module=None):
+    """Creates a new test run out of the test cases in a test plan.
+
+    Only the tests of the planned test cases are looked up (by name, in their
+    modules), and only the planned parameterizations of those tests are kept,
+    so building a test run for a slice of a plan is cheap.
+
+    Args:
+      plan: (TestPlan) The plan (or slice of a plan) to create the run for.
+      module: (module) Look up all of the tests in this module, instead of
+          importing the modules named in the plan (e.g. for '__main__').
+
+    Returns:
+      TestRun: The test run containing the planned test cases.
+    """
+    test_run = TestRun(plan.test_run_name)
+    for planned_test in plan.tests:
+      test_module = module
+      if not test_module:
+        test_module = importlib.import_module(planned_test.module_name)
+      test_run.tests.register(getattr(test_module, planned_test.attribute))
+    test_run.select(selection.CaseNameSelector(
+        case.full_name for case in plan.cases))
+    return test_run
+
   def __init__(self, name):
     """Initializes a new instance of a TestRun.
 
@@ -85,6 +114,8 @@ class TestRun(object):
       name: (string) The name to use for the test run.
     """
     self.name = name
+    # Maximum number of seconds each test case in the run may run.
+    self.timeout = None
     self.tests = registry.AutoKeyRegistry(lambda test: test.full_name)
     self.variables = registry.Registry()
     self.setup = registry.AutoKeyRegistry(lambda func: func.__name__)
@@ -92,7 +123,10 @@ class TestRun(object):
     self.test_case_setup = registry.AutoKeyRegistry(lambda func: func.__name__)
     self.test_case_teardown = registry.AutoKeyRegistry(
         lambda func: func.__name__)
+    self.fixtures = registry.AutoKeyRegistry(lambda fixture: fixture.name)
     self.test_suites = _TestRunSuiteRegistry(self)
+    # Lifecycle events of the run, for instrumentation (see events).
+    self.events = events.EventBus(self)
     # Parameterizations are stored with the key as the test's full name and the
     # value is a parameterization registry.
     param_key = lambda param: param.name
@@ -102,6 +136,18 @@ class TestRun(object):
     self.parameterizations = registry.SuperRegistry(
         parameterization_registry_factory)
 
+  def select(self, selection_expression):
+    """Prunes the tests and parameterizations that aren't selected.
+
+    Selection happens before the test cases are generated, so the test cases
+    that aren't selected are never created. See the selection module for the
+    format of selection expressions.
+
+    Args:
+      selection_expression: (string|Selector) Selects the test cases to keep.
+    """
+    selection.prune(self, selection_expression)
+
   @property
   def generate_test_cases(self, context_factory=context.Context):
     """Generates the real test cases for the test run.
@@ -0,0 +1,357 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Module defining the test runner, which runs the test cases of a test run.
+
+The test runner is responsible for calling the test run's setup and teardown
+functions around the test cases, for setting up and tearing down the fixtures
+that the test cases use, for handing the test cases to an executor
+(which decides how and where they actually run), and for deciding when to stop
+early. Runners like the PyUnit runner use a TestRunner to do the actual work.
+"""
+
+import functools
+import sys
+import time
+
+import events
+import executors
+import fixtures
+import registry
+import test_result
+import timeouts
+
+
+class TestRunner(object):
+  """A test runner runs the test cases of test runs and collects the results."""
+
+  def __init__(self, executor=None, failfast=False, max_failures=None,
+               result_cache=None, impact_index=None, baseline=None,
+               profiler=None, leak_detector=None, gc_policy=None,
+               output_capture=None):
+    """Initializes a new instance of a TestRunner.
+
+    Args:
+      executor: (Executor) Runs the test cases (defaults to a SerialExecutor).
+      failfast: (bool) Stop running test cases after the first failure.
+      max_failures: (int) Stop running test cases after this many failures.
+      result_cache: (ResultCache) Skips test cases that passed before and
+          haven't changed since (None runs every test case).
+      impact_index: (ImpactIndex) Records the files each test case covers.
+      baseline: (Baseline) Records the timings of the benchmark cases, or
+          compares them against the recorded ones.
+      profiler: (Profiler) Profiles the test cases.
+      leak_detector: (LeakDetector) Checks what the test cases leak.
+      gc_policy: (GcPolicy) Controls when garbage is collected while the test
+          cases run.
+      output_capture: (OutputCapture) Captures the output of the test cases.
+    """
+    self.executor = executor if executor else executors.SerialExecutor()
+    self.result_cache = result_cache
+    self.impact_index = impact_index
+    self.baseline = baseline
+    self.profiler = profiler
+    self.leak_detector = leak_detector
+    self.gc_policy = gc_policy
+    self.output_capture = output_capture
+    self.watchdog = timeouts.Watchdog()
+    # Fixture managers of the test runs that are set up, keyed by test run.
+    self.fixture_managers = {}
+    self.max_failures = max_failures
+    if failfast:
+      self.max_failures = 1
+
+  def setup_test_run(self, test_run, test_cases=None):
+    """Calls the test run's setup functions and prepares its fixtures.
+
+    If there is a GC policy, it is applied once the setup functions were called.
+    If there is an output capture, it is started then as well.
+
+    Args:
+      test_run: (TestRun) The test run being set up.
+      test_cases: (iterable) The test cases that will be run (if known), so
+          fixtures can be torn down as soon as their scope is finished.
+    """
+    test_run.events.emit(events.EventType.RUN_START)
+    for setup in test_run.setup.values():
+      setup(test_run)
+    if self.gc_policy:
+      self.gc_policy.start()
+    if self.output_capture:
+      self.output_capture.start()
+    self.fixture_managers[test_run] = fixtures.FixtureManager(
+        test_run, test_cases, self.executor.process_concurrency)
+    test_run.events.emit(events.EventType.RUN_SETUP_END)
+
+  def teardown_test_run(self, test_run):
+    """Tears down the test run's fixtures and calls its teardown functions.
+
+    If there is a GC policy, the garbage collector is restored first. If there
+    is an output capture, it is stopped first as well.
+
+    Args:
+      test_run: (TestRun) The test run being torn down.
+    """
+    test_run.events.emit(events.EventType.RUN_TEARDOWN_START)
+    if self.output_capture:
+      self.output_capture.stop()
+    if self.gc_policy:
+      self.gc_policy.stop()
+    fixture_manager = self.fixture_managers.pop(test_run, None)
+    try:
+      if fixture_manager:
+        fixture_manager.close()
+    finally:
+      try:
+        for teardown in test_run.teardown.values():
+          teardown(test_run)
+      finally:
+        try:
+          self.save_indexes()
+        finally:
+          test_run.events.emit(events.EventType.RUN_END)
+
+  def save_indexes(self):
+    """Saves the result cache, impact index and baseline (if there are any)."""
+    if self.result_cache:
+      self.result_cache.save()
+    if self.impact_index:
+      self.impact_index.save()
+    if self.baseline:
+      self.baseline.save()
+
+  def cached_result(self, test_case):
+    """Gets the cached result of the test case (if it doesn't need to run).
+
+    Args:
+      test_case: (TestCase) The test case about to be run.
+
+    Returns:
+      TestResult: The cached result (None if the test case must run).
+    """
+    if not self.result_cache:
+      return None
+    return self.result_cache.lookup(test_case)
+
+  def record_result(self, test_case, result):
+    """Records the result of a test case in the result cache and impact index.
+
+    The collection stats of the result are recorded in the GC policy (if there
+    is one), since the test case may have run in another process.
+
+    If there is a baseline, benchmark results are recorded in it (or compared
+    against it, in which case a result that regressed gets a REGRESSED status).
+    That happens first, so a regression isn't recorded as a pass. Finally, the
+    RESULT_RECORDED event is emitted.
+
+    Args:
+      test_case: (TestCase) The test case that was run.
+      result: (TestResult) The result of the test case.
+    """
+    if self.baseline:
+      self.baseline.record(test_case, result)
+    if self.result_cache:
+      self.result_cache.record(test_case, result)
+    if self.impact_index:
+      self.impact_index.record(test_case, result)
+    if self.gc_policy:
+      self.gc_policy.record(test_case, result)
+    emit = events.for_test_case(test_case)
+    if emit:
+      emit(events.EventType.RESULT_RECORDED, test_case, result)
+
+  def finish_worker(self):
+    """Tears down the fixtures set up in a worker process before it exits.
+
+    Worker processes (see ForkExecutor) inherit the fixture managers of the
+    test runs that are set up, but set up their own fixtures. The test run's
+    teardown functions are only called in the process that set it up.
+    """
+    for fixture_manager in self.fixture_managers.values():
+      fixture_manager.close()
+
+  def run_test_case(self, test_case):
+    """Runs a single test case, enforcing its timeout (if it has one).
+
+    Test cases that passed before (see cached_result) aren't run again.
+
+    Args:
+      test_case: (TestCase) The test case to run.
+
+    Returns:
+      TestResult: The result of running the test case.
+    """
+    cached = self.cached_result(test_case)
+    if cached:
+      return cached
+    return self._run_uncached_test_case(test_case)
+
+  def _run_uncached_test_case(self, test_case):
+    """Runs a single test case that isn't cached, enforcing its timeout."""
+    timeout = timeouts.resolve_timeout(test_case)
+    if timeout:
+      return self.watchdog.run(test_case, timeout, self.call_test_case)
+    return self.call_test_case(test_case)
+
+  def call_test_case(self, test_case):
+    """Calls the test case (in whatever thread it should run in).
+
+    The test case's fixtures are set up before it is called and the ones that
+    are no longer needed are torn down afterwards. Errors from setting up or
+    tearing down fixtures are reported as errors of the test case.
+
+    If there is an impact index, the files that the test case (and its
+    fixtures) ran code in are recorded in the result's covered_files. If there
+    is a profiler, the test case (and its fixtures) are profiled. If there is a
+    leak detector, what the test case (and its fixtures) leak is recorded. If
+    there is a GC policy, it may collect garbage after the test case. If there
+    is an output capture, what the test case (and its fixtures) print and log
+    is captured, and kept in the result if it failed.
+
+    Args:
+      test_case: (TestCase) The test case to call.
+
+    Returns:
+      TestResult: The result of calling the test case.
+    """
+    call = self._call_test_case
+    if self.profiler:
+      call = self._profile_test_case
+    if self.leak_detector:
+      call = functools.partial(self.leak_detector.check, call)
+    if self.gc_policy:
+      call = functools.partial(self.gc_policy.run, call)
+    if self.output_capture:
+      call = functools.partial(self.output_capture.capture, call)
+    if not self.impact_index:
+      return call(test_case)
+    result, covered_files = self.impact_index.trace(call, test_case)
+    result.covered_files = covered_files
+    return result
+
+  def _profile_test_case(self, test_case):
+    """Calls the test case with its fixtures set up, under the profiler."""
+    return self.profiler.profile(self._call_test_case, test_case)
+
+  def _call_test_case(self, test_case):
+    """Calls the test case with its fixtures set up.
+
+    Setting up the fixtures of the test case and tearing down the ones it no
+    longer needs are recorded as the fixture_setup and fixture_teardown phases
+    of its result.
+    """
+    fixture_manager = self.fixture_managers.get(test_case.context.test_run)
+    if not fixture_manager:
+      return test_case()
+    start = time.time()
+    try:
+      fixture_manager.enter(test_case)
+    except Exception:  # pylint: disable=broad-except
+      result = test_result.TestResult(
+          test_case.context, test_result.TestResultStatus.ERROR,
+          exc_info=sys.exc_info())
+      result.phases = []
+      end = time.time()
+    else:
+      end = time.time()
+      result = test_case()
+    if result.phases is not None:
+      result.phases.insert(0, ('fixture_setup', start, end))
+    start = time.time()
+    try:
+      fixture_manager.exit(test_case)
+    except Exception:  # pylint: disable=broad-except
+      if not result.failed:
+        result = test_result.TestResult(
+            test_case.context, test_result.TestResultStatus.ERROR,
+            exc_info=sys.exc_info())
+    if result.phases is not None:
+      result.phases.append(('fixture_teardown', start, time.time()))
+    return result
+
+  def should_stop(self, failures):
+    """Whether to stop running test cases after the given number of failures.
+
+    Args:
+      failures: (int) The number of test cases that have failed so far.
+
+    Returns:
+      bool: True if no more test cases should be started.
+    """
+    return bool(self.max_failures) and failures >= self.max_failures
+
+  def create_not_run_result(self, test_case):
+    """Creates the result for a test case that was not run.
+
+    Args:
+      test_case: (TestCase) The test case that was not run.
+
+    Returns:
+      TestResult: The NOT_RUN result for the test case.
+    """
+    message = 'not run; the test run stopped early'
+    if self.max_failures:
+      message = 'not run; stopped after %d failure(s)' % self.max_failures
+    return test_result.TestResult(
+        test_case.context, test_result.TestResultStatus.NOT_RUN,
+        message=message)
+
+  def run(self, test_run):
+    """Runs all of the test cases in the test run.
+
+    Once the maximum number of failures is reached, the executor is cancelled so
+    that no new test cases are started. The test run is still torn down, and the
+    test cases that didn't run get a NOT_RUN result.
+
+    Args:
+      test_run: (TestRun) The test run containing the tests to be run.
+
+    Returns:
+      AutoKeyRegistry: The test results, keyed by the test case full names and
+          in the order that the test cases were generated.
+    """
+    test_cases = test_run.generate_test_cases
+    completed = {}
+    to_run = []
+    for test_case in test_cases.values():
+      cached = self.cached_result(test_case)
+      if cached:
+        completed[test_case.full_name] = cached
+      else:
+        to_run.append(test_case)
+    failures = 0
+    self.setup_test_run(test_run, to_run)
+    try:
+      if test_run.events.enabled:
+        for test_case in to_run:
+          test_run.events.emit(events.EventType.CASE_SCHEDULED, test_case)
+      # The cached results were already looked up above.
+      for test_case, result in self.executor.execute(
+          self._run_uncached_test_case, to_run, self.finish_worker):
+        completed[test_case.full_name] = result
+        self.record_result(test_case, result)
+        if result.failed:
+          failures += 1
+          if self.should_stop(failures):
+            self.executor.cancel()
+    finally:
+      self.teardown_test_run(test_run)
+    results = registry.AutoKeyRegistry(
+        lambda result: result.context.test_case.full_name)
+    for full_name, test_case in test_cases.iteritems():
+      if full_name in completed:
+        results.register(completed[full_name])
+      else:
+        results.register(self.create_not_run_result(test_case))
+    return results
@@ -61,6 +61,10 @@ class TestSuite(registry.AutoKeyRegistry):
     super(TestSuite, self).__init__(lambda test: test.full_name)
     self.name = name
     self.description = description if description else 'No description.'
+    # Maximum number of seconds each of the suite's test cases may run.
+    self.timeout = None
+    # Fixtures that only apply to the test cases in this suite.
+    self.fixtures = registry.AutoKeyRegistry(lambda fixture: fixture.name)
     self._test_run = None
 
   @property
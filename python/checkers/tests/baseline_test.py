@@ -0,0 +1,133 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Tests for checkers.baseline."""
+
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import checkers
+from checkers import asserts
+from checkers import baseline
+from checkers import test_result
+from checkers.runners import pyunit
+from checkers.tests import helpers
+
+
+def _create_test_run():
+  """Creates a test run with a single benchmark."""
+
+  # Sleeps so that no timing is rounded down to 0 by the clock's resolution.
+  @checkers.benchmark(warmup=0, iterations=10)
+  def benchmark_sleep():
+    time.sleep(0.0001)
+
+  return helpers.create_test_run('baseline', benchmark_sleep)
+
+
+def _run(benchmark_baseline, test_run=None):
+  return helpers.run(test_run or _create_test_run(),
+                     baseline=benchmark_baseline).values()[0]
+
+
+@checkers.test
+def test_ranks_average_ties():
+  ranks, ties = baseline._ranks([3.0, 1.0, 3.0, 2.0])
+  asserts.are_equal(ranks, [3.5, 1.0, 3.5, 2.0])
+  asserts.are_equal(sorted(ties), [1, 1, 2])
+
+
+@checkers.test
+def test_mann_whitney_p_value():
+  rng = random.Random(42)
+  fast = [rng.gauss(1.0, 0.1) for _ in xrange(50)]
+  same = [rng.gauss(1.0, 0.1) for _ in xrange(50)]
+  slow = [rng.gauss(1.5, 0.1) for _ in xrange(50)]
+  asserts.is_true(baseline.mann_whitney_p_value(slow, fast) < 0.001)
+  asserts.is_true(baseline.mann_whitney_p_value(fast, slow) > 0.999)
+  asserts.is_true(baseline.mann_whitney_p_value(same, fast) > 0.01)
+  asserts.are_equal(baseline.mann_whitney_p_value([1.0] * 5, [1.0] * 5), 1.0)
+  asserts.are_equal(baseline.mann_whitney_p_value([], [1.0]), 1.0)
+
+
+@checkers.test
+def test_downsample():
+  asserts.are_equal(baseline.downsample([1, 2, 3], 5), [1, 2, 3])
+  asserts.are_equal(baseline.downsample(range(10), 5), [0, 2, 4, 6, 8])
+
+
+@checkers.test
+def test_compare_requires_significance_and_threshold():
+  benchmark_baseline = baseline.Baseline(threshold=0.1)
+  rng = random.Random(7)
+  benchmark_baseline.entries['b'] = [rng.gauss(1.0, 0.01) for _ in xrange(50)]
+  slightly_slower = [rng.gauss(1.05, 0.01) for _ in xrange(50)]
+  much_slower = [rng.gauss(1.5, 0.01) for _ in xrange(50)]
+  comparison = benchmark_baseline.compare('b', slightly_slower)
+  asserts.is_true(comparison.p_value < 0.01)
+  asserts.is_false(comparison.regressed)
+  comparison = benchmark_baseline.compare('b', much_slower)
+  asserts.is_true(comparison.regressed)
+  asserts.is_true(abs(comparison.change - 0.5) < 0.05)
+  asserts.is_none(benchmark_baseline.compare('b', much_slower[:2]))
+  asserts.is_none(benchmark_baseline.compare('unknown', much_slower))
+
+
+@checkers.test
+def test_regressed_benchmark_fails():
+  benchmark_baseline = baseline.Baseline()
+  test_run = _create_test_run()
+  full_name = test_run.tests.values()[0].full_name
+  benchmark_baseline.entries[full_name] = [1e-12] * 10
+  result = _run(benchmark_baseline, test_run)
+  asserts.are_equal(result.status, test_result.TestResultStatus.REGRESSED)
+  asserts.is_true(result.failed)
+  asserts.is_true(isinstance(result.exc_info[1],
+                             baseline.BenchmarkRegressionError))
+  asserts.is_in('compared to the baseline', result.message)
+  asserts.is_true(benchmark_baseline.comparisons[full_name].regressed)
+
+
+@checkers.test
+def test_faster_benchmark_passes():
+  benchmark_baseline = baseline.Baseline()
+  test_run = _create_test_run()
+  full_name = test_run.tests.values()[0].full_name
+  benchmark_baseline.entries[full_name] = [10.0] * 10
+  result = _run(benchmark_baseline, test_run)
+  asserts.are_equal(result.status, test_result.TestResultStatus.PASSED)
+  asserts.is_false(benchmark_baseline.comparisons[full_name].regressed)
+
+
+@checkers.test
+def test_update_records_and_saves_timings():
+  directory = tempfile.mkdtemp()
+  try:
+    file_path = os.path.join(directory, 'baseline.json')
+    _run(baseline.Baseline(file_path))
+    asserts.is_false(os.path.exists(file_path))
+    result = _run(baseline.Baseline(file_path, update=True))
+    loaded = baseline.Baseline(file_path)
+    asserts.are_equal(loaded.entries.values(), [result.timings])
+    _run(loaded)
+    asserts.are_equal(loaded.comparisons.keys(), loaded.entries.keys())
+  finally:
+    shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+  pyunit.main()
@@ -0,0 +1,172 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Tests for checkers.benchmarks."""
+
+import StringIO
+
+import checkers
+from checkers import asserts
+from checkers import benchmarks
+from checkers import result_cache
+from checkers import test_result
+from checkers.runners import pyunit
+from checkers.tests import helpers
+
+
+def _run(*tests):
+  """Runs the tests in a new test run and returns the results."""
+  return helpers.run(helpers.create_test_run('benchmarks', *tests))
+
+
+@checkers.test
+def test_percentile_interpolates_between_values():
+  values = [1.0, 2.0, 3.0, 4.0, 5.0]
+  asserts.are_equal(benchmarks.percentile(values, 0.5), 3.0)
+  asserts.are_equal(benchmarks.percentile(values, 0.0), 1.0)
+  asserts.are_equal(benchmarks.percentile(values, 1.0), 5.0)
+  asserts.are_equal(benchmarks.percentile(values, 0.625), 3.5)
+  asserts.is_none(benchmarks.percentile([], 0.5))
+
+
+@checkers.test
+def test_summarize():
+  stats = benchmarks.summarize([4.0, 2.0, 1.0, 3.0])
+  asserts.are_equal(stats['iterations'], 4)
+  asserts.are_equal(stats['min'], 1.0)
+  asserts.are_equal(stats['max'], 4.0)
+  asserts.are_equal(stats['mean'], 2.5)
+  asserts.are_equal(stats['median'], 2.5)
+  asserts.is_true(abs(stats['p95'] - 3.85) < 1e-9)
+  asserts.is_true(abs(stats['stddev'] - (5.0 / 3) ** 0.5) < 1e-9)
+  asserts.are_equal(benchmarks.summarize([2.0])['stddev'], 0.0)
+  asserts.is_none(benchmarks.summarize([]))
+
+
+@checkers.test
+def test_format_duration():
+  asserts.are_equal(benchmarks.format_duration(2.5), '2.5s')
+  asserts.are_equal(benchmarks.format_duration(0.0125), '12.5ms')
+  asserts.are_equal(benchmarks.format_duration(3e-6), '3us')
+  asserts.are_equal(benchmarks.format_duration(4e-8), '40ns')
+
+
+@checkers.test
+def test_benchmark_runs_warmup_and_iterations():
+  calls = []
+
+  @checkers.benchmark(warmup=2, iterations=5)
+  def benchmark_append():
+    calls.append(1)
+
+  result = _run(benchmark_append).values()[0]
+  asserts.are_equal(result.status, test_result.TestResultStatus.PASSED)
+  asserts.is_true(isinstance(result, benchmarks.BenchmarkResult))
+  asserts.are_equal(len(calls), 7)
+  asserts.has_length(result.timings, 5)
+  asserts.are_equal(result.stats['iterations'], 5)
+
+
+@checkers.test
+def test_benchmark_calibrates_iterations():
+  @checkers.benchmark
+  def benchmark_nothing():
+    pass
+
+  asserts.is_true(isinstance(benchmark_nothing, benchmarks.BenchmarkTest))
+  benchmark_nothing.min_time = 0.0
+  result = _run(benchmark_nothing).values()[0]
+  asserts.are_equal(len(result.timings), benchmarks.MIN_ITERATIONS)
+
+
+@checkers.test
+def test_benchmark_uses_parameterizations_and_setup():
+  setups = []
+  sizes = []
+
+  @checkers.setup(lambda: setups.append(1))
+  @checkers.parameterize({'small': {'size': 1}, 'large': {'size': 3}})
+  @checkers.benchmark(warmup=0, iterations=2)
+  def benchmark_size(size):
+    sizes.append(size)
+
+  results = _run(benchmark_size)
+  asserts.has_length(results, 2)
+  asserts.are_equal(len(setups), 2)
+  asserts.are_equal(sorted(sizes), [1, 1, 3, 3])
+  for result in results.values():
+    asserts.has_length(result.timings, 2)
+
+
+@checkers.test
+def test_failing_benchmark_keeps_timings():
+  calls = []
+
+  @checkers.benchmark(warmup=0, iterations=5)
+  def benchmark_fails():
+    calls.append(1)
+    asserts.is_true(len(calls) < 3)
+
+  result = _run(benchmark_fails).values()[0]
+  asserts.are_equal(result.status, test_result.TestResultStatus.FAILED)
+  asserts.has_length(result.timings, 2)
+
+
+@checkers.test
+def test_benchmark_result_round_trip():
+  @checkers.benchmark(warmup=0, iterations=3)
+  def benchmark_nothing():
+    pass
+
+  result = _run(benchmark_nothing).values()[0]
+  source = result.to_dict()
+  asserts.are_equal(source['stats'], result.stats)
+  copy = test_result.TestResult.from_dict(result.context, source)
+  asserts.is_true(isinstance(copy, benchmarks.BenchmarkResult))
+  asserts.are_equal(copy.timings, result.timings)
+  asserts.are_equal(copy.stats, result.stats)
+
+
+@checkers.test
+def test_benchmarks_are_not_cached():
+  @checkers.benchmark
+  def benchmark_nothing():
+    pass
+
+  test_run = helpers.create_test_run('benchmarks', benchmark_nothing)
+  test_case = test_run.generate_test_cases.values()[0]
+  asserts.is_none(result_cache.ResultCache().key(test_case))
+
+
+@checkers.test
+def test_write_report():
+  @checkers.test
+  def test_nothing():
+    pass
+
+  @checkers.benchmark(warmup=0, iterations=3)
+  def benchmark_nothing():
+    pass
+
+  stream = StringIO.StringIO()
+  benchmarks.write_report(_run(test_nothing).values(), stream)
+  asserts.are_equal(stream.getvalue(), '')
+  benchmarks.write_report(_run(benchmark_nothing).values(), stream)
+  report = stream.getvalue()
+  asserts.is_in('benchmarks_test.benchmark_nothing: min ', report)
+  asserts.is_in('(3 iterations)', report)
+
+
+if __name__ == '__main__':
+  pyunit.main()
@@ -0,0 +1,121 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Tests for checkers.capture."""
+
+import logging
+import StringIO
+import sys
+
+import checkers
+from checkers import asserts
+from checkers import capture
+from checkers import executors
+from checkers.runners import pyunit
+from checkers.tests import helpers
+
+
+def _create_test_run():
+  """Creates a test run with tests that print and log, one of which fails."""
+
+  @checkers.test
+  def test_passing():
+    print 'passing stdout'
+
+  @checkers.test
+  def test_failing():
+    print 'failing stdout'
+    sys.stderr.write('failing stderr\n')
+    logging.getLogger('capture_test').warning('failing log')
+    asserts.is_true(False)
+
+  return helpers.create_test_run('capture', test_passing, test_failing)
+
+
+def _run(output_capture, executor=None):
+  """Runs the test run, returning its results by name and what got through."""
+  original_streams = sys.stdout, sys.stderr
+  sys.stdout = sys.stderr = StringIO.StringIO()
+  try:
+    results = helpers.run(_create_test_run(), executor,
+                          output_capture=output_capture)
+    printed = sys.stdout.getvalue()
+  finally:
+    sys.stdout, sys.stderr = original_streams
+  return dict((result.context.test_case.name, result)
+              for result in results.values()), printed
+
+
+@checkers.test
+def test_ring_buffer_drops_the_oldest_output():
+  ring_buffer = capture.RingBuffer(max_bytes=10)
+  ring_buffer.write('0123456')
+  ring_buffer.write(u'789')
+  asserts.are_equal(ring_buffer.getvalue(), '0123456789')
+  ring_buffer.write('abcd')
+  asserts.has_length(ring_buffer, 10)
+  asserts.are_equal(ring_buffer.dropped, 4)
+  asserts.are_equal(ring_buffer.getvalue(),
+                    '[... 4 byte(s) dropped ...]\n456789abcd')
+  ring_buffer.write('x' * 20)
+  asserts.are_equal(ring_buffer.getvalue(),
+                    '[... 24 byte(s) dropped ...]\n' + 'x' * 10)
+
+
+@checkers.test
+def test_output_is_kept_for_failures_only():
+  results, printed = _run(capture.OutputCapture())
+  asserts.are_equal(printed, '')
+  asserts.is_none(results['test_passing'].output)
+  output = results['test_failing'].output
+  asserts.is_in('failing stdout', output)
+  asserts.is_in('failing stderr', output)
+  asserts.is_in('WARNING:capture_test:failing log', output)
+
+
+@checkers.test
+def test_output_is_not_captured_without_a_capture():
+  results, printed = _run(None)
+  asserts.is_in('passing stdout', printed)
+  asserts.is_in('failing stderr', printed)
+  asserts.is_none(results['test_failing'].output)
+
+
+@checkers.test
+def test_output_is_captured_per_thread():
+  results, printed = _run(capture.OutputCapture(),
+                          executors.ThreadPoolExecutor(2))
+  asserts.are_equal(printed, '')
+  asserts.is_not_in('passing', results['test_failing'].output)
+
+
+@checkers.test
+def test_output_is_bounded():
+  results, _ = _run(capture.OutputCapture(max_bytes=8))
+  output = results['test_failing'].output
+  asserts.is_true(output.startswith('[... '))
+  asserts.has_length(output.split('\n', 1)[1], 8)
+
+
+@checkers.test
+def test_streams_are_restored():
+  original_streams = sys.stdout, sys.stderr
+  handlers = list(logging.getLogger().handlers)
+  _run(capture.OutputCapture())
+  asserts.are_equal((sys.stdout, sys.stderr), original_streams)
+  asserts.are_equal(logging.getLogger().handlers, handlers)
+
+
+if __name__ == '__main__':
+  pyunit.main()
@@ -70,6 +70,19 @@ def test_suites_decorator():
   asserts.is_in('suite2', test_sample_for_suites.test_suite_names)
 
 
+@checkers.test
+def test_timeout_decorator():
+  """Tests that the timeout decorator sets the test's timeout."""
+
+  @checkers.timeout(2.5)
+  @checkers.test
+  def test_sample_for_timeout():
+    pass
+
+  asserts.are_equal(test_sample_for_timeout.timeout, 2.5)
+  asserts.are_equal(test_sample_for_timeout.clone().timeout, 2.5)
+
+
 @checkers.test
 def test_parameterize_decorator():
   """Tests that the parameterize decorator sets parameterizations properly."""
@@ -17,6 +17,7 @@
 import checkers
 from checkers import asserts
 from checkers import context
+from checkers import fixtures
 from checkers.runners import pyunit
 
 
@@ -54,6 +55,41 @@ def test_context_init_with_args():
   asserts.is_in('context', ctx.variables)
 
 
+@checkers.test
+def test_context_resolves_lazy_variables_once():
+  calls = []
+
+  def resolver(name, variable):
+    calls.append(name)
+    return variable.setup()
+
+  ctx = context.Context(_DummyTestCase(), _DummyTestRun(),
+                        lazy=checkers.LazyVariable(lambda: 'value'))
+  ctx.variables.set_resolver(resolver)
+  asserts.is_empty(calls)
+  asserts.are_equal(ctx.variables['lazy'], 'value')
+  asserts.are_equal(ctx.variables.lazy, 'value')
+  asserts.are_equal(calls, ['lazy'])
+
+
+@checkers.test
+def test_context_lazy_variable_requires_a_resolver():
+  ctx = context.Context(_DummyTestCase(), _DummyTestRun(),
+                        lazy=checkers.LazyVariable(lambda: 'value'))
+  with asserts.expect_exception(fixtures.UnresolvedVariableError):
+    ctx.variables['lazy']  # pylint: disable=pointless-statement
+
+
+@checkers.test
+def test_context_lazy_variable_resolver():
+  ctx = context.Context(_DummyTestCase(), _DummyTestRun())
+  ctx.variables.register('lazy', checkers.LazyVariable(lambda: 'value'))
+  ctx.variables.set_resolver(lambda name, variable: 'resolved %s' % name)
+  asserts.are_equal(ctx.variables.lazy, 'resolved lazy')
+  ctx.variables.unregister('lazy')
+  asserts.is_not_in('lazy', ctx.variables)
+
+
 if __name__ == '__main__':
   pyunit.main()
 
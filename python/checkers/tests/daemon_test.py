@@ -0,0 +1,240 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Tests for checkers.daemon."""
+
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+
+import checkers
+from checkers import asserts
+from checkers import daemon
+from checkers import test_result
+from checkers.runners import pyunit
+
+_LIBRARY = 'def value():\n  return %d\n'
+
+_TEST_MODULE = '''
+import sys
+
+import checkers
+from checkers import asserts
+import daemon_library
+
+SETUPS = []
+CASE_EVENTS = []
+
+
+def create_resource():
+  SETUPS.append(1)
+  return len(SETUPS)
+
+
+@checkers.test
+def test_value():
+  asserts.are_equal(daemon_library.value(), 1)
+
+
+@checkers.test
+def test_resource(resource):
+  asserts.are_equal(resource, 1)
+
+
+@checkers.test
+def test_per_case(per_case):
+  CASE_EVENTS.append('run %d' % per_case)
+
+
+def create_test_run():
+  test_run = checkers.TestRun.from_module(sys.modules[__name__])
+  test_run.variables.register('resource',
+                              checkers.LazyVariable(create_resource))
+  test_run.fixtures.register(checkers.Fixture(
+      'per_case', create_per_case,
+      teardown=lambda value: CASE_EVENTS.append('teardown %d' % value)))
+  return test_run
+
+
+def create_per_case(_):
+  CASE_EVENTS.append('setup %d' % len(CASE_EVENTS))
+  return len(CASE_EVENTS)
+'''
+
+
+class _Sources(object):
+  """Temporary test module and module under test on the path."""
+
+  def __init__(self):
+    self.directory = tempfile.mkdtemp()
+    self.library_path = os.path.join(self.directory, 'daemon_library.py')
+    self.write(self.library_path, _LIBRARY % 1)
+    self.write(os.path.join(self.directory, 'daemon_sample_test.py'),
+               _TEST_MODULE)
+    sys.path.insert(0, self.directory)
+
+  def write(self, file_path, contents):
+    """Writes a file, making sure its modification time changes."""
+    mtime = None
+    if os.path.exists(file_path):
+      mtime = os.path.getmtime(file_path) + 2
+    with open(file_path, 'w') as f:
+      f.write(contents)
+    if mtime:
+      os.utime(file_path, (mtime, mtime))
+
+  def remove(self):
+    sys.path.remove(self.directory)
+    for name in ('daemon_library', 'daemon_sample_test'):
+      sys.modules.pop(name, None)
+    shutil.rmtree(self.directory)
+
+
+def _create_daemon():
+  sources = _Sources()
+  test_daemon = daemon.Daemon(['daemon_sample_test'], poll_interval=0.05)
+  test_daemon.load()
+  return sources, test_daemon
+
+
+def _statuses(results):
+  return dict((test_case.name, result.status) for test_case, result in results)
+
+
+@checkers.test
+def test_daemon_reruns_affected_test_cases():
+  sources, test_daemon = _create_daemon()
+  try:
+    asserts.are_equal(_statuses(test_daemon.run()), {
+        'test_value': test_result.TestResultStatus.PASSED,
+        'test_resource': test_result.TestResultStatus.PASSED,
+        'test_per_case': test_result.TestResultStatus.PASSED,
+    })
+    sources.write(sources.library_path, _LIBRARY % 2)
+    changed_files = test_daemon.poll()
+    asserts.are_equal(changed_files,
+                      set([daemon.impact.normalize_path(sources.library_path)]))
+    results = test_daemon.run(changed_files=changed_files)
+    asserts.are_equal(_statuses(results), {
+        'test_value': test_result.TestResultStatus.FAILED,
+    })
+  finally:
+    test_daemon.close()
+    sources.remove()
+
+
+@checkers.test
+def test_daemon_keeps_fixtures_warm():
+  sources, test_daemon = _create_daemon()
+  try:
+    for _ in xrange(3):
+      results = list(test_daemon.run())
+      asserts.is_false(any(result.failed for _, result in results))
+    asserts.has_length(sys.modules['daemon_sample_test'].SETUPS, 1)
+  finally:
+    test_daemon.close()
+    sources.remove()
+
+
+@checkers.test
+def test_daemon_sets_up_case_fixtures_for_every_run():
+  sources, test_daemon = _create_daemon()
+  try:
+    selector = daemon.selection.to_selector('test_per_case')
+    for _ in xrange(2):
+      results = list(test_daemon.run(selector))
+      asserts.is_false(any(result.failed for _, result in results))
+    asserts.are_equal(sys.modules['daemon_sample_test'].CASE_EVENTS, [
+        'setup 0', 'run 1', 'teardown 1',
+        'setup 3', 'run 4', 'teardown 4',
+    ])
+  finally:
+    test_daemon.close()
+    sources.remove()
+
+
+@checkers.test
+def test_daemon_reports_reload_errors():
+  sources, test_daemon = _create_daemon()
+  try:
+    sources.write(sources.library_path, 'def value(:\n')
+    test_daemon.poll()
+    asserts.has_length(test_daemon.errors, 1)
+    asserts.are_equal(sys.modules['daemon_library'].value(), 1)
+  finally:
+    test_daemon.close()
+    sources.remove()
+
+
+@checkers.test
+def test_daemon_disconnects_clients_that_send_malformed_messages():
+  sources, test_daemon = _create_daemon()
+  left, right = socket.socketpair()
+  try:
+    client = daemon.distributed.MessageConnection(right)
+    test_daemon.clients.append(client)
+    left.sendall('not json\n')
+    test_daemon._handle(client)  # pylint: disable=protected-access
+    asserts.is_not_in(client, test_daemon.clients)
+  finally:
+    left.close()
+    test_daemon.close()
+    sources.remove()
+
+
+@checkers.test
+def test_client_runs_and_watches():
+  sources, test_daemon = _create_daemon()
+  thread = threading.Thread(target=test_daemon.serve_forever)
+  thread.start()
+  try:
+    client = daemon.Client(test_daemon.address)
+    messages = list(client.run('name:test_value'))
+    asserts.are_equal([m['type'] for m in messages], ['result', 'done'])
+    asserts.are_equal(messages[0]['result']['status'],
+                      test_result.TestResultStatus.PASSED)
+    asserts.is_in('PASSED', daemon.format_message(messages[0]))
+
+    watcher = daemon.Client(test_daemon.address)
+    watched = watcher.watch()
+    sources.write(sources.library_path, _LIBRARY % 3)
+    statuses = {}
+    for message in watched:
+      if message['type'] == 'done':
+        break
+      result = message['result']
+      statuses[result['full_name'].split('.')[-1]] = result['status']
+    # test_resource and test_per_case hadn't run before, so they count as
+    # affected.
+    asserts.are_equal(statuses, {
+        'test_value': test_result.TestResultStatus.FAILED,
+        'test_resource': test_result.TestResultStatus.PASSED,
+        'test_per_case': test_result.TestResultStatus.PASSED,
+    })
+    asserts.are_equal(message['failed'], 1)
+    watcher.close()
+    client.stop()
+    client.close()
+  finally:
+    test_daemon.serving = False
+    thread.join()
+    test_daemon.close()
+    sources.remove()
+
+
+if __name__ == '__main__':
+  pyunit.main()
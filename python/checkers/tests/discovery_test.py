@@ -0,0 +1,261 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Tests for checkers.discovery."""
+
+import os
+import shutil
+import tempfile
+
+import checkers
+from checkers import asserts
+from checkers import discovery
+from checkers.runners import pyunit
+
+_TEST_MODULE = '''
+import checkers
+
+with open(%(log)r, 'a') as log:
+  log.write(__name__ + '\\n')
+
+
+@checkers.test_suites('math')
+@checkers.parameterize({'one': {'x': 1, 'test_suites': ['small']}})
+@checkers.test
+def test_%(name)s(x):
+  pass
+
+
+@checkers.test
+def test_%(name)s_plain():
+  pass
+'''
+
+_DYNAMIC_TEST_MODULE = '''
+import checkers
+
+with open(%(log)r, 'a') as log:
+  log.write(__name__ + '\\n')
+
+
+@checkers.parameterize(dict((str(i), {'x': i}) for i in range(2)))
+@checkers.test
+def test_dynamic(x):
+  pass
+'''
+
+
+class _Tree(object):
+  """Temporary package containing test modules."""
+
+  def __init__(self):
+    self.root = tempfile.mkdtemp()
+    self.log_path = os.path.join(self.root, 'imports.log')
+    self.package = os.path.join(self.root, 'discovered')
+    os.makedirs(os.path.join(self.package, 'sub'))
+    for directory in (self.package, os.path.join(self.package, 'sub')):
+      open(os.path.join(directory, '__init__.py'), 'w').close()
+    self.write('a_test.py', 'a')
+    self.write(os.path.join('sub', 'b_test.py'), 'b')
+    open(os.path.join(self.package, 'helper.py'), 'w').close()
+    self.cache_path = os.path.join(self.root, 'cache.json')
+
+  def write(self, relative_path, name):
+    file_path = os.path.join(self.package, relative_path)
+    with open(file_path, 'w') as f:
+      f.write(_TEST_MODULE % {'name': name, 'log': self.log_path})
+    return file_path
+
+  def imports(self):
+    if not os.path.exists(self.log_path):
+      return []
+    with open(self.log_path) as f:
+      return f.read().split()
+
+  def discover(self):
+    return discovery.discover(self.package, processes=2,
+                              cache=discovery.DiscoveryCache(self.cache_path))
+
+  def remove(self):
+    shutil.rmtree(self.root)
+
+
+@checkers.test
+def test_find_test_files():
+  tree = _Tree()
+  try:
+    asserts.are_equal(discovery.find_test_files(tree.root), [
+        os.path.join(tree.package, 'a_test.py'),
+        os.path.join(tree.package, 'sub', 'b_test.py'),
+    ])
+  finally:
+    tree.remove()
+
+
+@checkers.test
+def test_module_name_for_path():
+  tree = _Tree()
+  try:
+    asserts.are_equal(
+        discovery.module_name_for_path(
+            os.path.join(tree.package, 'sub', 'b_test.py')),
+        ('discovered.sub.b_test', tree.root))
+  finally:
+    tree.remove()
+
+
+@checkers.test
+def test_discover_uses_cache_for_unchanged_modules():
+  tree = _Tree()
+  try:
+    manifests = tree.discover()
+    asserts.are_equal([m.module_name for m in manifests],
+                      ['discovered.a_test', 'discovered.sub.b_test'])
+    asserts.are_equal(sorted(tree.imports()),
+                      ['discovered.a_test', 'discovered.sub.b_test'])
+    asserts.has_length(manifests[0].tests, 2)
+
+    # Touching a module without changing it doesn't import it again.
+    a_path = os.path.join(tree.package, 'a_test.py')
+    os.utime(a_path, (0, 0))
+    asserts.has_length(tree.discover(), 2)
+    asserts.has_length(tree.imports(), 2)
+
+    tree.write(os.path.join('sub', 'b_test.py'), 'c')
+    manifests = tree.discover()
+    asserts.are_equal(tree.imports()[2:], ['discovered.sub.b_test'])
+    asserts.is_in('discovered.sub.b_test.test_c',
+                  [test['full_name'] for test in manifests[1].tests])
+  finally:
+    tree.remove()
+
+
+@checkers.test
+def test_discover_reports_import_errors():
+  tree = _Tree()
+  try:
+    with open(os.path.join(tree.package, 'broken_test.py'), 'w') as f:
+      f.write('import does_not_exist\n')
+    manifests = tree.discover()
+    broken = [m for m in manifests if m.module_name.endswith('broken_test')][0]
+    asserts.is_in('does_not_exist', broken.error)
+    asserts.is_not_in(broken.path,
+                      discovery.DiscoveryCache(tree.cache_path).manifests)
+  finally:
+    tree.remove()
+
+
+@checkers.test
+def test_select_and_plan_refuse_modules_that_failed_to_import():
+  tree = _Tree()
+  try:
+    with open(os.path.join(tree.package, 'broken_test.py'), 'w') as f:
+      f.write('import does_not_exist\n')
+    manifests = tree.discover()
+    try:
+      discovery.select(manifests)
+      asserts.is_true(False, 'select listed a module that failed to import')
+    except discovery.DiscoveryError as error:
+      asserts.are_equal([m.module_name for m in error.manifests],
+                        ['discovered.broken_test'])
+    with asserts.expect_exception(discovery.DiscoveryError):
+      discovery.to_plan(manifests, 'discovered')
+    asserts.has_length(
+        discovery.select([m for m in manifests if not m.error]), 4)
+  finally:
+    tree.remove()
+
+
+@checkers.test
+def test_discover_loads_same_named_modules_from_their_files():
+  root = tempfile.mkdtemp()
+  try:
+    for name in ('first', 'second'):
+      os.makedirs(os.path.join(root, name))
+      with open(os.path.join(root, name, 'same_test.py'), 'w') as f:
+        f.write(_TEST_MODULE % {'name': name,
+                                'log': os.path.join(root, 'imports.log')})
+    manifests = discovery.discover(root, processes=1)
+    asserts.are_equal([m.module_name for m in manifests],
+                      ['same_test', 'same_test'])
+    asserts.are_equal([m.tests[0]['name'] for m in manifests],
+                      ['test_first', 'test_second'])
+  finally:
+    shutil.rmtree(root)
+
+
+@checkers.test
+def test_select_and_plan_discovered_test_cases():
+  tree = _Tree()
+  try:
+    manifests = tree.discover()
+    candidates = discovery.select(manifests)
+    asserts.are_equal([c.full_name for c in candidates], [
+        'discovered.a_test.test_a_one',
+        'discovered.a_test.test_a_plain',
+        'discovered.sub.b_test.test_b_one',
+        'discovered.sub.b_test.test_b_plain',
+    ])
+    selected = discovery.select(manifests, 'suite:small')
+    asserts.are_equal([c.name for c in selected], ['test_a_one', 'test_b_one'])
+    test_plan = discovery.to_plan(manifests, 'discovered', 'suite:math')
+    asserts.are_equal([case.full_name for case in test_plan.cases],
+                      [c.full_name for c in selected])
+    asserts.are_equal(test_plan.cases[1].test.module_name,
+                      'discovered.sub.b_test')
+  finally:
+    tree.remove()
+
+
+@checkers.test
+def test_static_discovery_does_not_import():
+  tree = _Tree()
+  try:
+    static_manifests = discovery.discover(tree.package, static=True)
+    asserts.is_empty(tree.imports())
+    imported_manifests = discovery.discover(tree.package)
+    asserts.are_equal([m.tests for m in static_manifests],
+                      [m.tests for m in imported_manifests])
+  finally:
+    tree.remove()
+
+
+@checkers.test
+def test_static_discovery_imports_dynamic_modules():
+  tree = _Tree()
+  try:
+    with open(os.path.join(tree.package, 'dynamic_test.py'), 'w') as f:
+      f.write(_DYNAMIC_TEST_MODULE % {'log': tree.log_path})
+    manifests = discovery.discover(tree.package, static=True)
+    asserts.are_equal(tree.imports(), ['discovered.dynamic_test'])
+    dynamic = [m for m in manifests if m.module_name.endswith('dynamic_test')]
+    asserts.are_equal(
+        sorted(name for name, _ in dynamic[0].tests[0]['parameterizations']),
+        ['0', '1'])
+  finally:
+    tree.remove()
+
+
+@checkers.test
+def test_static_scan_matches_import_for_examples():
+  examples = os.path.join(os.path.dirname(checkers.__file__), 'examples')
+  for file_path in discovery.find_test_files(examples, '*.py'):
+    static = discovery.scan_module_statically(file_path)
+    if static:
+      asserts.are_equal(static['tests'],
+                        discovery.scan_module(file_path)['tests'], file_path)
+
+
+if __name__ == '__main__':
+  pyunit.main()
@@ -0,0 +1,298 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Tests for checkers.distributed."""
+
+import multiprocessing
+import os
+import socket
+import threading
+
+import checkers
+from checkers import asserts
+from checkers import distributed
+from checkers import test_result
+from checkers.runners import pyunit
+from checkers.tests import helpers
+
+
+def _create_test_run(count=6, test=None):
+  """Creates a parameterized test run; odd test cases fail."""
+
+  @checkers.test
+  def test_case(index):
+    if test:
+      test(index)
+    asserts.is_false(index % 2)
+
+  test_run = helpers.create_test_run('distributed', test_case)
+  helpers.parameterize(test_run, test_case, 'index', xrange(count))
+  return test_run
+
+
+def _start_workers(address, count, test=None):
+  """Starts worker processes that build the same test run."""
+  processes = []
+  for i in xrange(count):
+    worker = distributed.Worker(_create_test_run(test=test), address,
+                                name='worker-%d' % i)
+    process = multiprocessing.Process(target=worker.run)
+    process.start()
+    processes.append(process)
+  return processes
+
+
+def _statuses(results):
+  return [result.status for result in results.values()]
+
+
+@checkers.test
+def test_case_identifier():
+  test_cases = _create_test_run().generate_test_cases.values()
+  identifier = distributed.case_identifier(test_cases[2])
+  asserts.are_equal(identifier['full_name'], test_cases[2].full_name)
+  asserts.are_equal(identifier['test'], test_cases[2].test.full_name)
+  asserts.are_equal(identifier['parameterization'], '2')
+
+
+@checkers.test
+def test_coordinator_runs_test_cases_on_workers():
+  coordinator = distributed.Coordinator(('127.0.0.1', 0), idle_timeout=30)
+  processes = _start_workers(coordinator.address, 3)
+  runner = distributed.CoordinatorRunner(coordinator)
+  try:
+    results = runner.run(_create_test_run())
+  finally:
+    coordinator.close()
+  for process in processes:
+    process.join()
+    asserts.are_equal(process.exitcode, 0)
+  asserts.are_equal(_statuses(results), [
+      test_result.TestResultStatus.PASSED,
+      test_result.TestResultStatus.FAILED,
+  ] * 3)
+
+
+@checkers.test
+def test_coordinator_failfast():
+  coordinator = distributed.Coordinator(('127.0.0.1', 0), idle_timeout=30)
+  processes = _start_workers(coordinator.address, 1)
+  runner = distributed.CoordinatorRunner(coordinator, failfast=True)
+  try:
+    results = runner.run(_create_test_run())
+  finally:
+    coordinator.close()
+  for process in processes:
+    process.join()
+  asserts.are_equal(_statuses(results), [
+      test_result.TestResultStatus.PASSED,
+      test_result.TestResultStatus.FAILED,
+  ] + [test_result.TestResultStatus.NOT_RUN] * 4)
+
+
+@checkers.test
+def test_coordinator_reports_lost_workers():
+  def test(index):
+    if index == 2:
+      os._exit(3)  # pylint: disable=protected-access
+
+  coordinator = distributed.Coordinator(('127.0.0.1', 0), idle_timeout=30)
+  processes = _start_workers(coordinator.address, 2, test=test)
+  try:
+    results = distributed.CoordinatorRunner(coordinator).run(_create_test_run())
+  finally:
+    coordinator.close()
+  for process in processes:
+    process.join()
+  asserts.are_equal(results.values()[2].status,
+                    test_result.TestResultStatus.ERROR)
+  asserts.are_equal(_statuses(results).count(
+      test_result.TestResultStatus.PASSED), 2)
+
+
+@checkers.test
+def test_coordinator_runs_single_test_cases():
+  coordinator = distributed.Coordinator(('127.0.0.1', 0), idle_timeout=30)
+  worker = distributed.Worker(_create_test_run(), coordinator.address)
+  thread = threading.Thread(target=worker.run)
+  thread.start()
+  runner = distributed.CoordinatorRunner(coordinator)
+  test_run = _create_test_run()
+  test_cases = test_run.generate_test_cases.values()
+  runner.setup_test_run(test_run)
+  try:
+    asserts.are_equal(runner.run_test_case(test_cases[1]).status,
+                      test_result.TestResultStatus.FAILED)
+    asserts.are_equal(runner.run_test_case(test_cases[0]).status,
+                      test_result.TestResultStatus.PASSED)
+  finally:
+    runner.teardown_test_run(test_run)
+    coordinator.close()
+  thread.join()
+
+
+@checkers.test
+def test_worker_tears_down_case_fixtures_after_each_case():
+  tracker = []
+
+  def setup(context):
+    tracker.append('setup %s' % context.test_case.name)
+    return context.test_case.name
+
+  @checkers.test
+  def test_a(value):
+    tracker.append('run %s' % value)
+
+  @checkers.test
+  def test_b(value):
+    tracker.append('run %s' % value)
+
+  test_run = helpers.create_test_run('fixtures', test_a, test_b)
+  test_run.fixtures.register(checkers.Fixture(
+      'value', setup, teardown=lambda v: tracker.append('teardown %s' % v)))
+  coordinator = distributed.Coordinator(('127.0.0.1', 0), idle_timeout=30)
+  worker = distributed.Worker(test_run, coordinator.address)
+  thread = threading.Thread(target=worker.run)
+  thread.start()
+  try:
+    distributed.CoordinatorRunner(coordinator).run(test_run)
+  finally:
+    coordinator.close()
+  thread.join()
+  asserts.are_equal(tracker, [
+      'setup test_a', 'run test_a', 'teardown test_a',
+      'setup test_b', 'run test_b', 'teardown test_b',
+  ])
+
+
+@checkers.test
+def test_coordinator_runner_runs_several_test_runs():
+  coordinator = distributed.Coordinator(('127.0.0.1', 0), idle_timeout=30)
+  runner = distributed.CoordinatorRunner(coordinator)
+  try:
+    for _ in xrange(2):
+      worker = distributed.Worker(_create_test_run(2), coordinator.address)
+      thread = threading.Thread(target=worker.run)
+      thread.start()
+      results = runner.run(_create_test_run(2))
+      thread.join()
+      asserts.are_equal(_statuses(results), [
+          test_result.TestResultStatus.PASSED,
+          test_result.TestResultStatus.FAILED,
+      ])
+  finally:
+    coordinator.close()
+
+
+class _DeadConnection(object):
+  """A ready worker connection whose worker went away."""
+
+  def __init__(self):
+    self.test_case = None
+    self.is_ready = True
+    self.closed = False
+
+  def send(self, _):
+    raise socket.error('the worker went away')
+
+  def close(self):
+    self.closed = True
+
+
+@checkers.test
+def test_coordinator_drops_workers_it_cannot_reach():
+  coordinator = distributed.Coordinator(('127.0.0.1', 0), idle_timeout=30)
+  dead = _DeadConnection()
+  coordinator.connections.append(dead)
+  worker = distributed.Worker(_create_test_run(), coordinator.address)
+  thread = threading.Thread(target=worker.run)
+  thread.start()
+  try:
+    results = distributed.CoordinatorRunner(coordinator).run(_create_test_run())
+  finally:
+    coordinator.close()
+  thread.join()
+  asserts.is_true(dead.closed)
+  asserts.are_equal(_statuses(results), [
+      test_result.TestResultStatus.PASSED,
+      test_result.TestResultStatus.FAILED,
+  ] * 3)
+
+
+@checkers.test
+def test_coordinator_drops_peers_that_send_malformed_messages():
+  coordinator = distributed.Coordinator(('127.0.0.1', 0), idle_timeout=30)
+  peer = socket.create_connection(coordinator.address)
+  peer.sendall('not json\n')
+  worker = distributed.Worker(_create_test_run(), coordinator.address)
+  thread = threading.Thread(target=worker.run)
+  thread.start()
+  try:
+    results = distributed.CoordinatorRunner(coordinator).run(_create_test_run())
+  finally:
+    coordinator.close()
+    peer.close()
+  thread.join()
+  asserts.are_equal(_statuses(results), [
+      test_result.TestResultStatus.PASSED,
+      test_result.TestResultStatus.FAILED,
+  ] * 3)
+
+
+@checkers.test
+def test_message_connection_rejects_malformed_messages():
+  left, right = socket.socketpair()
+  connection = distributed.MessageConnection(right)
+  try:
+    left.sendall('{"type": "hello"}\n{oops\n')
+    with asserts.expect_exception(distributed.ProtocolError):
+      connection.read()
+  finally:
+    left.close()
+    connection.close()
+
+
+@checkers.test
+def test_coordinator_rejects_other_test_runs():
+  coordinator = distributed.Coordinator(('127.0.0.1', 0), idle_timeout=0.5)
+  other_test_run = checkers.TestRun('other')
+  worker = distributed.Worker(other_test_run, coordinator.address)
+  errors = []
+
+  def run_worker():
+    try:
+      worker.run()
+    except distributed.ProtocolError as e:
+      errors.append(e)
+
+  thread = threading.Thread(target=run_worker)
+  thread.start()
+  try:
+    results = list(coordinator.execute(
+        None, _create_test_run().generate_test_cases.values()))
+  finally:
+    coordinator.close()
+  thread.join()
+  asserts.is_empty(results)
+  asserts.has_length(errors, 1)
+
+
+@checkers.test
+def test_parse_address():
+  asserts.are_equal(distributed.parse_address('localhost:7000'),
+                    ('localhost', 7000))
+
+
+if __name__ == '__main__':
+  pyunit.main()
@@ -0,0 +1,140 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Tests for checkers.events."""
+
+import sys
+import unittest
+
+import checkers
+from checkers import asserts
+from checkers import events
+from checkers.runners import pyunit
+from checkers.tests import helpers
+
+EventType = events.EventType
+
+
+def _create_test_run():
+  """Creates a test run with a passing and a failing test."""
+
+  @checkers.test
+  def test_pass():
+    pass
+
+  @checkers.test
+  def test_fail():
+    asserts.is_true(False)
+
+  return helpers.create_test_run('events', test_pass, test_fail)
+
+
+def _record(test_run, *event_types):
+  """Records the (type, test case name) of the events of the test run."""
+  recorded = []
+
+  def listener(event):
+    name = event.test_case.name if event.test_case else None
+    recorded.append((event.type, name))
+  test_run.events.add_listener(listener, *event_types)
+  return recorded
+
+
+def _case_events(name):
+  return [(event_type, name) for event_type in (
+      EventType.SETUP_START, EventType.SETUP_END, EventType.BODY_START,
+      EventType.BODY_END, EventType.TEARDOWN_START, EventType.TEARDOWN_END)]
+
+
+@checkers.test
+def test_bus_is_disabled_without_listeners():
+  bus = events.EventBus()
+  asserts.is_false(bus.enabled)
+  bus.emit(EventType.RUN_START)
+  listener = lambda event: None
+  bus.add_listener(listener, EventType.RUN_START, EventType.RUN_END)
+  asserts.is_true(bus.enabled)
+  bus.remove_listener(listener)
+  asserts.is_false(bus.enabled)
+
+
+@checkers.test
+def test_test_case_has_no_emit_function_without_listeners():
+  test_run = _create_test_run()
+  test_case = test_run.generate_test_cases.values()[0]
+  asserts.is_none(events.for_test_case(test_case))
+  test_run.events.add_listener(lambda event: None)
+  asserts.is_not_none(events.for_test_case(test_case))
+
+
+@checkers.test
+def test_runner_emits_lifecycle_events():
+  test_run = _create_test_run()
+  recorded = _record(test_run)
+  helpers.run(test_run)
+  expected = [(EventType.RUN_START, None),
+              (EventType.RUN_SETUP_END, None),
+              (EventType.CASE_SCHEDULED, 'test_pass'),
+              (EventType.CASE_SCHEDULED, 'test_fail')]
+  for name in ('test_pass', 'test_fail'):
+    expected.extend(_case_events(name))
+    expected.append((EventType.RESULT_RECORDED, name))
+  expected.append((EventType.RUN_TEARDOWN_START, None))
+  expected.append((EventType.RUN_END, None))
+  asserts.are_equal(recorded, expected)
+
+
+@checkers.test
+def test_listeners_only_get_their_events():
+  test_run = _create_test_run()
+  results = []
+  test_run.events.add_listener(
+      lambda event: results.append(event.result.status),
+      EventType.RESULT_RECORDED)
+  helpers.run(test_run)
+  asserts.are_equal(results, ['PASSED', 'FAILED'])
+
+
+@checkers.test
+def test_failing_setup_still_ends_its_phase():
+  test_run = _create_test_run()
+  test_run.tests.unregister(test_run.tests.values()[1].full_name)
+
+  def failing_setup():
+    raise ValueError('setup failed')
+  test_run.test_case_setup.register(failing_setup)
+  recorded = _record(test_run, EventType.SETUP_START, EventType.SETUP_END,
+                     EventType.BODY_START, EventType.TEARDOWN_END)
+  helpers.run(test_run)
+  asserts.are_equal(recorded, [(EventType.SETUP_START, 'test_pass'),
+                               (EventType.SETUP_END, 'test_pass'),
+                               (EventType.TEARDOWN_END, 'test_pass')])
+
+
+@checkers.test
+def test_lazy_pyunit_suites_emit_events():
+  test_run = _create_test_run()
+  recorded = _record(test_run, EventType.RUN_START, EventType.CASE_SCHEDULED,
+                     EventType.RUN_END)
+  suite = pyunit.create_pyunit_test_suites(sys.modules[__name__], [test_run],
+                                           None, unittest.TestCase)
+  suite.run(unittest.TestResult())
+  asserts.are_equal(recorded, [(EventType.RUN_START, None),
+                               (EventType.CASE_SCHEDULED, 'test_fail'),
+                               (EventType.CASE_SCHEDULED, 'test_pass'),
+                               (EventType.RUN_END, None)])
+
+
+if __name__ == '__main__':
+  pyunit.main()
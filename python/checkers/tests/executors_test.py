@@ -0,0 +1,210 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Tests for checkers.executors."""
+
+import os
+import tempfile
+import threading
+import time
+
+import checkers
+from checkers import asserts
+from checkers import executors
+from checkers import test_result
+from checkers.runners import pyunit
+from checkers.tests import helpers
+
+
+class _DummyTestCase(object):
+  """Dummy test case that only has a name."""
+
+  def __init__(self, name):
+    self.full_name = name
+    self.context = None
+
+
+def _test_cases(count):
+  return [_DummyTestCase('case_%d' % i) for i in xrange(count)]
+
+
+@checkers.test
+def test_serial_executor_runs_in_order():
+  executor = executors.SerialExecutor()
+  results = list(executor.execute(lambda tc: tc.full_name, _test_cases(3)))
+  asserts.are_equal([r for _, r in results], ['case_0', 'case_1', 'case_2'])
+  asserts.are_equal(executor.concurrency, 1)
+
+
+@checkers.test
+def test_serial_executor_cancel():
+  executor = executors.SerialExecutor()
+  ran = []
+
+  def run_test_case(test_case):
+    ran.append(test_case.full_name)
+    executor.cancel()
+
+  list(executor.execute(run_test_case, _test_cases(3)))
+  asserts.are_equal(ran, ['case_0'])
+
+
+@checkers.test
+def test_thread_pool_executor_runs_everything():
+  executor = executors.ThreadPoolExecutor(4)
+  threads = set()
+
+  def run_test_case(test_case):
+    threads.add(threading.current_thread().name)
+    return test_case.full_name
+
+  results = list(executor.execute(run_test_case, _test_cases(50)))
+  asserts.has_length(results, 50)
+  asserts.are_equal(set(r for _, r in results),
+                    set('case_%d' % i for i in xrange(50)))
+  asserts.is_not_in(threading.current_thread().name, threads)
+
+
+@checkers.test
+def test_thread_pool_executor_cancel_skips_outstanding_work():
+  executor = executors.ThreadPoolExecutor(2)
+  cancelled = threading.Event()
+
+  def run_test_case(test_case):
+    if test_case.full_name != 'case_0':
+      cancelled.wait()
+    return test_case.full_name
+
+  results = []
+  for _, result in executor.execute(run_test_case, _test_cases(100)):
+    results.append(result)
+    executor.cancel()
+    cancelled.set()
+  # Only the test cases that were already running may still complete.
+  asserts.is_true(len(results) <= 3)
+
+
+def _create_fork_test_run(pid_file, count=6, test=None):
+  """Creates a test run whose test cases record the pid they ran in."""
+  test_run = checkers.TestRun('fork')
+  test_run.warm = {}
+
+  def setup(test_run):
+    test_run.warm['parent'] = os.getpid()
+
+  @checkers.test
+  def test_case(index):
+    with open(pid_file, 'a') as f:
+      f.write('%d\n' % os.getpid())
+    asserts.are_equal(test_run.warm.get('parent'), os.getppid())
+    if test:
+      test(index)
+
+  test_run.setup.register(setup)
+  test_run.tests.register(test_case)
+  helpers.parameterize(test_run, test_case, 'index', xrange(count))
+  return test_run
+
+
+def _run_forked(executor, count=6, test=None):
+  """Runs a forked test run, returns its results and the pids of the workers."""
+  fd, pid_file = tempfile.mkstemp()
+  os.close(fd)
+  try:
+    test_run = _create_fork_test_run(pid_file, count, test)
+    results = helpers.run(test_run, executor)
+    with open(pid_file) as f:
+      pids = [int(line) for line in f]
+  finally:
+    os.remove(pid_file)
+  return results, pids
+
+
+def _statuses(results):
+  return [result.status for result in results.values()]
+
+
+@checkers.test
+def test_fork_executor_workers_inherit_setup():
+  results, pids = _run_forked(executors.ForkExecutor(2))
+  asserts.are_equal(_statuses(results),
+                    [test_result.TestResultStatus.PASSED] * 6)
+  asserts.is_not_in(os.getpid(), pids)
+  asserts.is_true(len(set(pids)) <= 2)
+
+
+@checkers.test
+def test_fork_executor_replaces_workers():
+  executor = executors.ForkExecutor(1, max_test_cases_per_worker=2)
+  results, pids = _run_forked(executor)
+  asserts.are_equal(_statuses(results),
+                    [test_result.TestResultStatus.PASSED] * 6)
+  asserts.has_length(set(pids), 3)
+
+
+@checkers.test
+def test_fork_executor_reports_failures():
+  def test(index):
+    asserts.is_true(index % 2)
+
+  results, _ = _run_forked(executors.ForkExecutor(2), test=test)
+  asserts.are_equal(_statuses(results).count(
+      test_result.TestResultStatus.FAILED), 3)
+  failure = results.values()[0]
+  asserts.is_true(
+      isinstance(failure.exc_info[1], test_result.RemoteAssertionError))
+  asserts.is_in('index % 2', str(failure.exc_info[1]))
+
+
+@checkers.test
+def test_fork_executor_reports_dead_workers():
+  def test(index):
+    if index == 1:
+      os._exit(3)  # pylint: disable=protected-access
+
+  results, _ = _run_forked(executors.ForkExecutor(1), count=3, test=test)
+  asserts.are_equal(_statuses(results), [
+      test_result.TestResultStatus.PASSED,
+      test_result.TestResultStatus.ERROR,
+      test_result.TestResultStatus.PASSED,
+  ])
+
+
+@checkers.test
+def test_fork_executor_replaces_timed_out_workers():
+  def test(index):
+    if index == 0:
+      time.sleep(5)
+
+  fd, pid_file = tempfile.mkstemp()
+  os.close(fd)
+  try:
+    test_run = _create_fork_test_run(pid_file, 3, test)
+    test_run.timeout = 0.2
+    executor = executors.ForkExecutor(1)
+    results = helpers.run(test_run, executor)
+    with open(pid_file) as f:
+      pids = [int(line) for line in f]
+  finally:
+    os.remove(pid_file)
+  asserts.are_equal(_statuses(results), [
+      test_result.TestResultStatus.TIMEOUT,
+      test_result.TestResultStatus.PASSED,
+      test_result.TestResultStatus.PASSED,
+  ])
+  asserts.are_not_equal(pids[0], pids[1])
+
+
+if __name__ == '__main__':
+  pyunit.main()
@@ -0,0 +1,374 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Tests for checkers.fixtures."""
+
+import threading
+
+import checkers
+from checkers import asserts
+from checkers import fixtures
+from checkers.runners import pyunit
+from checkers.tests import helpers
+
+
+def _tracking_fixture(tracker, name, scope):
+  """Creates a fixture that records its setup and teardown in the tracker."""
+
+  def setup(context):
+    value = '%s:%s' % (name, context.test_case.name)
+    tracker.append('setup %s' % value)
+    return value
+
+  def teardown(value):
+    tracker.append('teardown %s' % value)
+
+  return fixtures.Fixture(name, setup, teardown=teardown, scope=scope)
+
+
+def _create_test_run(tracker):
+  """Creates a test run with a parameterized test and a plain test."""
+
+  @checkers.parameterize({
+      'a': {'param': 'a'},
+      'b': {'param': 'b'},
+  })
+  @checkers.test
+  def test_param(param, shared, per_test, per_case):
+    tracker.append('%s %s %s %s' % (param, shared, per_test, per_case))
+
+  @checkers.test
+  def test_plain(shared, per_test, per_case):
+    tracker.append('plain %s %s %s' % (shared, per_test, per_case))
+
+  test_run = helpers.create_test_run('fixtures', test_param, test_plain)
+  # Registered from the narrowest scope to the widest to check the ordering.
+  for name, scope in (('per_case', fixtures.FixtureScope.CASE),
+                      ('per_test', fixtures.FixtureScope.TEST),
+                      ('shared', fixtures.FixtureScope.RUN)):
+    test_run.fixtures.register(_tracking_fixture(tracker, name, scope))
+  return test_run
+
+
+@checkers.test
+def test_fixture_init():
+  fixture = fixtures.Fixture('foo', lambda: 1)
+  asserts.are_equal(fixture.name, 'foo')
+  asserts.are_equal(fixture.scope, fixtures.FixtureScope.CASE)
+  asserts.is_none(fixture.teardown)
+  with asserts.expect_exception(ValueError):
+    fixtures.Fixture('foo', lambda: 1, scope='WEEK')
+
+
+@checkers.test
+def test_fixture_values_are_shared_within_their_scope():
+  tracker = []
+  results = checkers.TestRunner().run(_create_test_run(tracker))
+  for result in results.values():
+    asserts.is_false(result.failed, result.message)
+  setups = [t for t in tracker if t.startswith('setup')]
+  asserts.are_equal(setups, [
+      'setup shared:test_param_a',
+      'setup per_test:test_param_a',
+      'setup per_case:test_param_a',
+      'setup per_case:test_param_b',
+      'setup per_test:test_plain',
+      'setup per_case:test_plain',
+  ])
+
+
+@checkers.test
+def test_fixture_values_are_torn_down_when_their_scope_ends():
+  tracker = []
+  checkers.TestRunner().run(_create_test_run(tracker))
+  first_b = tracker.index('setup per_case:test_param_b')
+  asserts.are_equal(tracker[first_b - 1], 'teardown per_case:test_param_a')
+  plain = tracker.index('setup per_test:test_plain')
+  asserts.are_equal(tracker[plain - 2:plain], [
+      'teardown per_case:test_param_b',
+      'teardown per_test:test_param_a',
+  ])
+  asserts.are_equal(tracker[-3:], [
+      'teardown per_case:test_plain',
+      'teardown per_test:test_plain',
+      'teardown shared:test_param_a',
+  ])
+
+
+@checkers.test
+def test_suite_fixtures_only_apply_to_suite_members():
+  tracker = []
+  test_run = _create_test_run(tracker)
+  suite = test_run.test_suites['plain']
+  suite.register(test_run.tests.values()[1])
+  suite.fixtures.register(_tracking_fixture(tracker, 'per_suite',
+                                            fixtures.FixtureScope.SUITE))
+  checkers.TestRunner().run(test_run)
+  setups = [t for t in tracker if t.startswith('setup per_suite')]
+  asserts.are_equal(setups, ['setup per_suite:test_plain'])
+
+
+@checkers.test
+def test_fixture_setup_error_fails_test_case():
+  tracker = []
+  test_run = _create_test_run(tracker)
+
+  def broken_setup():
+    raise ValueError('broken')
+
+  test_run.fixtures.register(fixtures.Fixture(
+      'per_test', broken_setup, scope=fixtures.FixtureScope.TEST))
+  results = checkers.TestRunner().run(test_run)
+  for result in results.values():
+    asserts.are_equal(result.status, checkers.TestResultStatus.ERROR)
+  asserts.is_in('teardown shared:test_param_a', tracker)
+
+
+@checkers.test
+def test_fixture_setup_and_teardown_are_recorded_as_phases():
+  tracker = []
+  results = checkers.TestRunner().run(_create_test_run(tracker))
+  for result in results.values():
+    names = [name for name, _, _ in result.phases]
+    asserts.are_equal(names[0], 'fixture_setup')
+    asserts.are_equal(names[-1], 'fixture_teardown')
+    asserts.is_true(result.phases[0][2] <= result.phases[1][1])
+
+
+def _create_lazy_test_run(tracker, scope):
+  """Creates a test run where only some of the tests use a lazy variable."""
+
+  @checkers.parameterize({
+      'a': {'param': 'a'},
+      'b': {'param': 'b'},
+  })
+  @checkers.test
+  def test_uses(param, component):
+    tracker.append('%s %s' % (param, component))
+
+  @checkers.test
+  def test_ignores():
+    tracker.append('ignores')
+
+  def create_component(context):
+    tracker.append('create %s' % context.test_case.name)
+    return 'component:%s' % context.test_case.name
+
+  test_run = helpers.create_test_run('lazy', test_ignores, test_uses)
+  test_run.variables.register('component', fixtures.LazyVariable(
+      create_component, teardown=lambda v: tracker.append('teardown %s' % v),
+      scope=scope))
+  return test_run
+
+
+@checkers.test
+def test_lazy_variable_is_created_on_first_access():
+  tracker = []
+  test_run = _create_lazy_test_run(tracker, fixtures.FixtureScope.RUN)
+  checkers.TestRunner().run(test_run)
+  asserts.are_equal(tracker, [
+      'ignores',
+      'create test_uses_a',
+      'a component:test_uses_a',
+      'b component:test_uses_a',
+      'teardown component:test_uses_a',
+  ])
+
+
+@checkers.test
+def test_lazy_variable_is_memoized_per_scope():
+  tracker = []
+  test_run = _create_lazy_test_run(tracker, fixtures.FixtureScope.CASE)
+  checkers.TestRunner().run(test_run)
+  asserts.are_equal(tracker, [
+      'ignores',
+      'create test_uses_a',
+      'a component:test_uses_a',
+      'teardown component:test_uses_a',
+      'create test_uses_b',
+      'b component:test_uses_b',
+      'teardown component:test_uses_b',
+  ])
+
+
+@checkers.test
+def test_lazy_variable_is_never_created_when_unused():
+  tracker = []
+  test_run = _create_lazy_test_run(tracker, fixtures.FixtureScope.RUN)
+  test_run.select('test_ignores')
+  checkers.TestRunner().run(test_run)
+  asserts.are_equal(tracker, ['ignores'])
+
+
+@checkers.test
+def test_lazy_variable_resolver_is_cleared_on_exit():
+  tracker = []
+  test_run = _create_lazy_test_run(tracker, fixtures.FixtureScope.RUN)
+  test_case = [test_case for test_case
+               in test_run.generate_test_cases.values()
+               if test_case.name.startswith('test_uses')][0]
+  manager = fixtures.FixtureManager(test_run)
+  variables = test_case.context.variables
+  manager.enter(test_case)
+  asserts.is_not_none(variables._resolver)  # pylint: disable=protected-access
+  manager.exit(test_case)
+  asserts.is_none(variables._resolver)  # pylint: disable=protected-access
+  manager.close()
+
+
+def _create_pool_test_run(tracker, count, reset=None, size=None):
+  """Creates a test run whose test cases all use a pooled component."""
+  lock = threading.Lock()
+  created = []
+
+  @checkers.test
+  def test_pooled(index, component):
+    with lock:
+      tracker.append((index, component))
+
+  def create_component():
+    with lock:
+      created.append(len(created))
+      return {'id': created[-1], 'dirty': False}
+
+  test_run = helpers.create_test_run('pool', test_pooled)
+  helpers.parameterize(test_run, test_pooled, 'index', xrange(count))
+  pool = fixtures.ComponentPool(
+      create_component, reset=reset, size=size,
+      teardown=lambda c: tracker.append(('teardown', c['id'])))
+  test_run.variables.register('component', pool)
+  return test_run, created
+
+
+@checkers.test
+def test_component_pool_reuses_instances():
+  tracker = []
+  resets = []
+  test_run, created = _create_pool_test_run(tracker, 5, reset=resets.append)
+  results = checkers.TestRunner().run(test_run)
+  for result in results.values():
+    asserts.is_false(result.failed, result.message)
+  asserts.has_length(created, 1)
+  asserts.has_length(resets, 5)
+  asserts.are_equal(tracker[-1], ('teardown', 0))
+
+
+@checkers.test
+def test_component_pool_size_matches_executor_concurrency():
+  tracker = []
+  test_run, created = _create_pool_test_run(tracker, 50)
+  runner = checkers.TestRunner(executor=checkers.ThreadPoolExecutor(3))
+  results = runner.run(test_run)
+  for result in results.values():
+    asserts.is_false(result.failed, result.message)
+  asserts.is_true(1 <= len(created) <= 3)
+  teardowns = [t for t in tracker if t[0] == 'teardown']
+  asserts.has_length(teardowns, len(created))
+
+
+@checkers.test
+def test_component_pool_size_is_per_worker_process():
+  test_run, _ = _create_pool_test_run([], 4)
+  pool = test_run.variables['component']
+  runner = checkers.TestRunner(executor=checkers.ForkExecutor(3))
+  runner.setup_test_run(test_run)
+  try:
+    asserts.are_equal(pool._capacity, 1)  # pylint: disable=protected-access
+  finally:
+    runner.teardown_test_run(test_run)
+
+
+@checkers.test
+def test_component_pool_discards_instances_that_fail_to_reset():
+  tracker = []
+
+  def reset(component):
+    raise ValueError('cannot reset %s' % component['id'])
+
+  test_run, created = _create_pool_test_run(tracker, 3, reset=reset, size=1)
+  results = checkers.TestRunner().run(test_run)
+  for result in results.values():
+    asserts.are_equal(result.status, checkers.TestResultStatus.ERROR)
+  asserts.has_length(created, 3)
+  asserts.are_equal(tracker[-1], ('teardown', 2))
+
+
+@checkers.test
+def test_component_pool_check_out_waits_for_check_in():
+  pool = fixtures.ComponentPool(lambda: object(), size=1)
+  first = pool.check_out()
+  checked_out = []
+  thread = threading.Thread(target=lambda: checked_out.append(pool.check_out()))
+  thread.start()
+  thread.join(0.05)
+  asserts.is_empty(checked_out)
+  pool.check_in(first)
+  thread.join()
+  asserts.are_same(checked_out[0], first)
+
+
+
+@checkers.test
+def test_fixtures_of_concurrent_test_cases_are_set_up_concurrently():
+  started = [threading.Event(), threading.Event()]
+  overlapped = []
+
+  def setup(context):
+    index = int(context.test_case.name[-1])
+    started[index].set()
+    # Each setup waits for the other one, which can only start if setup isn't
+    # serialized.
+    overlapped.append(started[1 - index].wait(5))
+    return index
+
+  @checkers.test
+  def test_0(value):
+    asserts.are_equal(value, 0)
+
+  @checkers.test
+  def test_1(value):
+    asserts.are_equal(value, 1)
+
+  test_run = helpers.create_test_run('concurrent_fixtures', test_0, test_1)
+  test_run.fixtures.register(fixtures.Fixture('value', setup))
+  runner = checkers.TestRunner(executor=checkers.ThreadPoolExecutor(2))
+  results = runner.run(test_run)
+  asserts.are_equal(overlapped, [True, True])
+  asserts.is_false(any(result.failed for result in results.values()))
+
+
+@checkers.test
+def test_shared_fixture_is_set_up_once_for_concurrent_test_cases():
+  tracker = []
+
+  def setup():
+    tracker.append('setup')
+    return 'shared'
+
+  @checkers.parameterize(dict((str(i), {'index': i}) for i in xrange(8)))
+  @checkers.test
+  def test_shared(index, shared):
+    asserts.are_equal(shared, 'shared')
+    tracker.append(index)
+
+  test_run = helpers.create_test_run('shared_fixture', test_shared)
+  test_run.fixtures.register(fixtures.Fixture(
+      'shared', setup, scope=fixtures.FixtureScope.RUN))
+  checkers.TestRunner(executor=checkers.ThreadPoolExecutor(4)).run(test_run)
+  asserts.are_equal(tracker.count('setup'), 1)
+  asserts.has_length(tracker, 9)
+
+
+if __name__ == '__main__':
+  pyunit.main()
@@ -0,0 +1,119 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Tests for checkers.garbage."""
+
+import gc
+
+import checkers
+from checkers import asserts
+from checkers import executors
+from checkers import garbage
+from checkers.runners import pyunit
+from checkers.tests import helpers
+
+
+def _create_test_run(tracker):
+  """Creates a test run with tests that record whether gc is enabled."""
+
+  @checkers.test
+  def test_a():
+    tracker.append(gc.isenabled())
+
+  @checkers.test
+  def test_b():
+    tracker.append(gc.isenabled())
+
+  @checkers.test
+  def test_c():
+    tracker.append(gc.isenabled())
+
+  return helpers.create_test_run('garbage', test_a, test_b, test_c)
+
+
+def _run(gc_policy, tracker=None, executor=None):
+  test_run = _create_test_run(tracker if tracker is not None else [])
+  return helpers.run(test_run, executor, gc_policy=gc_policy)
+
+
+def _phase_names(result):
+  return [name for name, _, _ in result.phases]
+
+
+@checkers.test
+def test_disabled_policy_disables_gc_while_test_cases_run():
+  tracker = []
+  _run(garbage.GcPolicy(garbage.GcMode.DISABLED), tracker)
+  asserts.are_equal(tracker, [False] * 3)
+  asserts.is_true(gc.isenabled())
+
+
+@checkers.test
+def test_frozen_policy_restores_gc():
+  tracker = []
+  _run(garbage.GcPolicy(garbage.GcMode.FROZEN), tracker)
+  asserts.has_length(tracker, 3)
+  asserts.is_true(gc.isenabled())
+  if hasattr(gc, 'get_freeze_count'):
+    asserts.are_equal(gc.get_freeze_count(), 0)
+
+
+@checkers.test
+def test_automatic_policy_leaves_gc_alone():
+  tracker = []
+  _run(garbage.GcPolicy(), tracker)
+  asserts.are_equal(tracker, [True] * 3)
+
+
+@checkers.test
+def test_collect_every_records_collections():
+  gc_policy = garbage.GcPolicy(garbage.GcMode.DISABLED, collect_every=2)
+  results = _run(gc_policy)
+  collected = [full_name for full_name, result in results.iteritems()
+               if garbage.COLLECT_PHASE in _phase_names(result)]
+  asserts.has_length(collected, 1)
+  stats = gc_policy.cases[collected[0]]
+  asserts.are_equal(stats.collections, 1)
+  asserts.is_true(stats.pause >= 0)
+  asserts.are_equal(sorted(gc_policy.cases), sorted(results))
+  report = gc_policy.report()
+  asserts.is_in('collection(s)', report)
+  asserts.is_in(collected[0], report)
+
+
+@checkers.test
+def test_collection_stats_come_back_from_worker_processes():
+  gc_policy = garbage.GcPolicy(collect_every=1)
+  results = _run(gc_policy, executor=executors.ForkExecutor(2))
+  asserts.are_equal(sorted(gc_policy.cases), sorted(results))
+  for full_name, result in results.iteritems():
+    asserts.is_true(result.gc_stats['collections'] >= 1)
+    asserts.are_equal(gc_policy.cases[full_name].collections,
+                      result.gc_stats['collections'])
+  asserts.is_in(results.keys()[0], gc_policy.report())
+
+
+@checkers.test
+def test_start_and_stop_nest():
+  gc_policy = garbage.GcPolicy(garbage.GcMode.DISABLED)
+  gc_policy.start()
+  gc_policy.start()
+  gc_policy.stop()
+  asserts.is_false(gc.isenabled())
+  gc_policy.stop()
+  asserts.is_true(gc.isenabled())
+
+
+if __name__ == '__main__':
+  pyunit.main()
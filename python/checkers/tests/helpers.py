@@ -0,0 +1,68 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Helpers that the tests use to create and run small test runs."""
+
+import checkers
+from checkers import test_runner
+
+
+def create_test_run(name, *tests):
+  """Creates a test run with the given tests.
+
+  Args:
+    name: (string) The name of the test run.
+    *tests: (Test) The tests of the test run.
+
+  Returns:
+    TestRun: The test run.
+  """
+  test_run = checkers.TestRun(name)
+  for test in tests:
+    test_run.tests.register(test)
+  return test_run
+
+
+def parameterize(test_run, test, variable, values, names=None):
+  """Parameterizes a test of a test run with the values of a variable.
+
+  Args:
+    test_run: (TestRun) The test run that the test belongs to.
+    test: (Test) The test to parameterize.
+    variable: (string) The name of the variable.
+    values: (iterable) A value for each parameterization.
+    names: (iterable) The names of the parameterizations (defaults to the index
+        of each value).
+  """
+  values = list(values)
+  if names is None:
+    names = [str(i) for i in xrange(len(values))]
+  for name, value in zip(names, values):
+    test_run.parameterizations.register(
+        test.full_name, checkers.Parameterization(name, {variable: value}))
+
+
+def run(test_run, executor=None, **kwargs):
+  """Runs a test run.
+
+  Args:
+    test_run: (TestRun) The test run to run.
+    executor: (Executor) Runs the test cases (defaults to running them in
+        order).
+    **kwargs: (dict) The other arguments of the TestRunner (e.g. a profiler).
+
+  Returns:
+    AutoKeyRegistry: The test results, keyed by test case full name.
+  """
+  return test_runner.TestRunner(executor, **kwargs).run(test_run)
@@ -0,0 +1,135 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Tests for checkers.impact."""
+
+import imp
+import os
+import shutil
+import sys
+import tempfile
+
+import checkers
+from checkers import asserts
+from checkers import impact
+from checkers.runners import pyunit
+from checkers.tests import helpers
+
+
+class _Modules(object):
+  """Temporary modules for the test cases to cover."""
+
+  def __init__(self):
+    self.directory = tempfile.mkdtemp()
+    self.paths = {}
+    self.modules = {}
+    for name in ('impact_a', 'impact_b'):
+      self.paths[name] = os.path.join(self.directory, name + '.py')
+      with open(self.paths[name], 'w') as f:
+        f.write('def value():\n  return 1\n')
+      self.modules[name] = imp.load_source(name, self.paths[name])
+
+  def remove(self):
+    shutil.rmtree(self.directory)
+
+
+def _create_test_run(modules, names=('impact_a', 'impact_b')):
+  """Creates a test run with a test case per module that calls into it."""
+
+  @checkers.test
+  def test_value(name):
+    asserts.are_equal(modules.modules[name].value(), 1)
+
+  test_run = helpers.create_test_run('impact', test_value)
+  helpers.parameterize(test_run, test_value, 'name', names, names=names)
+  return test_run
+
+
+def _selected_names(test_run):
+  return [tc.name for tc in test_run.generate_test_cases.values()]
+
+
+@checkers.test
+def test_impact_index_records_covered_files():
+  modules = _Modules()
+  try:
+    index = impact.ImpactIndex()
+    results = helpers.run(_create_test_run(modules), impact_index=index)
+    first, second = results.values()
+    asserts.is_in(impact.normalize_path(modules.paths['impact_a']),
+                  first.covered_files)
+    asserts.is_not_in(impact.normalize_path(modules.paths['impact_b']),
+                      first.covered_files)
+    asserts.is_in(impact.normalize_path(__file__), first.covered_files)
+    asserts.are_equal(index.entries[first.context.test_case.full_name],
+                      first.covered_files)
+    asserts.is_not_in(impact.normalize_path(os.__file__), first.covered_files)
+  finally:
+    modules.remove()
+
+
+@checkers.test
+def test_impact_selector_selects_affected_and_new_test_cases():
+  modules = _Modules()
+  try:
+    index = impact.ImpactIndex()
+    helpers.run(_create_test_run(modules, ['impact_a', 'impact_b']),
+                impact_index=index)
+    test_run = _create_test_run(modules, ['impact_a', 'impact_b', 'new'])
+    test_run.select(index.selector([modules.paths['impact_b']]))
+    asserts.are_equal(_selected_names(test_run),
+                      ['test_value_impact_b', 'test_value_new'])
+    test_run = _create_test_run(modules)
+    test_run.select(index.selector([]))
+    asserts.is_empty(_selected_names(test_run))
+  finally:
+    modules.remove()
+
+
+@checkers.test
+def test_impact_index_save_and_load():
+  modules = _Modules()
+  try:
+    index_path = os.path.join(modules.directory, 'index.json')
+    index = impact.ImpactIndex(index_path)
+    helpers.run(_create_test_run(modules), checkers.ForkExecutor(2),
+                impact_index=index)
+    loaded = impact.ImpactIndex(index_path)
+    asserts.are_equal(loaded.entries, index.entries)
+    asserts.has_length(loaded.entries, 2)
+  finally:
+    modules.remove()
+
+
+@checkers.test
+def test_trace_restores_previous_trace_function():
+  calls = []
+
+  def tracer(unused_frame, event, unused_arg):
+    calls.append(event)
+
+  index = impact.ImpactIndex()
+  previous = sys.gettrace()
+  sys.settrace(tracer)
+  try:
+    value, _ = index.trace(lambda: 5)
+    restored = sys.gettrace()
+  finally:
+    sys.settrace(previous)
+  asserts.are_equal(value, 5)
+  asserts.are_same(restored, tracer)
+
+
+if __name__ == '__main__':
+  pyunit.main()
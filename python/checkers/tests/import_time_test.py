@@ -0,0 +1,111 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Import-time benchmark for the checkers package.
+
+Each test imports checkers in a fresh interpreter, so the measurements include
+everything the import pulls in.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import checkers
+from checkers import asserts
+from checkers.runners import pyunit
+
+# Generous upper bound for the import, to catch large regressions without being
+# sensitive to slow machines.
+_IMPORT_SECONDS_BUDGET = 0.5
+
+# Submodules that importing checkers (and defining tests) may import.
+_CORE_SUBMODULES = frozenset([
+    'checkers', 'checkers.events', 'checkers.modules',
+    'checkers.parameterization', 'checkers.registry', 'checkers.test',
+    'checkers.test_case', 'checkers.test_result', 'checkers.test_suite',
+])
+
+_MEASURE_IMPORT = '''
+import json
+import sys
+import time
+start = time.time()
+import checkers
+%s
+seconds = time.time() - start
+print json.dumps({
+    'seconds': seconds,
+    'modules': sorted(name for name, module in sys.modules.items() if module),
+})
+'''
+
+_DEFINE_TESTS = '''
+@checkers.test_suites('suite')
+@checkers.parameterize({'one': {'x': 1}})
+@checkers.test
+def test_something(x):
+  pass
+'''
+
+
+def _measure_import(statements=''):
+  """Imports checkers in a new interpreter; returns the seconds and modules."""
+  package_directory = os.path.dirname(os.path.dirname(checkers.__file__))
+  environment = dict(os.environ)
+  environment['PYTHONPATH'] = package_directory
+  output = subprocess.check_output(
+      [sys.executable, '-c', _MEASURE_IMPORT % statements], env=environment)
+  return json.loads(output)
+
+
+def _checkers_modules(measurement):
+  return set(name for name in measurement['modules']
+             if name.split('.')[0] == 'checkers')
+
+
+@checkers.test
+def test_import_only_loads_core_submodules():
+  measurement = _measure_import()
+  asserts.is_true(_checkers_modules(measurement) <= _CORE_SUBMODULES,
+                  sorted(_checkers_modules(measurement) - _CORE_SUBMODULES))
+  for heavy_module in ('multiprocessing', 'socket', 'subprocess', 'threading'):
+    asserts.is_not_in(heavy_module, measurement['modules'])
+
+
+@checkers.test
+def test_defining_tests_only_loads_core_submodules():
+  measurement = _measure_import(_DEFINE_TESTS)
+  asserts.is_true(_checkers_modules(measurement) <= _CORE_SUBMODULES,
+                  sorted(_checkers_modules(measurement) - _CORE_SUBMODULES))
+
+
+@checkers.test
+def test_public_names_load_on_first_use():
+  measurement = _measure_import('checkers.TestRunner')
+  asserts.is_in('checkers.test_runner', measurement['modules'])
+  asserts.is_not_in('checkers.impact', measurement['modules'])
+
+
+@checkers.test
+def test_import_time_budget():
+  # The best of a few runs, to smooth out noise.
+  seconds = min(_measure_import()['seconds'] for _ in xrange(3))
+  asserts.is_true(seconds < _IMPORT_SECONDS_BUDGET,
+                  'importing checkers took %.3fs' % seconds)
+
+
+if __name__ == '__main__':
+  pyunit.main()
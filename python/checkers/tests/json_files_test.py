@@ -0,0 +1,55 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Tests for checkers.json_files."""
+
+import json
+import os
+import shutil
+import tempfile
+
+import checkers
+from checkers import asserts
+from checkers import json_files
+from checkers.runners import pyunit
+
+
+@checkers.test
+def test_saved_file_is_loaded_with_its_version():
+  directory = tempfile.mkdtemp()
+  try:
+    file_path = os.path.join(directory, 'entries.json')
+    json_files.save(file_path, 2, {'entries': {'a': [1, 2]}})
+    asserts.are_equal(json_files.load(file_path, 2),
+                      {'version': 2, 'entries': {'a': [1, 2]}})
+  finally:
+    shutil.rmtree(directory)
+
+
+@checkers.test
+def test_file_with_another_version_is_ignored():
+  directory = tempfile.mkdtemp()
+  try:
+    file_path = os.path.join(directory, 'entries.json')
+    json_files.save(file_path, 1, {'entries': {}})
+    asserts.is_none(json_files.load(file_path, 2))
+    with open(file_path, 'w') as f:
+      json.dump({'entries': {}}, f)
+    asserts.is_none(json_files.load(file_path, 1))
+  finally:
+    shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+  pyunit.main()
@@ -0,0 +1,104 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Tests for checkers.leaks."""
+
+import checkers
+from checkers import asserts
+from checkers import leaks
+from checkers.runners import pyunit
+from checkers.tests import helpers
+
+
+class _Leaked(object):
+  pass
+
+
+_LEAKED = []
+
+
+def _create_test_run():
+  """Creates a test run with a test that leaks and one that doesn't."""
+
+  @checkers.test
+  def test_leaky():
+    _LEAKED.append(_Leaked())
+
+  @checkers.test
+  def test_clean():
+    temporary = [_Leaked() for _ in xrange(10)]
+    asserts.has_length(temporary, 10)
+
+  @checkers.test
+  def test_failing():
+    asserts.is_true(False)
+
+  return helpers.create_test_run('leaks', test_leaky, test_clean,
+                                 test_failing)
+
+
+def _run(leak_detector):
+  del _LEAKED[:]
+  helpers.run(_create_test_run(), leak_detector=leak_detector)
+  return dict((full_name.rsplit('.', 1)[-1], case)
+              for full_name, case in leak_detector.cases.iteritems())
+
+
+@checkers.test
+def test_type_name():
+  asserts.are_equal(leaks.type_name([]), 'list')
+  asserts.are_equal(leaks.type_name(_Leaked()),
+                    '%s._Leaked' % _Leaked.__module__)
+
+
+@checkers.test
+def test_leak_detector_attributes_leaked_objects():
+  leak_detector = leaks.LeakDetector()
+  cases = _run(leak_detector)
+  asserts.are_equal(sorted(cases), ['test_leaky'])
+  case = cases['test_leaky']
+  asserts.are_equal(case.objects.get('%s._Leaked' % _Leaked.__module__), 1)
+
+
+@checkers.test
+def test_leak_detector_ignores_objects_kept_by_the_result():
+  leak_detector = leaks.LeakDetector()
+  asserts.is_not_in('test_failing', _run(leak_detector))
+
+
+@checkers.test
+def test_leak_detector_selector():
+  leak_detector = leaks.LeakDetector(selector='test_clean')
+  asserts.is_empty(_run(leak_detector))
+
+
+@checkers.test
+def test_top_leakers_and_report():
+  leak_detector = leaks.LeakDetector()
+  leak_detector.cases = {
+      'a': leaks.CaseLeaks('a', {'list': 1}),
+      'b': leaks.CaseLeaks('b', {'list': 2, 'dict': 3}),
+  }
+  asserts.are_equal([case.full_name for case in leak_detector.top_leakers()],
+                    ['b', 'a'])
+  asserts.are_equal(
+      [case.full_name for case in leak_detector.top_leakers(limit=1)], ['b'])
+  report = leak_detector.report()
+  asserts.is_in('2 test case(s) leaked', report)
+  asserts.is_in('b: 5 object(s)', report)
+  asserts.is_in('dict', report)
+
+
+if __name__ == '__main__':
+  pyunit.main()
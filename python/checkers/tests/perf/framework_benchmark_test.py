@@ -0,0 +1,77 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Tests for checkers.perf.framework_benchmark."""
+
+import json
+import os
+import shutil
+import tempfile
+
+import checkers
+from checkers import asserts
+from checkers.perf import framework_benchmark
+from checkers.runners import pyunit
+
+
+@checkers.test
+def test_build_test_run():
+  config = framework_benchmark.Config(10, suites=2, params=3, variables=2,
+                                      setups=1)
+  test_run = framework_benchmark.build_test_run(config)
+  asserts.are_equal(config.tests, 4)
+  asserts.has_length(test_run.tests, 4)
+  asserts.has_length(test_run.variables, 2)
+  asserts.has_length(test_run.test_case_setup, 1)
+  asserts.has_length(test_run.test_case_teardown, 1)
+  asserts.has_length(test_run.generate_test_cases, 12)
+
+
+@checkers.test
+def test_measure():
+  config = framework_benchmark.Config(20, suites=3, params=2, variables=1,
+                                      setups=2)
+  result = framework_benchmark.measure(config)
+  asserts.are_equal(result['config'], config.to_dict())
+  asserts.are_equal(result['test_cases'], 20)
+  asserts.are_equal(result['failed'], 0)
+  for key in ('generate_seconds', 'execute_seconds', 'per_case_us',
+              'pyunit_seconds', 'peak_rss_kb'):
+    asserts.is_true(result[key] >= 0)
+
+
+@checkers.test
+def test_configs_cover_every_combination():
+  configs = framework_benchmark.configs([1, 2], [1], [1, 3], [0], [0, 1])
+  asserts.has_length(configs, 8)
+
+
+@checkers.test
+def test_main_writes_json():
+  directory = tempfile.mkdtemp()
+  try:
+    file_path = os.path.join(directory, 'framework.json')
+    exit_code = framework_benchmark.main(
+        ['--cases', '10,20', '--params', '2', '--output', file_path])
+    asserts.are_equal(exit_code, 0)
+    with open(file_path) as f:
+      output = json.load(f)
+    asserts.are_equal(output['version'], framework_benchmark.OUTPUT_VERSION)
+    asserts.are_equal([r['test_cases'] for r in output['results']], [10, 20])
+  finally:
+    shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+  pyunit.main()
@@ -0,0 +1,146 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Tests for checkers.plan."""
+
+import os
+import tempfile
+import types
+
+import checkers
+from checkers import asserts
+from checkers import plan
+from checkers import test_result
+from checkers.runners import pyunit
+from checkers.tests import helpers
+
+
+def _create_module():
+  """Creates a module containing the tests of the plans."""
+
+  @checkers.test_suites('math')
+  @checkers.parameterize({
+      'one': {'x': 1},
+      'two': {'x': 2},
+      'three': {'x': 3},
+  })
+  @checkers.test
+  def test_positive(x):
+    asserts.is_true(x > 0)
+
+  @checkers.test
+  def test_hello():
+    pass
+
+  module = types.ModuleType('planned')
+  module.test_positive = test_positive
+  module.test_hello = test_hello
+  return module
+
+
+def _create_test_run(module):
+  return helpers.create_test_run('planned', module.test_positive,
+                                 module.test_hello)
+
+
+def _full_names(cases):
+  return [case.full_name for case in cases]
+
+
+@checkers.test
+def test_plan_from_test_run():
+  module = _create_module()
+  test_run = _create_test_run(module)
+  test_plan = plan.TestPlan.from_test_run(test_run, costs={
+      module.test_hello.full_name: 5.0})
+  asserts.are_equal(_full_names(test_plan.cases),
+                    _full_names(test_run.generate_test_cases.values()))
+  asserts.are_equal(test_plan.total_cost, 8.0)
+  positive = [c for c in test_plan.cases if c.parameterization == 'two'][0]
+  asserts.are_equal(positive.test.full_name, module.test_positive.full_name)
+  asserts.are_equal(positive.test.attribute, 'test_positive')
+  asserts.is_in('math', positive.suites)
+  asserts.has_length(test_plan.tests, 2)
+
+
+@checkers.test
+def test_plan_slices_balance_costs():
+  costs = [8.0, 1.0, 1.0, 4.0, 3.0, 1.0]
+  test = plan.PlannedTest('m.test', 'm', 'test')
+  test_plan = plan.TestPlan('run', [
+      plan.PlannedCase('m.test_%d' % i, test, str(i), cost=cost)
+      for i, cost in enumerate(costs)])
+  slices = [test_plan.slice(i, 2) for i in xrange(2)]
+  asserts.are_equal([s.total_cost for s in slices], [9.0, 9.0])
+  asserts.are_equal(_full_names(slices[0].cases), ['m.test_0', 'm.test_2'])
+  asserts.are_equal(_full_names(slices[1].cases),
+                    ['m.test_1', 'm.test_3', 'm.test_4', 'm.test_5'])
+
+
+@checkers.test
+def test_plan_slice_out_of_range():
+  with asserts.expect_exception(ValueError):
+    plan.TestPlan('run').slice(2, 2)
+
+
+@checkers.test
+def test_plan_save_and_load():
+  test_plan = plan.TestPlan.from_test_run(_create_test_run(_create_module()))
+  fd, file_path = tempfile.mkstemp(suffix='.json')
+  os.close(fd)
+  try:
+    test_plan.save(file_path)
+    loaded = plan.TestPlan.load(file_path)
+  finally:
+    os.remove(file_path)
+  asserts.are_equal(loaded.test_run_name, 'planned')
+  asserts.are_equal(_full_names(loaded.cases), _full_names(test_plan.cases))
+  asserts.are_equal([c.suites for c in loaded.cases],
+                    [c.suites for c in test_plan.cases])
+  asserts.are_equal([t.module_name for t in loaded.tests],
+                    [t.module_name for t in test_plan.tests])
+
+
+@checkers.test
+def test_plan_unsupported_version():
+  source = plan.TestPlan('run').to_dict()
+  source['version'] = plan.PLAN_VERSION + 1
+  with asserts.expect_exception(ValueError):
+    plan.TestPlan.from_dict(source)
+
+
+@checkers.test
+def test_test_run_from_plan_slice():
+  module = _create_module()
+  test_plan = plan.TestPlan.from_test_run(_create_test_run(module))
+  planned_slice = test_plan.slice(1, 2)
+  test_run = checkers.TestRun.from_plan(planned_slice, module)
+  asserts.are_equal(test_run.name, 'planned')
+  asserts.are_equal(_full_names(test_run.generate_test_cases.values()),
+                    _full_names(planned_slice.cases))
+
+
+@checkers.test
+def test_costs_from_results():
+  module = _create_module()
+  results = checkers.TestRunner().run(_create_test_run(module))
+  costs = plan.costs_from_results(results.values())
+  asserts.are_equal(set(costs), set(results))
+  asserts.is_true(all(cost >= 0 for cost in costs.values()))
+  not_run = test_result.TestResult(None, test_result.TestResultStatus.NOT_RUN)
+  asserts.is_empty(plan.costs_from_results([not_run]))
+
+
+if __name__ == '__main__':
+  pyunit.main()
@@ -0,0 +1,144 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Tests for checkers.profiling."""
+
+import os
+import shutil
+import tempfile
+
+import checkers
+from checkers import asserts
+from checkers import profiling
+from checkers.runners import pyunit
+from checkers.tests import helpers
+
+
+def _spin(count):
+  total = 0
+  for i in xrange(count):
+    total += i
+  return total
+
+
+def _body_helper():
+  return _spin(20000)
+
+
+def _setup_helper():
+  return _spin(10000)
+
+
+def _create_test_run():
+  """Creates a test run with a test whose setup and body both do some work."""
+
+  def setup_work():
+    _setup_helper()
+
+  @checkers.test
+  def test_work():
+    _body_helper()
+
+  @checkers.test
+  def test_other():
+    pass
+
+  test_run = helpers.create_test_run('profiled', test_work, test_other)
+  test_run.test_case_setup.register(setup_work)
+  return test_run
+
+
+def _categories_by_name(profiler):
+  return dict((label.rsplit('(', 1)[-1].rstrip(')'), category)
+              for label, category in profiler.categories.iteritems())
+
+
+@checkers.test
+def test_is_framework_file():
+  asserts.is_true(profiling.is_framework_file(profiling.__file__))
+  asserts.is_false(profiling.is_framework_file(__file__))
+  asserts.is_false(profiling.is_framework_file(os.__file__))
+
+
+@checkers.test
+def test_profiler_splits_phases_and_categorizes_functions():
+  profiler = profiling.Profiler()
+  helpers.run(_create_test_run(), profiler=profiler)
+  asserts.are_equal(sorted(profiler.cases),
+                    ['profiling_test.test_other', 'profiling_test.test_work'])
+  phases = profiler.cases['profiling_test.test_work']
+  for phase in profiling.PHASES:
+    asserts.is_true(phases[phase] > 0)
+  categories = _categories_by_name(profiler)
+  asserts.are_equal(categories['_body_helper'], 'body')
+  asserts.are_equal(categories['test_work'], 'body')
+  asserts.are_equal(categories['_setup_helper'], 'fixtures')
+  asserts.are_equal(categories['_spin'], profiling.MIXED_CATEGORY)
+  asserts.are_equal(categories['_call_test_case'], 'framework')
+  hot_spots = profiler.hot_spots(limit=1)
+  asserts.has_length(hot_spots, 1)
+  asserts.is_in('_spin', hot_spots[0][0])
+
+
+@checkers.test
+def test_merge_categories():
+  categories = {'a': 'body', 'b': 'fixtures'}
+  profiling.merge_categories(categories, {'a': 'body', 'b': 'body',
+                                          'c': 'framework'})
+  asserts.are_equal(categories, {'a': 'body', 'b': profiling.MIXED_CATEGORY,
+                                 'c': 'framework'})
+
+
+@checkers.test
+def test_profiler_only_profiles_selected_cases():
+  profiler = profiling.Profiler(selector='name:test_other')
+  helpers.run(_create_test_run(), profiler=profiler)
+  asserts.are_equal(profiler.cases.keys(), ['profiling_test.test_other'])
+
+
+@checkers.test
+def test_profiler_saves_and_aggregates_profiles():
+  directory = tempfile.mkdtemp()
+  try:
+    profiler = profiling.Profiler(directory, run_id='first')
+    helpers.run(_create_test_run(), profiler=profiler)
+    suffix = 'first-%d' % os.getpid()
+    asserts.are_equal(sorted(os.listdir(directory)), [
+        'profiling_test.test_other.%s.json' % suffix,
+        'profiling_test.test_other.%s.prof' % suffix,
+        'profiling_test.test_work.%s.json' % suffix,
+        'profiling_test.test_work.%s.prof' % suffix])
+    loaded = profiling.Profiler(directory)
+    loaded.load()
+    asserts.are_equal(loaded.cases, profiler.cases)
+    asserts.are_equal(loaded.categories, profiler.categories)
+    report = loaded.report()
+    asserts.is_in('Profiled 2 test case(s): fixtures ', report)
+    asserts.is_in('_spin', report)
+
+    # Another run adds its own profiles, which are aggregated with the first.
+    second = profiling.Profiler(directory)
+    helpers.run(_create_test_run(), profiler=second)
+    asserts.has_length(os.listdir(directory), 8)
+    loaded.load()
+    for full_name, phases in loaded.cases.iteritems():
+      for phase, seconds in phases.iteritems():
+        asserts.is_true(abs(seconds - profiler.cases[full_name][phase] -
+                            second.cases[full_name][phase]) < 1e-6)
+  finally:
+    shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+  pyunit.main()
@@ -0,0 +1,163 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Tests for checkers.result_cache."""
+
+import imp
+import os
+import shutil
+import tempfile
+
+import checkers
+from checkers import asserts
+from checkers import result_cache
+from checkers import test_result
+from checkers import test_runner
+from checkers.runners import pyunit
+from checkers.tests import helpers
+
+
+def _create_test_run(tracker, values=(1, 2, -1)):
+  """Creates a test run whose test cases pass for positive values."""
+
+  @checkers.test
+  def test_positive(x):
+    tracker.append(x)
+    asserts.is_true(x > 0)
+
+  test_run = helpers.create_test_run('cached', test_positive)
+  helpers.parameterize(test_run, test_positive, 'x', values)
+  return test_run
+
+
+def _statuses(results):
+  return [result.status for result in results.values()]
+
+
+@checkers.test
+def test_code_fingerprint_ignores_line_numbers():
+  source = 'def f(x):\n  return x + 1\n'
+  first = compile(source, 'a.py', 'exec').co_consts[0]
+  moved = compile('\n\n' + source, 'b.py', 'exec').co_consts[0]
+  changed = compile(source.replace('1', '2'), 'a.py', 'exec').co_consts[0]
+  asserts.are_equal(result_cache._code_fingerprint(first),
+                    result_cache._code_fingerprint(moved))
+  asserts.are_not_equal(result_cache._code_fingerprint(first),
+                        result_cache._code_fingerprint(changed))
+
+
+@checkers.test
+def test_key_depends_on_parameterization_values():
+  cache = result_cache.ResultCache()
+  first = _create_test_run([]).generate_test_cases.values()
+  second = _create_test_run([], values=(1, 3, -1)).generate_test_cases.values()
+  asserts.are_equal(cache.key(first[0]), cache.key(second[0]))
+  asserts.are_not_equal(cache.key(first[1]), cache.key(second[1]))
+
+
+@checkers.test
+def test_key_depends_on_setup():
+  cache = result_cache.ResultCache()
+  test_case = _create_test_run([]).generate_test_cases.values()[0]
+  key = cache.key(test_case)
+  test_case.test.setup.register(lambda: None)
+  asserts.are_not_equal(cache.key(test_case), key)
+
+
+@checkers.test
+def test_key_is_none_for_callable_objects():
+
+  class Setup(object):
+    __name__ = 'setup'
+
+    def __call__(self):
+      pass
+
+  cache = result_cache.ResultCache()
+  test_case = _create_test_run([]).generate_test_cases.values()[0]
+  test_case.test.setup.register(Setup())
+  asserts.is_none(cache.key(test_case))
+
+
+@checkers.test
+def test_runner_skips_cached_passes():
+  tracker = []
+  cache = result_cache.ResultCache()
+  runner = test_runner.TestRunner(result_cache=cache)
+  runner.run(_create_test_run(tracker))
+  asserts.are_equal(tracker, [1, 2, -1])
+  results = runner.run(_create_test_run(tracker))
+  asserts.are_equal(tracker, [1, 2, -1, -1])
+  asserts.are_equal(_statuses(results), [
+      test_result.TestResultStatus.PASSED,
+      test_result.TestResultStatus.PASSED,
+      test_result.TestResultStatus.FAILED,
+  ])
+  asserts.are_equal([result.cached for result in results.values()],
+                    [True, True, False])
+
+
+@checkers.test
+def test_runner_computes_each_key_once():
+  keys = []
+
+  class CountingCache(result_cache.ResultCache):
+
+    def key(self, test_case):
+      keys.append(test_case.full_name)
+      return super(CountingCache, self).key(test_case)
+
+  cache = CountingCache()
+  runner = test_runner.TestRunner(result_cache=cache)
+  test_run = _create_test_run([])
+  runner.run(test_run)
+  asserts.has_length(keys, 2)
+  del keys[:]
+  test_run.tests.values()[0].setup.register(lambda: None)
+  runner.run(test_run)
+  asserts.are_equal(sorted(keys), sorted(cache.entries))
+
+
+@checkers.test
+def test_cache_is_saved_and_invalidated_by_module_changes():
+  directory = tempfile.mkdtemp()
+  try:
+    module_path = os.path.join(directory, 'cached_module.py')
+    with open(module_path, 'w') as f:
+      f.write('VALUE = 1\n')
+    module = imp.load_source('cached_module', module_path)
+    cache_path = os.path.join(directory, 'cache.json')
+    tracker = []
+    runner = test_runner.TestRunner(
+        result_cache=result_cache.ResultCache(cache_path, [module]))
+    runner.run(_create_test_run(tracker))
+    asserts.is_true(os.path.exists(cache_path))
+
+    runner = test_runner.TestRunner(
+        result_cache=result_cache.ResultCache(cache_path, [module]))
+    runner.run(_create_test_run(tracker))
+    asserts.are_equal(tracker, [1, 2, -1, -1])
+
+    with open(module_path, 'w') as f:
+      f.write('VALUE = 2\n')
+    runner = test_runner.TestRunner(
+        result_cache=result_cache.ResultCache(cache_path, [module]))
+    runner.run(_create_test_run(tracker))
+    asserts.are_equal(tracker, [1, 2, -1, -1, 1, 2, -1])
+  finally:
+    shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+  pyunit.main()
@@ -0,0 +1,210 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Tests for checkers.runners.pyunit."""
+
+import StringIO
+import sys
+import unittest
+
+import checkers
+from checkers import asserts
+from checkers.runners import pyunit
+from checkers.runners.pyunit import pyunit as pyunit_module
+
+
+def _create_test_run(tracker):
+  """Creates a test run with a passing, a failing and another passing test."""
+
+  @checkers.test
+  def test_first():
+    tracker.append('test_first')
+
+  @checkers.test
+  def test_second():
+    tracker.append('test_second')
+    asserts.is_true(False)
+
+  @checkers.test
+  def test_third():
+    tracker.append('test_third')
+
+  def run_setup(_):
+    tracker.append('setup')
+
+  def run_teardown(_):
+    tracker.append('teardown')
+
+  test_run = checkers.TestRun('lazy_run')
+  for test in (test_first, test_second, test_third):
+    test_run.tests.register(test)
+  test_run.setup.register(run_setup)
+  test_run.teardown.register(run_teardown)
+  return test_run
+
+
+def _create_lazy_suite(test_run):
+  module = sys.modules[__name__]
+  return pyunit.create_pyunit_test_suites(module, [test_run], None,
+                                          unittest.TestCase)
+
+
+@checkers.test
+def test_run_test_run_groups_results_by_suite():
+  tracker = []
+  results = pyunit.run_test_run(_create_test_run(tracker))
+  asserts.is_in('lazy_run.all', results)
+  asserts.has_length(results['lazy_run.all'], 3)
+  asserts.are_equal(tracker[0], 'setup')
+  asserts.are_equal(tracker[-1], 'teardown')
+
+
+@checkers.test
+def test_lazy_suites_do_not_run_until_invoked():
+  tracker = []
+  suite = _create_lazy_suite(_create_test_run(tracker))
+  asserts.are_equal(suite.countTestCases(), 3)
+  asserts.is_empty(tracker)
+
+
+@checkers.test
+def test_lazy_suites_run_each_case_once():
+  tracker = []
+  suite = _create_lazy_suite(_create_test_run(tracker))
+  result = unittest.TestResult()
+  suite.run(result)
+  asserts.are_equal(result.testsRun, 3)
+  asserts.has_length(result.failures, 1)
+  asserts.are_equal(tracker, ['setup', 'test_first', 'test_second',
+                              'test_third', 'teardown'])
+
+
+@checkers.test
+def test_lazy_suites_failfast_skips_remaining_cases():
+  tracker = []
+  suite = _create_lazy_suite(_create_test_run(tracker))
+  result = unittest.TestResult()
+  result.failfast = True
+  suite.run(result)
+  asserts.are_equal(result.testsRun, 2)
+  asserts.is_not_in('test_third', tracker)
+  asserts.are_equal(tracker[-1], 'teardown')
+
+
+@checkers.test
+def test_main_options_come_from_keywords_or_command_line():
+  main_options = pyunit_module._main_options
+  asserts.are_equal(main_options({'argv': ['main']}), (False, False))
+  asserts.are_equal(main_options({'argv': ['main', '-v', '-f']}),
+                    (True, False))
+  asserts.are_equal(main_options({'argv': ['main', '--buffer']}),
+                    (False, True))
+  asserts.are_equal(main_options({'argv': ['main', '-fb']}), (True, True))
+  asserts.are_equal(
+      main_options({'argv': ['main', '-f'], 'failfast': False, 'buffer': True}),
+      (False, True))
+  asserts.are_equal(main_options({'argv': ['main', '--bogus']}),
+                    (False, False))
+
+
+@checkers.test
+def test_run_test_run_reports_not_run_cases_as_skipped():
+  tracker = []
+  test_run = _create_test_run(tracker)
+  results = pyunit.run_test_run(test_run, checkers.TestRunner(failfast=True))
+  module = sys.modules[__name__]
+  suite = pyunit.create_pyunit_test_suites(module, [test_run],
+                                           {test_run.name: results},
+                                           unittest.TestCase)
+  result = unittest.TestResult()
+  suite.run(result)
+  asserts.has_length(result.failures, 1)
+  asserts.has_length(result.skipped, 1)
+
+
+@checkers.test
+def test_lazy_suites_max_failures_skips_remaining_cases():
+  tracker = []
+  module = sys.modules[__name__]
+  suite = pyunit.create_pyunit_test_suites(
+      module, [_create_test_run(tracker)], None, unittest.TestCase,
+      test_runner=checkers.TestRunner(max_failures=1))
+  result = unittest.TestResult()
+  suite.run(result)
+  asserts.are_equal(result.testsRun, 3)
+  asserts.has_length(result.skipped, 1)
+  asserts.is_not_in('test_third', tracker)
+
+
+@checkers.test
+def test_lazy_suites_skip_setup_when_nothing_runs():
+  tracker = []
+  suite = _create_lazy_suite(_create_test_run(tracker))
+  result = unittest.TestResult()
+  result.stop()
+  suite.run(result)
+  asserts.are_equal(result.testsRun, 0)
+  asserts.is_empty(tracker)
+
+
+
+@checkers.test
+def test_suites_run_and_report_benchmarks():
+  @checkers.benchmark(warmup=0, iterations=4)
+  def benchmark_nothing():
+    pass
+
+  test_run = checkers.TestRun('benchmark_run')
+  test_run.tests.register(benchmark_nothing)
+  suite = _create_lazy_suite(test_run)
+  result = unittest.TestResult()
+  stderr = sys.stderr
+  sys.stderr = StringIO.StringIO()
+  try:
+    suite.run(result)
+    report = sys.stderr.getvalue()
+  finally:
+    sys.stderr = stderr
+  asserts.are_equal(result.testsRun, 1)
+  asserts.is_in('pyunit_test.benchmark_nothing: min ', report)
+  asserts.is_in('(4 iterations)', report)
+
+
+@checkers.test
+def test_suites_write_the_captured_output_of_failures():
+  @checkers.test
+  def test_printing():
+    print 'printed by test_printing'
+    asserts.is_true(False)
+
+  test_run = checkers.TestRun('capture_run')
+  test_run.tests.register(test_printing)
+  suite = pyunit.create_pyunit_test_suites(
+      sys.modules[__name__], [test_run], None, unittest.TestCase,
+      test_runner=checkers.TestRunner(output_capture=checkers.OutputCapture()))
+  result = unittest.TestResult()
+  stderr = sys.stderr
+  sys.stderr = StringIO.StringIO()
+  try:
+    suite.run(result)
+    written = sys.stderr.getvalue()
+  finally:
+    sys.stderr = stderr
+  asserts.has_length(result.failures, 1)
+  asserts.is_in('--- Output of pyunit_test.test_printing ---\n'
+                'printed by test_printing\n', written)
+
+
+if __name__ == '__main__':
+  pyunit.main()
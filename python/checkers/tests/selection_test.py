@@ -0,0 +1,156 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Tests for checkers.selection."""
+
+import checkers
+from checkers import asserts
+from checkers import selection
+from checkers.runners import pyunit
+from checkers.tests import helpers
+
+
+def _candidate(name='test_add_1_2', parameterization_name='1_2',
+               suite_names=('all', 'math')):
+  return selection.CaseCandidate(name, 'calc_test.%s' % name,
+                                 'calc_test.test_add', parameterization_name,
+                                 suite_names)
+
+
+def _create_test_run():
+
+  @checkers.test_suites('math')
+  @checkers.parameterize({
+      '1_2': {'x': 1, 'y': 2},
+      'n1_2': {'x': -1, 'y': 2},
+      '0_0': {'x': 0, 'y': 0, 'test_suites': ['identity']},
+  })
+  @checkers.test
+  def test_add(x, y):
+    asserts.are_equal(x + y, y + x)
+
+  @checkers.test
+  def test_hello():
+    pass
+
+  return helpers.create_test_run('selection', test_add, test_hello)
+
+
+def _generated_names(test_run):
+  return set(tc.name for tc in test_run.generate_test_cases.values())
+
+
+@checkers.test
+def test_name_selector_matches_name_or_full_name():
+  asserts.is_true(selection.NameSelector('test_add_*').matches(_candidate()))
+  asserts.is_true(selection.NameSelector('calc_test.*').matches(_candidate()))
+  asserts.is_false(selection.NameSelector('test_sub*').matches(_candidate()))
+
+
+@checkers.test
+def test_suite_and_parameterization_selectors():
+  asserts.is_true(selection.SuiteSelector('ma*').matches(_candidate()))
+  asserts.is_false(selection.SuiteSelector('identity').matches(_candidate()))
+  asserts.is_true(selection.ParameterizationSelector('1_*').matches(
+      _candidate()))
+  asserts.is_false(selection.ParameterizationSelector('*').matches(
+      _candidate(parameterization_name=None)))
+
+
+@checkers.test
+def test_selector_operators():
+  add = selection.NameSelector('test_add*')
+  math = selection.SuiteSelector('math')
+  asserts.is_true((add & math).matches(_candidate()))
+  asserts.is_false((add & ~math).matches(_candidate()))
+  asserts.is_true((~add | math).matches(_candidate()))
+
+
+@checkers.test
+def test_parse_expression():
+  selector = selection.parse(
+      '(re:test_(add|sub)_ or suite:identity) and not param:n*')
+  asserts.is_true(selector.matches(_candidate()))
+  asserts.is_false(selector.matches(_candidate(parameterization_name='n1_2')))
+  asserts.is_true(selection.parse('test_add_1_2').matches(_candidate()))
+
+
+@checkers.test
+def test_parse_invalid_expression():
+  for expression in ('', 'suite:math and', '(suite:math', 'suite:math )'):
+    with asserts.expect_exception(ValueError):
+      selection.parse(expression)
+
+
+@checkers.test
+def test_test_case_candidate_matches_case_candidate():
+  test_run = _create_test_run()
+  expected = dict((candidate.full_name, candidate) for _, _, candidate
+                  in selection.case_candidates(test_run))
+  for test_case in test_run.generate_test_cases.values():
+    candidate = selection.test_case_candidate(test_case)
+    other = expected[candidate.full_name]
+    asserts.are_equal(candidate.name, other.name)
+    asserts.are_equal(candidate.test_full_name, other.test_full_name)
+    asserts.are_equal(candidate.parameterization_name,
+                      other.parameterization_name)
+    asserts.are_equal(set(candidate.suite_names), set(other.suite_names))
+
+
+@checkers.test
+def test_test_case_filter_matches_selected_test_cases():
+  test_cases = _create_test_run().generate_test_cases.values()
+  everything = selection.TestCaseFilter()
+  asserts.are_equal(len([tc for tc in test_cases if everything.matches(tc)]),
+                    len(test_cases))
+  identity = selection.TestCaseFilter('suite:identity')
+  asserts.are_equal([tc.name for tc in test_cases if identity.matches(tc)],
+                    ['test_add_0_0'])
+
+
+@checkers.test
+def test_select_prunes_parameterizations():
+  test_run = _create_test_run()
+  test_run.select('param:*1_2')
+  asserts.are_equal(_generated_names(test_run),
+                    set(['test_add_1_2', 'test_add_n1_2']))
+
+
+@checkers.test
+def test_select_by_parameterization_suite():
+  test_run = _create_test_run()
+  test_run.select('suite:identity or test_hello')
+  asserts.are_equal(_generated_names(test_run),
+                    set(['test_add_0_0', 'test_hello']))
+
+
+@checkers.test
+def test_select_by_run_suite():
+  test_run = _create_test_run()
+  test_run.test_suites['greetings'].register(test_run.tests.values()[1])
+  test_run.select('suite:greetings')
+  asserts.are_equal(_generated_names(test_run), set(['test_hello']))
+
+
+@checkers.test
+def test_select_leaves_original_test_untouched():
+  test_run = _create_test_run()
+  original = test_run.tests.values()[0]
+  test_run.select('test_add_1_2')
+  asserts.has_length(original.decorator_parameterizations, 3)
+  asserts.are_not_same(original, test_run.tests.values()[0])
+
+
+if __name__ == '__main__':
+  pyunit.main()
@@ -98,6 +98,38 @@ def test_test_call_error_from_exception():
   asserts.are_equal(result.status, test_result.TestResultStatus.ERROR)
 
 
+
+@checkers.test
+def test_test_call_records_phases():
+  @checkers.test
+  def dummy_test():
+    pass
+
+  tc = test_case.TestCase(dummy_test, _dummy_context_factory)
+  result = tc()
+  asserts.are_equal([phase[0] for phase in result.phases],
+                    ['setup', 'body', 'teardown'])
+  for _, start, end in result.phases:
+    asserts.is_true(start <= end)
+  asserts.is_not_none(result.pid)
+  asserts.is_not_none(result.thread_id)
+
+
+@checkers.test
+def test_test_call_records_phase_that_raised():
+  def failing_setup():
+    raise ValueError('setup failed')
+
+  @checkers.setup(failing_setup)
+  @checkers.test
+  def dummy_test():
+    pass
+
+  tc = test_case.TestCase(dummy_test, _dummy_context_factory)
+  result = tc()
+  asserts.are_equal([phase[0] for phase in result.phases],
+                    ['setup', 'teardown'])
+
 if __name__ == '__main__':
   pyunit.main()
 
@@ -18,6 +18,7 @@ import checkers
 from checkers import asserts
 from checkers import test_result
 from checkers.runners import pyunit
+from checkers.tests import helpers
 
 
 @checkers.test
@@ -35,5 +36,52 @@ def test_test_result_status_error():
   asserts.are_equal(test_result.TestResultStatus.ERROR, 'ERROR')
 
 
+@checkers.test
+def test_test_result_status_not_run():
+  asserts.are_equal(test_result.TestResultStatus.NOT_RUN, 'NOT_RUN')
+
+
+@checkers.test
+def test_test_result_status_timeout():
+  asserts.are_equal(test_result.TestResultStatus.TIMEOUT, 'TIMEOUT')
+
+
+@checkers.test
+def test_test_result_failed():
+  for status in (test_result.TestResultStatus.FAILED,
+                 test_result.TestResultStatus.ERROR,
+                 test_result.TestResultStatus.TIMEOUT):
+    asserts.is_true(test_result.TestResult(None, status).failed)
+  for status in (test_result.TestResultStatus.PASSED,
+                 test_result.TestResultStatus.NOT_RUN):
+    asserts.is_false(test_result.TestResult(None, status).failed)
+
+
+@checkers.test
+def test_test_result_to_dict_round_trip():
+  @checkers.test
+  def failing_test():
+    asserts.is_true(False)
+
+  test_run = helpers.create_test_run('round_trip', failing_test)
+  test_case = test_run.generate_test_cases.values()[0]
+  result = test_case()
+  result.output = 'printed\n'
+  result.gc_stats = {'collections': 1, 'pause': 0.5, 'collected': 2}
+  source = result.to_dict()
+  asserts.are_equal(source['full_name'], test_case.full_name)
+  copy = test_result.TestResult.from_dict(test_case.context, source)
+  asserts.are_equal(copy.status, test_result.TestResultStatus.FAILED)
+  asserts.are_equal(copy.message, result.message)
+  asserts.is_true(
+      isinstance(copy.exc_info[1], test_result.RemoteAssertionError))
+  asserts.is_in('failing_test', str(copy.exc_info[1]))
+  asserts.are_equal(copy.phases, result.phases)
+  asserts.are_equal(copy.pid, result.pid)
+  asserts.are_equal(copy.thread_id, result.thread_id)
+  asserts.are_equal(copy.output, 'printed\n')
+  asserts.are_equal(copy.gc_stats, result.gc_stats)
+
+
 if __name__ == '__main__':
   pyunit.main()
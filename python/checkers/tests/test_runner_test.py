@@ -0,0 +1,116 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Tests for checkers.test_runner."""
+
+import threading
+
+import checkers
+from checkers import asserts
+from checkers import test_result
+from checkers import test_runner
+from checkers.runners import pyunit
+from checkers.tests import helpers
+
+
+class _GatedExecutor(checkers.ThreadPoolExecutor):
+  """Thread pool whose test cases (after the first) wait until it's cancelled."""
+
+  def __init__(self, threads):
+    super(_GatedExecutor, self).__init__(threads)
+    self.gate = threading.Event()
+
+  def cancel(self):
+    super(_GatedExecutor, self).cancel()
+    self.gate.set()
+
+
+def _create_test_run(tracker, failing=3, passing=2, gate=None):
+  """Creates a test run with failing tests followed by passing tests."""
+  lock = threading.Lock()
+
+  @checkers.test
+  def test_case(index):
+    with lock:
+      is_first = not tracker
+      tracker.append(index)
+    if gate and not is_first:
+      gate.wait()
+    asserts.is_true(index >= failing)
+
+  test_run = helpers.create_test_run('runner', test_case)
+  helpers.parameterize(test_run, test_case, 'index', xrange(failing + passing))
+  test_run.teardown.register(lambda _: tracker.append('teardown'))
+  return test_run
+
+
+def _statuses(results):
+  return [result.status for result in results.values()]
+
+
+@checkers.test
+def test_runner_runs_all_test_cases():
+  tracker = []
+  results = test_runner.TestRunner().run(_create_test_run(tracker))
+  asserts.has_length(results, 5)
+  asserts.are_equal(tracker[-1], 'teardown')
+  asserts.are_equal(_statuses(results).count(
+      test_result.TestResultStatus.FAILED), 3)
+
+
+@checkers.test
+def test_runner_failfast():
+  tracker = []
+  runner = test_runner.TestRunner(failfast=True)
+  results = runner.run(_create_test_run(tracker))
+  asserts.has_length(results, 5)
+  asserts.has_length(tracker, 2)
+  asserts.are_equal(tracker[-1], 'teardown')
+  asserts.are_equal(_statuses(results).count(
+      test_result.TestResultStatus.NOT_RUN), 4)
+
+
+@checkers.test
+def test_runner_max_failures():
+  tracker = []
+  runner = test_runner.TestRunner(max_failures=2)
+  results = runner.run(_create_test_run(tracker))
+  asserts.are_equal(_statuses(results).count(
+      test_result.TestResultStatus.FAILED), 2)
+  asserts.are_equal(_statuses(results).count(
+      test_result.TestResultStatus.NOT_RUN), 3)
+
+
+@checkers.test
+def test_runner_max_failures_not_reached():
+  tracker = []
+  runner = test_runner.TestRunner(max_failures=4)
+  results = runner.run(_create_test_run(tracker))
+  asserts.is_not_in(test_result.TestResultStatus.NOT_RUN, _statuses(results))
+
+
+@checkers.test
+def test_runner_max_failures_with_threads():
+  tracker = []
+  executor = _GatedExecutor(2)
+  runner = test_runner.TestRunner(executor=executor, max_failures=1)
+  results = runner.run(_create_test_run(tracker, failing=50, passing=0,
+                                        gate=executor.gate))
+  asserts.has_length(results, 50)
+  asserts.is_in(test_result.TestResultStatus.NOT_RUN, _statuses(results))
+  asserts.are_equal(tracker[-1], 'teardown')
+
+
+if __name__ == '__main__':
+  pyunit.main()
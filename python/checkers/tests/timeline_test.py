@@ -0,0 +1,117 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Tests for checkers.timeline."""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import checkers
+from checkers import asserts
+from checkers import executors
+from checkers import timeline
+from checkers.runners import pyunit
+from checkers.tests import helpers
+
+
+def _create_test_run(count=4, sleep=0.0):
+  """Creates a test run with a parameterized test that sleeps."""
+
+  @checkers.parameterize(dict(('p%d' % i, {}) for i in xrange(count)))
+  @checkers.test
+  def test_sleep():
+    time.sleep(sleep)
+
+  return helpers.create_test_run('timeline', test_sleep)
+
+
+def _record(test_run, executor=None):
+  recorder = timeline.TimelineRecorder()
+  recorder.attach(test_run)
+  helpers.run(test_run, executor)
+  return recorder.to_trace()['traceEvents']
+
+
+def _spans(trace_events, category):
+  return [event for event in trace_events
+          if event['ph'] == 'X' and event['cat'] == category]
+
+
+@checkers.test
+def test_trace_contains_run_case_and_phase_spans():
+  trace_events = _record(_create_test_run())
+  run_spans = _spans(trace_events, timeline.RUN_CATEGORY)
+  asserts.are_equal([span['name'] for span in run_spans],
+                    ['run setup', 'run teardown'])
+  case_spans = _spans(trace_events, timeline.CASE_CATEGORY)
+  asserts.has_length(case_spans, 4)
+  asserts.are_equal(set(span['args']['status'] for span in case_spans),
+                    set(['PASSED']))
+  phase_spans = _spans(trace_events, timeline.PHASE_CATEGORY)
+  asserts.are_equal(
+      sorted(set(span['name'] for span in phase_spans)),
+      ['body', 'fixture_setup', 'fixture_teardown', 'setup', 'teardown'])
+  for case_span in case_spans:
+    phases = [span for span in phase_spans
+              if span['args']['test_case'] == case_span['name']]
+    for phase in phases:
+      asserts.is_true(phase['ts'] >= case_span['ts'])
+      asserts.is_true(phase['ts'] + phase['dur'] <=
+                      case_span['ts'] + case_span['dur'] + 1e-3)
+  asserts.are_equal(min(event['ts'] for event in trace_events
+                        if event['ph'] == 'X'), 0)
+  asserts.are_equal(set(event['tid'] for event in trace_events), set([1]))
+
+
+@checkers.test
+def test_trace_has_a_track_per_thread():
+  trace_events = _record(_create_test_run(sleep=0.05),
+                         executors.ThreadPoolExecutor(2))
+  case_spans = _spans(trace_events, timeline.CASE_CATEGORY)
+  asserts.are_equal(len(set(span['tid'] for span in case_spans)), 2)
+  thread_names = [event for event in trace_events
+                  if event['name'] == 'thread_name']
+  asserts.has_length(thread_names, 3)
+
+
+@checkers.test
+def test_trace_includes_forked_workers():
+  trace_events = _record(_create_test_run(), executors.ForkExecutor(2))
+  case_spans = _spans(trace_events, timeline.CASE_CATEGORY)
+  asserts.has_length(case_spans, 4)
+  asserts.is_not_in(os.getpid(), [span['pid'] for span in case_spans])
+  run_spans = _spans(trace_events, timeline.RUN_CATEGORY)
+  asserts.are_equal([span['pid'] for span in run_spans], [os.getpid()] * 2)
+
+
+@checkers.test
+def test_write():
+  directory = tempfile.mkdtemp()
+  try:
+    recorder = timeline.TimelineRecorder()
+    recorder.attach(_create_test_run(count=1))
+    file_path = os.path.join(directory, 'timeline.json')
+    recorder.write(file_path)
+    with open(file_path) as f:
+      asserts.are_equal(json.load(f), {'traceEvents': [],
+                                       'displayTimeUnit': 'ms'})
+  finally:
+    shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+  pyunit.main()
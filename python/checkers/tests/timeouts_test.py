@@ -0,0 +1,101 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Tests for checkers.timeouts."""
+
+import threading
+
+import checkers
+from checkers import asserts
+from checkers import test_result
+from checkers import timeouts
+from checkers.runners import pyunit
+from checkers.tests import helpers
+
+
+def _create_test_run(release, timeout=None):
+  """Creates a test run with a quick test and a test that hangs."""
+
+  @checkers.test
+  def test_quick():
+    pass
+
+  @checkers.timeout(timeout)
+  @checkers.test
+  def test_hang():
+    release.wait()
+
+  return helpers.create_test_run('timeouts', test_quick, test_hang)
+
+
+def _test_cases(test_run):
+  return test_run.generate_test_cases.values()
+
+
+@checkers.test
+def test_resolve_timeout_precedence():
+  test_run = _create_test_run(threading.Event())
+  quick, hang = _test_cases(test_run)
+  asserts.is_none(timeouts.resolve_timeout(quick))
+  test_run.timeout = 30
+  quick, hang = _test_cases(test_run)
+  asserts.are_equal(timeouts.resolve_timeout(quick), 30)
+  test_run.test_suites['slow'].timeout = 20
+  test_run.test_suites['slower'].timeout = 10
+  test_run.test_suites['slow'].register(test_run.tests.values()[0])
+  test_run.test_suites['slower'].register(test_run.tests.values()[0])
+  quick, hang = _test_cases(test_run)
+  asserts.are_equal(timeouts.resolve_timeout(quick), 10)
+  test_run.tests.values()[0].timeout = 5
+  quick, hang = _test_cases(test_run)
+  asserts.are_equal(timeouts.resolve_timeout(quick), 5)
+
+
+@checkers.test
+def test_watchdog_reports_hung_test_case():
+  release = threading.Event()
+  _, hang = _test_cases(_create_test_run(release))
+  try:
+    result = timeouts.Watchdog().run(hang, 0.05, lambda tc: tc())
+  finally:
+    release.set()
+  asserts.are_equal(result.status, test_result.TestResultStatus.TIMEOUT)
+  asserts.is_true(result.failed)
+  asserts.are_same(result.exc_info[0], timeouts.TestTimeoutError)
+  asserts.is_in('test_hang', result.message)
+  asserts.is_in('release.wait()', result.message)
+
+
+@checkers.test
+def test_watchdog_returns_result_in_time():
+  _, hang = _test_cases(_create_test_run(threading.Event()))
+  result = timeouts.Watchdog().run(hang, 5, lambda tc: 'done')
+  asserts.are_equal(result, 'done')
+
+
+@checkers.test
+def test_runner_continues_after_timeout():
+  release = threading.Event()
+  test_run = _create_test_run(release, timeout=0.05)
+  try:
+    results = checkers.TestRunner().run(test_run)
+  finally:
+    release.set()
+  statuses = [result.status for result in results.values()]
+  asserts.are_equal(statuses, [test_result.TestResultStatus.PASSED,
+                               test_result.TestResultStatus.TIMEOUT])
+
+
+if __name__ == '__main__':
+  pyunit.main()
@@ -0,0 +1,157 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Exports the timeline of a test run as a Chrome trace.
+
+The timeline shows how the test cases were laid out over time: each process
+and thread that ran test cases gets its own track, with a span for each test
+case and nested spans for its phases (the setup of its fixtures, setup, body,
+teardown and the teardown of its fixtures). The run's own setup and teardown are spans on the track of the
+process that ran them. The file uses the Chrome trace event format, so it can
+be opened in chrome://tracing or https://ui.perfetto.dev to look for idle
+workers, long tails and slow fixtures.
+
+The spans come from the phases recorded in the test results (see
+TestCase.__call__), so test cases that ran in other processes (e.g. with a
+ForkExecutor) are included.
+
+Example:
+
+  recorder = timeline.TimelineRecorder()
+  recorder.attach(test_run)
+  checkers.TestRunner(executor=checkers.ForkExecutor()).run(test_run)
+  recorder.write('timeline.json')
+"""
+
+import json
+import os
+import thread
+import threading
+
+import events
+
+# Categories of the spans.
+RUN_CATEGORY = 'run'
+CASE_CATEGORY = 'case'
+PHASE_CATEGORY = 'phase'
+
+
+class TimelineRecorder(object):
+  """Records the timeline of test runs from their events."""
+
+  def __init__(self):
+    """Initializes a new instance of a TimelineRecorder."""
+    # (name, start, end, pid, thread id, test run name) of the run spans.
+    self.run_spans = []
+    # The recorded test results (only the ones with phases are exported).
+    self.results = []
+    self._starts = {}
+    self._lock = threading.Lock()
+
+  def attach(self, test_run):
+    """Records the timeline of a test run (by listening to its events).
+
+    Args:
+      test_run: (TestRun) The test run to record.
+    """
+    test_run.events.add_listener(
+        self.on_event, events.EventType.RUN_START,
+        events.EventType.RUN_SETUP_END, events.EventType.RUN_TEARDOWN_START,
+        events.EventType.RUN_END, events.EventType.RESULT_RECORDED)
+
+  def on_event(self, event):
+    """Records an event of a test run.
+
+    Args:
+      event: (Event) The event.
+    """
+    with self._lock:
+      if event.type == events.EventType.RESULT_RECORDED:
+        self.results.append(event.result)
+      elif event.type in (events.EventType.RUN_START,
+                          events.EventType.RUN_TEARDOWN_START):
+        self._starts[event.test_run] = event.time
+      else:
+        start = self._starts.pop(event.test_run, None)
+        if start is None:
+          return
+        name = 'run setup'
+        if event.type == events.EventType.RUN_END:
+          name = 'run teardown'
+        self.run_spans.append((name, start, event.time, os.getpid(),
+                               thread.get_ident(), event.test_run.name))
+
+  def to_trace(self):
+    """Converts the recorded timeline into a Chrome trace.
+
+    Returns:
+      dict: The trace, in the Chrome trace event format.
+    """
+    spans = []
+    for name, start, end, pid, thread_id, test_run_name in self.run_spans:
+      spans.append((start, end, pid, thread_id, {
+          'name': name, 'cat': RUN_CATEGORY,
+          'args': {'test_run': test_run_name}}))
+    for result in self.results:
+      if not result.phases:
+        continue
+      full_name = result.context.test_case.full_name
+      spans.append((min(phase[1] for phase in result.phases),
+                    max(phase[2] for phase in result.phases),
+                    result.pid, result.thread_id, {
+                        'name': full_name, 'cat': CASE_CATEGORY,
+                        'args': {'status': result.status}}))
+      for name, start, end in result.phases:
+        spans.append((start, end, result.pid, result.thread_id, {
+            'name': name, 'cat': PHASE_CATEGORY,
+            'args': {'test_case': full_name}}))
+    if not spans:
+      return {'traceEvents': [], 'displayTimeUnit': 'ms'}
+    origin = min(span[0] for span in spans)
+    # Chrome traces need small integer thread ids, so the threads of each
+    # process are numbered in the order they first ran something.
+    thread_numbers = {}
+    trace_events = []
+    for start, end, pid, thread_id, event in sorted(
+        spans, key=lambda span: (span[0], -span[1])):
+      key = (pid, thread_id)
+      if key not in thread_numbers:
+        number = sum(1 for other in thread_numbers if other[0] == pid) + 1
+        thread_numbers[key] = number
+        if number == 1:
+          trace_events.append({
+              'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': number,
+              'args': {'name': 'process %s' % pid}})
+        trace_events.append({
+            'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': number,
+            'args': {'name': 'thread %d' % number}})
+      event = dict(event)
+      event.update({
+          'ph': 'X',
+          'ts': (start - origin) * 1e6,
+          'dur': max(end - start, 0) * 1e6,
+          'pid': pid,
+          'tid': thread_numbers[key],
+      })
+      trace_events.append(event)
+    return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+  def write(self, file_path):
+    """Writes the recorded timeline to a Chrome trace file.
+
+    Args:
+      file_path: (string) The file to write the trace to.
+    """
+    with open(file_path, 'w') as f:
+      json.dump(self.to_trace(), f, separators=(',', ':'))
@@ -0,0 +1,113 @@
+# Copyright 2015 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+#     Unless required by applicable law or agreed to in writing, software
+#     distributed under the License is distributed on an "AS IS" BASIS,
+#     WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#     See the License for the specific language governing permissions and
+#     limitations under the License.
+
+"""Per-test timeouts, enforced by a watchdog.
+
+Timeouts can be set on a test (see the @checkers.timeout decorator), on a test
+suite and on a test run (using their timeout attributes). A test case uses its
+test's timeout if there is one, otherwise the smallest timeout of the suites
+it belongs to, and otherwise its test run's timeout.
+
+When a test case has a timeout, the watchdog runs it in a separate thread. If it
+doesn't finish in time, the watchdog reports a TIMEOUT result containing the
+stack of the hung test case and moves on. Note that Python can't kill a thread,
+so the hung thread is abandoned (it's a daemon thread, so it won't keep the
+process alive). Executors that run test cases in separate processes replace the
+worker process instead.
+"""
+
+import sys
+import threading
+import traceback
+
+import test_result
+
+
+class TestTimeoutError(Exception):
+  """Reported when a test case runs longer than its timeout."""
+  pass
+
+
+def resolve_timeout(test_case):
+  """Finds the timeout that applies to a test case.
+
+  Args:
+    test_case: (TestCase) The test case to find the timeout for.
+
+  Returns:
+    float: The timeout in seconds, or None if the test case has no timeout.
+  """
+  if test_case.test.timeout is not None:
+    return test_case.test.timeout
+  suite_timeouts = [suite.timeout for suite in test_case.test_suites.values()
+                    if getattr(suite, 'timeout', None) is not None]
+  if suite_timeouts:
+    return min(suite_timeouts)
+  return getattr(test_case.context.test_run, 'timeout', None)
+
+
+def create_timeout_result(test_case, timeout, stack=None):
+  """Creates the result for a test case that timed out.
+
+  Args:
+    test_case: (TestCase) The test case that timed out.
+    timeout: (float) The timeout that the test case exceeded.
+    stack: (string) The stack of the hung test case (if it's known).
+
+  Returns:
+    TestResult: The TIMEOUT result for the test case.
+  """
+  message = '%s timed out after %ss' % (test_case.full_name, timeout)
+  if stack:
+    message = '%s; stack of the hung test case:\n%s' % (message, stack)
+  error = TestTimeoutError(message)
+  return test_result.TestResult(
+      test_case.context, test_result.TestResultStatus.TIMEOUT,
+      exc_info=(TestTimeoutError, error, None))
+
+
+class Watchdog(object):
+  """Runs test cases in monitored threads and gives up on them if they hang."""
+
+  def run(self, test_case, timeout, run_test_case):
+    """Runs the test case, making sure that it finishes within the timeout.
+
+    Args:
+      test_case: (TestCase) The test case to run.
+      timeout: (float) The number of seconds the test case may run.
+      run_test_case: (function(TestCase)) Runs the test case.
+
+    Returns:
+      TestResult: The result of the test case, or a TIMEOUT result.
+    """
+    outcome = []
+
+    def monitored():
+      try:
+        outcome.append(run_test_case(test_case))
+      except Exception:  # pylint: disable=broad-except
+        outcome.append(test_result.TestResult(
+            test_case.context, test_result.TestResultStatus.ERROR,
+            exc_info=sys.exc_info()))
+
+    thread = threading.Thread(target=monitored,
+                              name='checkers-watchdog-%s' % test_case.name)
+    thread.daemon = True
+    thread.start()
+    thread.join(timeout)
+    if outcome:
+      return outcome[0]
+    frame = sys._current_frames().get(thread.ident)  # pylint: disable=protected-access
+    stack = ''.join(traceback.format_stack(frame)) if frame else None
+    return create_timeout_result(test_case, timeout, stack)
@@ -20,30 +20,98 @@ python python/checkers/tests/checkers_test.py
 echo 'python/checkers/tests/context_test.py'
 python python/checkers/tests/context_test.py
 
+echo 'python/checkers/tests/daemon_test.py'
+python python/checkers/tests/daemon_test.py
+
+echo 'python/checkers/tests/discovery_test.py'
+python python/checkers/tests/discovery_test.py
+
+echo 'python/checkers/tests/distributed_test.py'
+python python/checkers/tests/distributed_test.py
+
+echo 'python/checkers/tests/executors_test.py'
+python python/checkers/tests/executors_test.py
+
+echo 'python/checkers/tests/events_test.py'
+python python/checkers/tests/events_test.py
+
+echo 'python/checkers/tests/fixtures_test.py'
+python python/checkers/tests/fixtures_test.py
+
+echo 'python/checkers/tests/garbage_test.py'
+python python/checkers/tests/garbage_test.py
+
+echo 'python/checkers/tests/impact_test.py'
+python python/checkers/tests/impact_test.py
+
+echo 'python/checkers/tests/json_files_test.py'
+python python/checkers/tests/json_files_test.py
+
+echo 'python/checkers/tests/import_time_test.py'
+python python/checkers/tests/import_time_test.py
+
 echo 'python/checkers/tests/modules_test.py'
 python python/checkers/tests/modules_test.py
 
 echo 'python/checkers/tests/parameterization_test.py'
 python python/checkers/tests/parameterization_test.py
 
+echo 'python/checkers/tests/plan_test.py'
+python python/checkers/tests/plan_test.py
+
+echo 'python/checkers/tests/profiling_test.py'
+python python/checkers/tests/profiling_test.py
+
+echo 'python/checkers/tests/leaks_test.py'
+python python/checkers/tests/leaks_test.py
+
 echo 'python/checkers/tests/registry_test.py'
 python python/checkers/tests/registry_test.py
 
+echo 'python/checkers/tests/result_cache_test.py'
+python python/checkers/tests/result_cache_test.py
+
+echo 'python/checkers/tests/selection_test.py'
+python python/checkers/tests/selection_test.py
+
 echo 'python/checkers/tests/test_case_test.py'
 python python/checkers/tests/test_case_test.py
 
+echo 'python/checkers/tests/benchmarks_test.py'
+python python/checkers/tests/benchmarks_test.py
+
+echo 'python/checkers/tests/baseline_test.py'
+python python/checkers/tests/baseline_test.py
+
+echo 'python/checkers/tests/capture_test.py'
+python python/checkers/tests/capture_test.py
+
 echo 'python/checkers/tests/test_result_test.py'
 python python/checkers/tests/test_result_test.py
 
 echo 'python/checkers/tests/test_run_test.py'
 python python/checkers/tests/test_run_test.py
 
+echo 'python/checkers/tests/test_runner_test.py'
+python python/checkers/tests/test_runner_test.py
+
 echo 'python/checkers/tests/test_suite_test.py'
 python python/checkers/tests/test_suite_test.py
 
 echo 'python/checkers/tests/test_test.py'
 python python/checkers/tests/test_test.py
 
+echo 'python/checkers/tests/timeouts_test.py'
+python python/checkers/tests/timeouts_test.py
+
+echo 'python/checkers/tests/timeline_test.py'
+python python/checkers/tests/timeline_test.py
+
 echo 'python/checkers/tests/asserts/asserts_test.py'
 python python/checkers/tests/asserts/asserts_test.py
 
+echo 'python/checkers/tests/runners/pyunit/pyunit_test.py'
+python python/checkers/tests/runners/pyunit/pyunit_test.py
+
+echo 'python/checkers/tests/perf/framework_benchmark_test.py'
+python python/checkers/tests/perf/framework_benchmark_test.py
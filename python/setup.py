@@ -30,8 +30,12 @@ setup(
         'checkers',
         'checkers.asserts',
         'checkers.examples',
+        'checkers.perf',
         'checkers.runners',
         'checkers.runners.pyunit',
         'checkers.tests',
+        'checkers.tests.perf',
+        'checkers.tests.runners',
+        'checkers.tests.runners.pyunit',
     ],
 )